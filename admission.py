@@ -0,0 +1,132 @@
+"""
+Admission control for /start and /start_batch
+
+Without it, /start dials even when every slot is taken and /start_batch
+queues arrays of any size, so under load the queue, its greeting
+pre-rendering and its database rows grow until the process runs out of
+memory. Here calls are admitted only while there is capacity: /start needs
+a free call slot (429 with Retry-After otherwise), and /start_batch queues
+calls up to the per-user and total queue limits and reports the rest as
+rejected. Limits apply per API process.
+"""
+
+import os
+import math
+import json
+from collections import Counter
+from fastapi import HTTPException
+
+from dispatcher import MAX_CONCURRENT_CALLS
+
+# Calls allowed in flight at once, /start calls included; /start is refused past it
+MAX_ACTIVE_CALLS = int(os.getenv("MAX_ACTIVE_CALLS", str(MAX_CONCURRENT_CALLS)))
+
+# Calls allowed in the dispatcher queue, in total and per user
+MAX_QUEUED_CALLS = int(os.getenv("MAX_QUEUED_CALLS", "20000"))
+MAX_QUEUED_CALLS_PER_USER = int(os.getenv("MAX_QUEUED_CALLS_PER_USER", "5000"))
+
+# Largest /start_batch request body accepted (bytes)
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(10 * 1024 * 1024)))
+
+# Retry-After (seconds) before any call has finished to estimate from; estimates are capped at MAX_RETRY_AFTER
+DEFAULT_RETRY_AFTER = int(os.getenv("DEFAULT_RETRY_AFTER", "30"))
+MAX_RETRY_AFTER = int(os.getenv("MAX_RETRY_AFTER", "3600"))
+
+
+class AdmissionController:
+    """
+    Decides how many new calls the dispatcher can take
+
+    Admitted calls are reserved until they are enqueued (or adopted, for
+    /start), so requests running concurrently can't overshoot the limits
+    while they wait on the database.
+    """
+
+    def __init__(self, dispatcher, max_active=MAX_ACTIVE_CALLS, max_queued=MAX_QUEUED_CALLS,
+                 max_queued_per_user=MAX_QUEUED_CALLS_PER_USER):
+        self.dispatcher = dispatcher
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self._starting = 0
+        self._reserved = Counter()  # user_id -> batch calls admitted but not enqueued yet
+        self.admitted = 0
+        self.rejected = Counter()  # reason -> calls
+
+    def retry_after(self, calls_ahead=1):
+        """Seconds until `calls_ahead` more calls could have been started, from recent call durations"""
+        duration = self.dispatcher.average_call_duration()
+        if duration is None:
+            return DEFAULT_RETRY_AFTER
+        seconds = math.ceil(duration * calls_ahead / max(1, self.dispatcher.max_concurrent))
+        return max(1, min(seconds, MAX_RETRY_AFTER))
+
+    def admit_call(self):
+        """
+        Reserve a slot for a call dialed right away (/start)
+
+        Returns None when admitted (release with call_started()), otherwise the
+        Retry-After in seconds - queued calls are ahead of it too.
+        """
+        if self.dispatcher.active() + self._starting >= self.max_active:
+            self.rejected["active_calls"] += 1
+            return self.retry_after(len(self.dispatcher) + 1)
+        self._starting += 1
+        self.admitted += 1
+        return None
+
+    def call_started(self):
+        """The call admitted by admit_call was adopted by the dispatcher, or failed"""
+        self._starting -= 1
+
+    def admit_batch(self, user_id, count):
+        """
+        Reserve queue room for up to `count` calls (/start_batch)
+
+        Returns (admitted, reason); reason says why the rest were refused -
+        "user_queue_full" or "queue_full". Release with batch_queued().
+        """
+        user_room = self.max_queued_per_user - self.dispatcher.queued(user_id) - self._reserved[user_id]
+        total_room = self.max_queued - len(self.dispatcher) - sum(self._reserved.values())
+        admitted = max(0, min(count, user_room, total_room))
+        reason = None
+        if admitted < count:
+            reason = "user_queue_full" if user_room <= total_room else "queue_full"
+            self.rejected[reason] += count - admitted
+        if admitted:
+            self._reserved[user_id] += admitted
+            self.admitted += admitted
+        return admitted, reason
+
+    def batch_queued(self, user_id, count):
+        """The calls reserved by admit_batch were enqueued (or dropped)"""
+        self._reserved[user_id] -= count
+        if self._reserved[user_id] <= 0:
+            del self._reserved[user_id]
+
+    def stats(self):
+        return {
+            "max_active_calls": self.max_active,
+            "max_queued_calls": self.max_queued,
+            "max_queued_calls_per_user": self.max_queued_per_user,
+            "starting": self._starting,
+            "reserved": sum(self._reserved.values()),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected)
+        }
+
+
+async def read_json_limited(request, max_bytes=MAX_BATCH_BYTES):
+    """Request body as JSON, refusing bodies over max_bytes (413) before they are read into memory"""
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be JSON")
@@ -3,6 +3,7 @@ import pandas as pd
 import requests
 import time
 import os
+import json
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -63,7 +64,11 @@ def initiate_call(phone_number, customer_data):
 def get_call_status(call_uuid):
     """Get status of a specific call"""
     try:
-        response = requests.get(f"{BACKEND_URL}/calls", timeout=10)
+        response = requests.get(
+            f"{BACKEND_URL}/calls",
+            params={"fields": "call_uuid,status", "limit": 500},
+            timeout=10
+        )
         if response.status_code == 200:
             calls = response.json().get("calls", [])
             for call in calls:
@@ -74,13 +79,55 @@ def get_call_status(call_uuid):
         return None
 
 
+FINAL_CALL_STATUSES = ['completed', 'failed', 'declined', 'invalid', 'out_of_service',
+                       'nonexistent', 'unallocated', 'not_reachable']
+
+
+def iter_call_events(timeout):
+    """Yield call status events from the backend's /calls/events stream until timeout"""
+    headers = {}
+    if st.session_state.get("token"):
+        headers["Authorization"] = f"Bearer {st.session_state.token}"
+    
+    deadline = time.time() + timeout
+    # Read timeout > server keep-alive interval so an idle stream doesn't error out
+    with requests.get(f"{BACKEND_URL}/calls/events", headers=headers, stream=True, timeout=(5, 30)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith("data: "):
+                yield json.loads(line[len("data: "):])
+            if time.time() >= deadline:
+                return
+
+
 def wait_for_call_completion(call_uuid, max_wait_time=300):
-    """Wait for a call to complete"""
+    """Wait for a call to complete (pushed status events, falls back to polling)"""
     start_time = time.time()
+    try:
+        # The call may already have finished before we subscribed
+        if get_call_status(call_uuid) in FINAL_CALL_STATUSES:
+            return True
+        for event in iter_call_events(max_wait_time):
+            if event["call_uuid"] == call_uuid and event["status"] in FINAL_CALL_STATUSES:
+                return True
+        return False
+    except Exception:
+        pass
+    
     while time.time() - start_time < max_wait_time:
         status = get_call_status(call_uuid)
-        if status in ['completed', 'failed']:
+        if status in FINAL_CALL_STATUSES:
+            return True
+        time.sleep(3)
+    return False
+
+
+def wait_for_call_event(timeout=30):
+    """Block until any call status changes (or timeout) - used to drive auto-refresh"""
+    try:
+        for _ in iter_call_events(timeout):
             return True
+    except Exception:
         time.sleep(3)
     return False
 
@@ -298,7 +345,7 @@ if agent_type == "📞 Voice Agent":
         
         col1, col2, col3 = st.columns([2, 1, 1])
         with col2:
-            auto_refresh = st.checkbox("Auto-refresh (3s)", value=False, key="voice_refresh")
+            auto_refresh = st.checkbox("Auto-refresh (live)", value=False, key="voice_refresh")
         with col3:
             # Export button with status filter
             status_filter = st.selectbox(
@@ -355,7 +402,8 @@ if agent_type == "📞 Voice Agent":
                 st.info("No calls initiated yet.")
         
         if auto_refresh:
-            time.sleep(3)
+            # Rerun when the server pushes a status change instead of every 3s
+            wait_for_call_event()
             st.rerun()
     
     # Tab 3: Transcripts
@@ -74,3 +74,20 @@ def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials
         return get_current_user(credentials)
     except HTTPException:
         return None
+
+# EventSource (SSE) clients cannot set headers, so also accept ?token=
+def get_current_user_sse(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
+):
+    """Get current user from the Authorization header or a token query parameter"""
+    if credentials is None:
+        if not token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    
+    return get_current_user(credentials)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark /plivo_answer latency: XML precomputed at dial time vs built on answer
+Runs the real app under uvicorn on localhost (so status writes deferred until
+after the response aren't counted, as with Plivo) against a scratch database.
+
+Usage: python benchmark_answer.py [--calls 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+import httpx
+from fastapi import BackgroundTasks
+import uvicorn
+from loguru import logger
+
+import server
+from server import adb, app, call_data_store, call_greeting_path, get_call_state, publish_call_status
+
+
+@app.post("/legacy_answer/{call_uuid}")
+async def legacy_answer(call_uuid: str):
+    """The answer handler before precomputation: greeting lookup, inline DB write and XML built per request"""
+    logger.info(f"Plivo answer callback for call {call_uuid}")
+    if await get_call_state(call_uuid) is None:
+        return server.JSONResponse(content={"error": "Call not found"}, status_code=404)
+    current_status = call_data_store[call_uuid].get("status")
+    logger.info(f"Current status for call {call_uuid}: {current_status}")
+    if current_status in server.ANSWERABLE_STATUSES:
+        call_data_store[call_uuid]["greeting_start_time"] = datetime.now().isoformat()
+        call_data_store[call_uuid]["status"] = "greeting_playing"
+        await adb.update_call_status(call_uuid, "greeting_playing")
+        publish_call_status(call_uuid, "greeting_playing")
+        logger.info(f"Updated call {call_uuid} status to greeting_playing")
+    has_greeting = await call_greeting_path(call_uuid) is not None
+    logger.info(f"Using dynamic greeting for call {call_uuid}: {has_greeting}")
+    logger.info(f"Returning Plivo XML for call {call_uuid}")
+    return server.Response(content=server.build_answer_xml(call_uuid, has_greeting), media_type="application/xml")
+
+
+async def create_calls(count, precompute=False, in_memory=True):
+    """Dialed calls as /start_batch + the dispatcher would leave them"""
+    calls = [{
+        "call_uuid": str(uuid.uuid4()),
+        "phone_number": "+910000000000",
+        "custom_data": {"customer_name": "Bench", "invoice_number": "INV-1",
+                        "outstanding_balance": "125000", "invoice_date": "2026-01-01"},
+        "priority": 0,
+        "created_at": datetime.now().isoformat()
+    } for _ in range(count)]
+    await adb.create_calls_bulk(calls, user_id=1, status="calling")
+    if in_memory:
+        for call in calls:
+            call_data_store[call["call_uuid"]] = {
+                "phone_number": call["phone_number"], "custom_data": call["custom_data"],
+                "created_at": call["created_at"], "status": "calling", "user_id": 1
+            }
+            if precompute:
+                call_data_store[call["call_uuid"]]["answer_xml"] = server.build_answer_xml(call["call_uuid"], False)
+    return [call["call_uuid"] for call in calls]
+
+
+async def measure(client, path, call_uuids):
+    latencies = []
+    for call_uuid in call_uuids:
+        start = time.perf_counter()
+        response = await client.post(f"{path}/{call_uuid}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "p99": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+async def measure_handler(handler, call_uuids):
+    """Time spent in the handler itself (deferred background work excluded), in microseconds"""
+    latencies = []
+    for call_uuid in call_uuids:
+        start = time.perf_counter()
+        if handler is legacy_answer:
+            await handler(call_uuid)
+        else:
+            await handler(call_uuid, BackgroundTasks())
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+async def main(calls):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    uvicorn_server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                                   lifespan="off"))
+    serve = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.05)
+
+    scenarios = [
+        ("Before (legacy handler)", "/legacy_answer", dict(precompute=False)),
+        ("After (precomputed XML)", "/plivo_answer", dict(precompute=True)),
+        ("After (built on answer)", "/plivo_answer", dict(precompute=False)),
+        ("After (reloaded from DB)", "/plivo_answer", dict(in_memory=False)),
+    ]
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        await measure(client, "/plivo_answer", await create_calls(50, precompute=True))  # warm up
+        print("=" * 60)
+        print(f"/plivo_answer latency ({calls} answers per scenario, ms)")
+        print("=" * 60)
+        for name, path, options in scenarios:
+            result = await measure(client, path, await create_calls(calls, **options))
+            print(f"  {name:26} p50 {result['p50']:6.2f}  p95 {result['p95']:6.2f}  p99 {result['p99']:6.2f}")
+        print("=" * 60)
+
+    print("Handler time only (no HTTP, µs)")
+    print("=" * 60)
+    handlers = [legacy_answer, server.plivo_answer, server.plivo_answer, server.plivo_answer]
+    for (name, _, options), handler in zip(scenarios, handlers):
+        p50, p95 = await measure_handler(handler, await create_calls(calls, **options))
+        print(f"  {name:26} p50 {p50:7.0f}  p95 {p95:7.0f}")
+    print("=" * 60)
+
+    # Let deferred status writes finish
+    await asyncio.sleep(0.5)
+    uvicorn_server.should_exit = True
+    await serve
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    # Keep the handlers' log calls (they're part of the cost) but don't print them
+    logger.remove()
+    logger.add(lambda _: None, level="INFO")
+
+    asyncio.run(main(args.calls))
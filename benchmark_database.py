@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark webhook write throughput: legacy connect-per-query vs pooled WAL connections
+Simulates the DB writes of a call lifecycle (/start -> plivo_answer -> websocket -> plivo_hangup)
+
+Usage: python benchmark_database.py [--calls 500] [--threads 8]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from database import Database
+
+
+class LegacyConnection:
+    """Mimics the old behaviour: a fresh sqlite3 connection per query, closed afterwards"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self):
+        self.opened += 1
+        return _ClosingConnection(sqlite3.connect(self.db_path))
+
+    def close_all(self):
+        pass
+
+    def stats(self):
+        return {"open_connections": 0, "opened": self.opened, "reused": 0}
+
+
+class _ClosingConnection:
+    """Connection proxy that closes itself on commit, like the legacy methods did"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def commit(self):
+        self._conn.commit()
+        self._conn.close()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._conn.close()
+
+
+def make_database(path, pooled):
+    db = Database(db_path=path)
+    if not pooled:
+        db.close()
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        db.pool = LegacyConnection(path)
+    return db
+
+
+def simulate_call(db, user_id=1):
+    """DB writes performed over one call's lifecycle"""
+    call_uuid = str(uuid.uuid4())
+    created_at = "2026-01-01T10:00:00+05:30"
+    custom_data = {"customer_name": "Bench", "invoice_number": "INV-1", "outstanding_balance": "5000"}
+
+    db.create_call(call_uuid, "+910000000000", "Bench", "INV-1", user_id, custom_data, created_at)
+    db.insert_customer_data(call_uuid, "Bench", "+910000000000", "", "", "INV-1",
+                            "2026-01-01", "5000", "5000", created_at)
+    db.update_call_status(call_uuid, "calling", plivo_call_uuid="plivo-" + call_uuid)
+    db.update_call_status(call_uuid, "greeting_playing")
+    db.update_call_status(call_uuid, "in_progress")
+    db.update_call_status(call_uuid, "completed", ended_at="2026-01-01T10:02:00")
+
+
+def run(pooled, calls, threads):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_database(os.path.join(tmp, "bench.db"), pooled)
+
+        start = time.perf_counter()
+        if threads > 1:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(lambda _: simulate_call(db), range(calls)))
+        else:
+            for _ in range(calls):
+                simulate_call(db)
+        elapsed = time.perf_counter() - start
+
+        db.close()
+
+    writes = calls * 6
+    return writes / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    logger.remove()  # per-query INFO logging would dominate the measurement
+
+    print("=" * 60)
+    print(f"Webhook write throughput ({args.calls} simulated calls, 6 writes each)")
+    print("=" * 60)
+
+    for threads in (1, args.threads):
+        before, before_s = run(False, args.calls, threads)
+        after, after_s = run(True, args.calls, threads)
+        print(f"\nThreads: {threads}")
+        print(f"  Before (connect per query): {before:10.0f} writes/s  ({before_s:.2f}s)")
+        print(f"  After  (pooled WAL):        {after:10.0f} writes/s  ({after_s:.2f}s)")
+        print(f"  Speedup: {after / before:.1f}x")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,10 @@ import pytz
 
 from dotenv import load_dotenv
 from loguru import logger
+
+# Before http_clients / greeting_service, which read their settings at import time
+load_dotenv(override=True)
+
 from pipecat.audio.vad.silero import SileroVADAnalyzer
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.parallel_pipeline import ParallelPipeline
@@ -39,7 +43,7 @@ from pipecat.processors.filters.function_filter import FunctionFilter
 from pipecat.processors.frame_processor import FrameProcessor, FrameDirection
 from pipecat.processors.transcript_processor import TranscriptProcessor
 from pipecat.processors.user_idle_processor import UserIdleProcessor
-from pipecat.frames.frames import Frame, TextFrame, BotStoppedSpeakingFrame, EndFrame, TTSSpeakFrame, LLMFullResponseStartFrame, LLMFullResponseEndFrame
+from pipecat.frames.frames import Frame, TextFrame, BotStoppedSpeakingFrame, EndFrame, TTSSpeakFrame, TTSAudioRawFrame, LLMFullResponseStartFrame, LLMFullResponseEndFrame
 from pipecat.runner.utils import parse_telephony_websocket
 from pipecat.serializers.plivo import PlivoFrameSerializer
 from pipecat.services.google.llm import GoogleLLMService
@@ -52,12 +56,11 @@ from pipecat.transports.websocket.fastapi import (
     FastAPIWebsocketTransport,
 )
 from openai import OpenAI
-import httpx
+from http_clients import http_clients
+from greeting_service import read_greeting_pcm
 from dateutil import parser as date_parser
 import aiofiles  # NEW: For async file I/O
 
-load_dotenv(override=True)
-
 
 # ============================================================================
 # PER-CALL STATE CONTAINER (NO MORE GLOBALS!)
@@ -381,12 +384,11 @@ class EndCallDetector(FrameProcessor):
             
             url = f"https://api.plivo.com/v1/Account/{auth_id}/Call/{self.plivo_call_id}/"
             
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    url,
-                    auth=(auth_id, auth_token),
-                    timeout=10.0
-                )
+            response = await http_clients.get("plivo").delete(
+                url,
+                auth=(auth_id, auth_token),
+                timeout=10.0
+            )
             
             if response.status_code == 204:
                 logger.info(f"[{self.call_state.call_uuid}] Successfully hung up call")
@@ -589,7 +591,7 @@ async def write_simple_summary(transcript_file: str, call_state: CallState, reas
 # MAIN BOT FUNCTION (UPDATED TO USE CALL_STATE)
 # ============================================================================
 
-async def run_bot(transport: BaseTransport, handle_sigint: bool, custom_data: dict = None, call_uuid: str = None, call_data: dict = None):
+async def run_bot(transport: BaseTransport, handle_sigint: bool, custom_data: dict = None, call_uuid: str = None, call_data: dict = None, greeting_audio: str = None):
     """
     Main bot function - now with per-call state!
     
@@ -598,6 +600,8 @@ async def run_bot(transport: BaseTransport, handle_sigint: bool, custom_data: di
     - Uses async file I/O (aiofiles)
     - Determines smart status on disconnect
     - Conditionally generates AI summary (cost optimization)
+    
+    greeting_audio: WAV (path or file object) sent as the first audio on the stream (GREETING_DELIVERY=stream)
     """
     
     # CREATE PER-CALL STATE (replaces all globals!)
@@ -831,6 +835,17 @@ async def run_bot(transport: BaseTransport, handle_sigint: bool, custom_data: di
         call_state.start_time = asyncio.get_event_loop().time()
         call_state.greeting_started = True
         
+        if greeting_audio:
+            # Straight to the output transport; as TTS audio it raises BotStoppedSpeaking when done
+            try:
+                audio, sample_rate = read_greeting_pcm(greeting_audio)
+                await transport.output().queue_frame(
+                    TTSAudioRawFrame(audio=audio, sample_rate=sample_rate, num_channels=1)
+                )
+                logger.info(f"[{call_state.call_uuid}] Streaming greeting ({len(audio) / 2 / sample_rate:.1f}s)")
+            except Exception as e:
+                logger.error(f"[{call_state.call_uuid}] Could not stream greeting: {e}")
+        
         try:
             # Create transcript file with header (ASYNC!)
             async with aiofiles.open(call_state.transcript_file, "w", encoding="utf-8") as f:
@@ -903,8 +918,8 @@ async def run_bot(transport: BaseTransport, handle_sigint: bool, custom_data: di
             
             # UPDATE DATABASE WITH FINAL STATUS
             try:
-                from database import Database
-                db_instance = Database()
+                from database import get_async_db
+                db_instance = get_async_db()
                 
                 # Calculate duration
                 duration = 0
@@ -912,21 +927,17 @@ async def run_bot(transport: BaseTransport, handle_sigint: bool, custom_data: di
                     duration = asyncio.get_event_loop().time() - call_state.start_time
                 
                 # Update database
-                db_instance.update_call_status(
+                ended_at = datetime.now().isoformat()
+                await db_instance.update_call_status(
                     call_uuid,
                     final_status,
-                    ended_at=datetime.now().isoformat()
+                    ended_at=ended_at
                 )
                 
-                # Update in-memory store (safe runtime import to avoid circular dependency)
-                import sys
-                if 'server' in sys.modules:
-                    from server import call_data_store
-                    if call_uuid in call_data_store:
-                        call_data_store[call_uuid]["status"] = final_status
-                        logger.info(f"[{call_uuid}] In-memory store updated")
-                else:
-                    logger.warning(f"[{call_uuid}] Server module not loaded, skipping in-memory update")
+                # Notify dashboards subscribed to this user's call events; the live call
+                # state (in this worker and, when shared, in the others) follows the event
+                from events import call_events
+                call_events.publish(call_uuid, final_status, user_id=call_state.user_id, ended_at=ended_at)
                 
                 logger.info(f"[{call_uuid}] DB updated with status: {final_status}")
             except Exception as e:
@@ -947,6 +958,7 @@ async def bot(runner_args):
     # Extract custom data and call UUID from websocket state
     custom_data = getattr(runner_args.websocket.state, 'custom_data', {})
     call_uuid = getattr(runner_args.websocket.state, 'call_uuid', None)
+    greeting_audio = getattr(runner_args.websocket.state, 'greeting_audio', None)
     
     logger.info(f"Bot received call_uuid: {call_uuid}")
     logger.info(f"Bot received custom_data (customer info redacted for security)")
@@ -976,4 +988,5 @@ async def bot(runner_args):
     handle_sigint = runner_args.handle_sigint
     
     # Pass custom data, call UUID, and call_data to run_bot
-    await run_bot(transport, handle_sigint, custom_data=custom_data, call_uuid=call_uuid, call_data=call_data)
+    await run_bot(transport, handle_sigint, custom_data=custom_data, call_uuid=call_uuid, call_data=call_data,
+                  greeting_audio=greeting_audio)
@@ -0,0 +1,144 @@
+"""
+Live call registry
+
+Replaces the call_data_store dict that kept every call since boot: per-call
+state lives in compact slotted records, and calls that reached a final status
+are evicted CALL_RECORD_TTL seconds later. Their history stays in SQLite,
+which is where get_call_state and /calls read evicted calls from.
+"""
+
+import os
+import time
+from collections import deque
+
+from dispatcher import TERMINAL_STATUSES
+
+# Seconds a finished call stays in memory (late webhooks and dashboard reads hit it there)
+CALL_RECORD_TTL = float(os.getenv("CALL_RECORD_TTL", "300"))
+
+# Record cap; past it, finished calls are evicted before their TTL (live calls never are)
+CALL_REGISTRY_MAX = int(os.getenv("CALL_REGISTRY_MAX", "100000"))
+
+# Call event fields that are copied onto the call's record
+EVENT_FIELDS = ("status", "ended_at", "hangup_cause", "hangup_source")
+
+
+class CallRecord:
+    """
+    One call's in-memory state, with dict-style access
+
+    Unset fields behave like missing keys: record["ended_at"] raises KeyError
+    and record.get("ended_at", default) returns the default.
+    """
+
+    __slots__ = (
+        "phone_number", "custom_data", "status", "created_at", "plivo_call_uuid", "user_id",
+        "greeting_text", "greeting_start_time", "answer_xml", "hangup_cause", "hangup_source", "ended_at"
+    )
+    FIELDS = frozenset(__slots__)
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(f"Unknown call field '{key}'")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__ if hasattr(self, key)}
+
+
+class LiveCallRegistry:
+    """
+    call_uuid -> CallRecord, evicting finished calls after a TTL
+
+    Finished calls are noticed when a record is stored with a final status and
+    through on_call_event (registered as a call_events listener); eviction runs
+    as part of those updates, so no background task is needed.
+    """
+
+    def __init__(self, ttl=CALL_RECORD_TTL, max_records=CALL_REGISTRY_MAX, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_records = max_records
+        self.clock = clock
+        self._records = {}
+        self._finished = deque()  # (finished_at, call_uuid), oldest first
+        self.evicted = 0
+
+    def __setitem__(self, call_uuid, record):
+        if not isinstance(record, CallRecord):
+            record = CallRecord(**record)
+        # Evict first, so the record being stored is always there right after
+        self.evict()
+        self._records[call_uuid] = record
+        if record.get("status") in TERMINAL_STATUSES:
+            self._finished.append((self.clock(), call_uuid))
+
+    def __getitem__(self, call_uuid):
+        return self._records[call_uuid]
+
+    def __contains__(self, call_uuid):
+        return call_uuid in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, call_uuid, default=None):
+        return self._records.get(call_uuid, default)
+
+    def pop(self, call_uuid, default=None):
+        return self._records.pop(call_uuid, default)
+
+    def on_call_event(self, event):
+        """
+        call_events listener - applies the change to the call's record and
+        starts the eviction clock when a call finishes
+
+        Changes published by bot.py or by another worker reach the record this way.
+        """
+        record = self._records.get(event["call_uuid"])
+        if record is not None:
+            for key in EVENT_FIELDS:
+                if key in event:
+                    record[key] = event[key]
+            if event["status"] in TERMINAL_STATUSES:
+                self._finished.append((self.clock(), event["call_uuid"]))
+        self.evict()
+
+    def evict(self):
+        """Drop finished calls older than the TTL (or the oldest ones while over max_records)"""
+        expired_before = self.clock() - self.ttl
+        while self._finished and (self._finished[0][0] <= expired_before or len(self._records) > self.max_records):
+            _, call_uuid = self._finished.popleft()
+            record = self._records.get(call_uuid)
+            # Skip calls already evicted, or stored again since with a live status
+            if record is not None and record.get("status") in TERMINAL_STATUSES:
+                del self._records[call_uuid]
+                self.evicted += 1
+
+    def stats(self):
+        return {
+            "records": len(self._records),
+            "finished_pending_eviction": len(self._finished),
+            "evicted": self.evicted,
+            "ttl": self.ttl
+        }
@@ -1,26 +1,239 @@
+import os
+import asyncio
 import sqlite3
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from passlib.context import CryptContext
 from loguru import logger
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# SQLite tuning (override via environment)
+DB_PATH = os.getenv("DB_PATH", "data/users.db")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # NORMAL is durable enough in WAL mode
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5.0"))
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "4"))  # Concurrent SQLite calls from async code
+
+
+class ConnectionPool:
+    """
+    Per-thread SQLite connection pool
+    Each thread opens one connection on first use and keeps reusing it,
+    so webhooks no longer pay a connect/close per query.
+    """
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.opened = 0
+        self.reused = 0
+    
+    def _open(self):
+        """Open a new connection with WAL journal mode and tuned pragmas"""
+        # check_same_thread=False only so close_all() can run from the shutdown thread;
+        # each connection is still used exclusively by the thread that opened it
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        
+        with self._lock:
+            self._connections.append(conn)
+            self.opened += 1
+        
+        logger.debug(f"Opened SQLite connection for thread {threading.current_thread().name}")
+        return conn
+    
+    def acquire(self):
+        """Get the calling thread's connection, opening it if needed"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        else:
+            # Called from every executor thread; unguarded += would lose counts
+            with self._lock:
+                self.reused += 1
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Yield the thread's connection; commit on success, roll back on error"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def close_all(self):
+        """Close every pooled connection (call on shutdown)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.warning(f"Error closing SQLite connection: {e}")
+        self._local = threading.local()
+    
+    def stats(self):
+        """Pool counters for health/metrics endpoints"""
+        with self._lock:
+            return {
+                "open_connections": len(self._connections),
+                "opened": self.opened,
+                "reused": self.reused,
+            }
+
+
+# ============================================================================
+# SCHEMA MIGRATIONS
+# ============================================================================
+
+# Ordered (version, description, steps). A step is a SQL string or a callable(conn).
+# Append new entries only - never edit or reorder a migration that has shipped.
+MIGRATIONS = [
+    (1, "Index calls by user and recency (get_calls, exports per user, keyset pages)", [
+        "CREATE INDEX IF NOT EXISTS idx_calls_user_created ON calls (user_id, created_at, call_uuid)",
+    ]),
+    (2, "Index calls by recency (super admin all-users listing, keyset pages)", [
+        "CREATE INDEX IF NOT EXISTS idx_calls_created ON calls (created_at, call_uuid)",
+    ]),
+    (3, "Index calls by user and status (status export)", [
+        "CREATE INDEX IF NOT EXISTS idx_calls_user_status_created ON calls (user_id, status, created_at)",
+    ]),
+    (4, "Index customer_data by call_uuid (calls/customer_data joins)", [
+        "CREATE INDEX IF NOT EXISTS idx_customer_data_call_uuid ON customer_data (call_uuid)",
+    ]),
+    (5, "Change sequence on calls for /calls/changes delta polling", [
+        "ALTER TABLE calls ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE calls ADD COLUMN updated_at TIMESTAMP",
+        # Existing rows get distinct sequence numbers in insertion order
+        "UPDATE calls SET change_seq = rowid, updated_at = COALESCE(ended_at, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_calls_change_seq ON calls (change_seq)",
+        "CREATE INDEX IF NOT EXISTS idx_calls_user_change_seq ON calls (user_id, change_seq)",
+    ]),
+    (6, "Durable call queue: dial priority and status lookup for startup rehydration", [
+        "ALTER TABLE calls ADD COLUMN priority INTEGER NOT NULL DEFAULT 0",
+        "CREATE INDEX IF NOT EXISTS idx_calls_status_created ON calls (status, created_at)",
+    ]),
+]
+
+# Next value of the calls change sequence. Writers are serialized by SQLite, so
+# sequence numbers are unique and become visible in commit order.
+NEXT_CHANGE_SEQ = "(SELECT COALESCE(MAX(change_seq), 0) + 1 FROM calls)"
+
+# Columns selectable through get_calls_page(fields=...), keyed by API field name
+CALL_LIST_COLUMNS = {
+    "call_uuid": "c.call_uuid",
+    "phone_number": "c.phone_number",
+    "customer_name": "c.customer_name",
+    "invoice_number": "c.invoice_number",
+    "status": "c.status",
+    "user_id": "c.user_id",
+    "created_at": "c.created_at",
+    "ended_at": "c.ended_at",
+    "hangup_cause": "c.hangup_cause",
+    "hangup_source": "c.hangup_source",
+    "custom_data": "c.custom_data",
+    "plivo_call_uuid": "c.plivo_call_uuid",
+    "change_seq": "c.change_seq",
+    "updated_at": "c.updated_at",
+    "whatsapp_number": "cd.whatsapp_number",
+    "email": "cd.email",
+}
+
+
 class Database:
-    def __init__(self, db_path="data/users.db"):
+    def __init__(self, db_path=DB_PATH):
         self.db_path = db_path
         # Ensure data directory exists
-        import os
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.pool = ConnectionPool(db_path)
         self.init_db()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Return the calling thread's pooled connection (do not close it)"""
+        return self.pool.acquire()
+    
+    def connection(self):
+        """Transaction-scoped access to the pooled connection"""
+        return self.pool.connection()
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close_all()
     
     def init_db(self):
-        """Initialize database with users and calls tables"""
+        """Initialize database with users and calls tables, then apply pending migrations"""
+        with self.connection() as conn:
+            self._create_tables(conn)
+        self.migrate()
+    
+    def get_schema_version(self):
+        """Highest applied migration version (0 for a fresh or pre-migration database)"""
         conn = self.get_connection()
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        return row[0] or 0
+    
+    def migrate(self):
+        """Apply pending MIGRATIONS in order, each in its own transaction"""
+        conn = self.get_connection()
+        
+        for version, description, steps in MIGRATIONS:
+            if version <= self.get_schema_version():
+                continue
+            
+            # IMMEDIATE takes the write lock up front so two processes starting
+            # together cannot both apply the same migration
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the lock in case another process just applied it
+                current = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+                if version <= current:
+                    conn.rollback()
+                    continue
+                
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                
+                conn.execute(
+                    "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                    (version, description, datetime.now().isoformat())
+                )
+                conn.commit()
+                logger.info(f"Applied schema migration {version}: {description}")
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Schema migration {version} failed: {e}")
+                raise
+        
+        # Refresh planner statistics for any new indexes
+        conn.execute("PRAGMA optimize")
+    
+    def _create_tables(self, conn):
         cursor = conn.cursor()
         
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP NOT NULL
+            )
+        """)
+        
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -77,9 +290,6 @@ class Database:
                 VALUES (?, ?, ?, ?)
             """, ("admin", "admin@hummingbird.com", password_hash, "super_admin"))
             logger.info("Default super admin created: username='admin', password='admin123'")
-        
-        conn.commit()
-        conn.close()
     
     def create_user(self, username, email, password, role="user"):
         """Create a new user"""
@@ -98,10 +308,9 @@ class Database:
             logger.info(f"User created: {username} (ID: {user_id}, Role: {role})")
             return user_id
         except sqlite3.IntegrityError as e:
+            conn.rollback()
             logger.error(f"Error creating user: {e}")
             raise Exception("Username or email already exists")
-        finally:
-            conn.close()
     
     def get_user_by_username(self, username):
         """Get user by username"""
@@ -110,7 +319,6 @@ class Database:
         
         cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return {
@@ -131,7 +339,6 @@ class Database:
         
         cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return {
@@ -152,7 +359,6 @@ class Database:
         
         cursor.execute("SELECT id, username, email, role, created_at, is_active FROM users ORDER BY created_at DESC")
         rows = cursor.fetchall()
-        conn.close()
         
         return [
             {
@@ -183,7 +389,6 @@ class Database:
             params.append(1 if is_active else 0)
         
         if not updates:
-            conn.close()
             return
         
         params.append(user_id)
@@ -191,7 +396,6 @@ class Database:
         
         cursor.execute(query, params)
         conn.commit()
-        conn.close()
         logger.info(f"User {user_id} updated")
     
     def delete_user(self, user_id):
@@ -201,7 +405,6 @@ class Database:
         
         cursor.execute("UPDATE users SET is_active = 0 WHERE id = ?", (user_id,))
         conn.commit()
-        conn.close()
         logger.info(f"User {user_id} deactivated")
     
     def change_password(self, user_id, new_password):
@@ -212,7 +415,6 @@ class Database:
         password_hash = pwd_context.hash(new_password)
         cursor.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
         conn.commit()
-        conn.close()
         logger.info(f"Password changed for user {user_id}")
     
     def verify_password(self, plain_password, password_hash):
@@ -231,26 +433,86 @@ class Database:
         cursor = conn.cursor()
         
         try:
-            cursor.execute("""
-                INSERT INTO calls (call_uuid, phone_number, customer_name, invoice_number, status, user_id, created_at, custom_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (call_uuid, phone_number, customer_name, invoice_number, "initiated", user_id, created_at, json.dumps(custom_data)))
+            cursor.execute(f"""
+                INSERT INTO calls (call_uuid, phone_number, customer_name, invoice_number, status, user_id, created_at, custom_data,
+                                   change_seq, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, {NEXT_CHANGE_SEQ}, ?)
+            """, (call_uuid, phone_number, customer_name, invoice_number, "initiated", user_id, created_at, json.dumps(custom_data),
+                  created_at))
             
             conn.commit()
             logger.info(f"Call record created: {call_uuid}")
         except Exception as e:
+            conn.rollback()
             logger.error(f"Error creating call record: {e}")
-        finally:
-            conn.close()
-    
-    def update_call_status(self, call_uuid, status, ended_at=None, hangup_cause=None, hangup_source=None, plivo_call_uuid=None):
-        """Update call status and related fields"""
+
+    def create_calls_bulk(self, calls, user_id, status="queued"):
+        """
+        Insert many calls plus their customer_data rows in a single transaction
+
+        Args:
+            calls: list of dicts with call_uuid, phone_number, custom_data, created_at
+                   and optionally priority
+            user_id: owner of every call in the batch
+            status: initial status (batch calls go straight to "queued")
+
+        Raises on failure so the caller never enqueues calls that were not persisted.
+        """
+        import json
+
+        call_rows = []
+        customer_rows = []
+        for call in calls:
+            custom_data = call.get("custom_data") or {}
+            call_rows.append((
+                call["call_uuid"], call["phone_number"],
+                custom_data.get("customer_name", ""), custom_data.get("invoice_number", ""),
+                status, user_id, call["created_at"], json.dumps(custom_data), call["created_at"],
+                call.get("priority", 0)
+            ))
+            customer_rows.append((
+                call["call_uuid"], custom_data.get("customer_name", ""), call["phone_number"],
+                custom_data.get("whatsapp_number", ""), custom_data.get("email", ""),
+                custom_data.get("invoice_number", ""), custom_data.get("invoice_date", ""),
+                custom_data.get("total_amount", ""), custom_data.get("outstanding_balance", ""),
+                call["created_at"]
+            ))
+
+        try:
+            with self.connection() as conn:
+                conn.executemany(f"""
+                    INSERT INTO calls (call_uuid, phone_number, customer_name, invoice_number, status, user_id, created_at, custom_data,
+                                       change_seq, updated_at, priority)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, {NEXT_CHANGE_SEQ}, ?, ?)
+                """, call_rows)
+                conn.executemany("""
+                    INSERT INTO customer_data
+                    (call_uuid, customer_name, phone_number, whatsapp_number, email,
+                     invoice_number, invoice_date, total_amount, outstanding_balance, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, customer_rows)
+        except Exception as e:
+            logger.error(f"Error bulk inserting {len(call_rows)} calls: {e}")
+            raise
+
+        logger.info(f"Bulk inserted {len(call_rows)} calls with status '{status}' for user {user_id}")
+        return len(call_rows)
+
+    def update_call_status(self, call_uuid, status, ended_at=None, hangup_cause=None, hangup_source=None, plivo_call_uuid=None,
+                           only_from=None):
+        """
+        Update call status and related fields
+
+        With only_from (statuses), the row is updated only while its status is one
+        of them. Returns whether a row was updated.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            updates = ["status = ?"]
-            params = [status]
+            # Every update bumps change_seq so /calls/changes can return only changed rows
+            updates = ["status = ?", f"change_seq = {NEXT_CHANGE_SEQ}", "updated_at = ?"]
+            params = [status, datetime.now().isoformat()]
             
             if ended_at is not None:
                 updates.append("ended_at = ?")
@@ -270,14 +532,21 @@ class Database:
             
             params.append(call_uuid)
             query = f"UPDATE calls SET {', '.join(updates)} WHERE call_uuid = ?"
+            if only_from is not None:
+                only_from = list(only_from)
+                query += f" AND status IN ({', '.join('?' * len(only_from))})"
+                params.extend(only_from)
             
             cursor.execute(query, params)
             conn.commit()
+            if cursor.rowcount == 0:
+                return False
             logger.info(f"Call {call_uuid} status updated to: {status}")
+            return True
         except Exception as e:
+            conn.rollback()
             logger.error(f"Error updating call status: {e}")
-        finally:
-            conn.close()
+            return False
     
     def get_calls(self, user_id=None):
         """Get all calls or filter by user_id, including customer data"""
@@ -288,7 +557,9 @@ class Database:
         
         # Join calls with customer_data to get whatsapp_number and email
         query = """
-            SELECT c.*, cd.whatsapp_number, cd.email
+            SELECT c.call_uuid, c.phone_number, c.customer_name, c.invoice_number, c.status, c.user_id,
+                   c.created_at, c.ended_at, c.hangup_cause, c.hangup_source, c.custom_data, c.plivo_call_uuid,
+                   cd.whatsapp_number, cd.email
             FROM calls c
             LEFT JOIN customer_data cd ON c.call_uuid = cd.call_uuid
             WHERE 1=1
@@ -302,7 +573,6 @@ class Database:
             cursor.execute(query, (user_id,))
         
         rows = cursor.fetchall()
-        conn.close()
         
         calls = []
         for row in rows:
@@ -330,6 +600,176 @@ class Database:
         
         return calls
     
+    def get_calls_page(self, user_id=None, limit=None, after=None, statuses=None,
+                       start_date=None, end_date=None, search=None, fields=None):
+        """
+        Keyset-paginated call listing, newest first, with filters pushed into SQL
+        
+        Args:
+            user_id: restrict to one user (None = all users)
+            limit: page size (None = no limit)
+            after: (created_at, call_uuid) of the last row of the previous page
+            statuses: list of statuses to include
+            start_date / end_date: inclusive YYYY-MM-DD bounds on created_at
+            search: substring match on customer name, invoice number or phone number
+            fields: CALL_LIST_COLUMNS keys to return (None = all); call_uuid and
+                    created_at are always included because the cursor needs them
+        
+        Returns:
+            (calls, next_after) - next_after is None on the last page
+        """
+        import json
+        from datetime import date, timedelta
+        
+        if fields:
+            fields = [f for f in CALL_LIST_COLUMNS if f in set(fields) | {"call_uuid", "created_at"}]
+        else:
+            fields = list(CALL_LIST_COLUMNS)
+        
+        query = f"SELECT {', '.join(CALL_LIST_COLUMNS[f] for f in fields)} FROM calls c"
+        # Only join customer_data when one of its columns was requested
+        if any(CALL_LIST_COLUMNS[f].startswith("cd.") for f in fields):
+            query += " LEFT JOIN customer_data cd ON c.call_uuid = cd.call_uuid"
+        query += " WHERE 1=1"
+        params = []
+        
+        if user_id is not None:
+            query += " AND c.user_id = ?"
+            params.append(user_id)
+        
+        if statuses:
+            query += f" AND c.status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        
+        # created_at is an ISO string, so date bounds compare lexicographically
+        if start_date:
+            query += " AND c.created_at >= ?"
+            params.append(date.fromisoformat(start_date).isoformat())
+        
+        if end_date:
+            query += " AND c.created_at < ?"
+            params.append((date.fromisoformat(end_date) + timedelta(days=1)).isoformat())
+        
+        if search:
+            # Search text is matched literally: LIKE wildcards in it are escaped
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = f"%{escaped}%"
+            query += (" AND (c.customer_name LIKE ? ESCAPE '\\' OR c.invoice_number LIKE ? ESCAPE '\\'"
+                      " OR c.phone_number LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern, pattern])
+        
+        if after:
+            query += " AND (c.created_at, c.call_uuid) < (?, ?)"
+            params.extend(after)
+        
+        query += " ORDER BY c.created_at DESC, c.call_uuid DESC"
+        
+        if limit is not None:
+            # Fetch one extra row to know whether another page exists
+            query += " LIMIT ?"
+            params.append(limit + 1)
+        
+        conn = self.get_connection()
+        rows = conn.execute(query, params).fetchall()
+        
+        has_more = limit is not None and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        
+        calls = []
+        for row in rows:
+            call = dict(zip(fields, row))
+            if "custom_data" in call:
+                try:
+                    call["custom_data"] = json.loads(call["custom_data"]) if call["custom_data"] else {}
+                except:
+                    call["custom_data"] = {}
+            calls.append(call)
+        
+        next_after = (calls[-1]["created_at"], calls[-1]["call_uuid"]) if has_more else None
+        return calls, next_after
+    
+    def get_max_change_seq(self):
+        """Current high-water mark of the calls change sequence"""
+        conn = self.get_connection()
+        row = conn.execute("SELECT MAX(change_seq) FROM calls").fetchone()
+        return row[0] or 0
+    
+    def get_call_changes(self, since, user_id=None, limit=500, fields=None):
+        """
+        Calls whose change_seq is greater than `since`, oldest change first
+        
+        Returns:
+            (calls, last_seq) - pass last_seq back as `since` on the next poll
+        """
+        if fields:
+            fields = [f for f in CALL_LIST_COLUMNS if f in set(fields) | {"call_uuid", "change_seq"}]
+        else:
+            fields = ["call_uuid", "status", "ended_at", "updated_at", "change_seq"]
+        
+        query = f"SELECT {', '.join(CALL_LIST_COLUMNS[f] for f in fields)} FROM calls c"
+        if any(CALL_LIST_COLUMNS[f].startswith("cd.") for f in fields):
+            query += " LEFT JOIN customer_data cd ON c.call_uuid = cd.call_uuid"
+        query += " WHERE c.change_seq > ?"
+        params = [since]
+        
+        if user_id is not None:
+            query += " AND c.user_id = ?"
+            params.append(user_id)
+        
+        query += " ORDER BY c.change_seq LIMIT ?"
+        params.append(limit)
+        
+        conn = self.get_connection()
+        rows = conn.execute(query, params).fetchall()
+        
+        calls = [dict(zip(fields, row)) for row in rows]
+        if "custom_data" in fields:
+            import json
+            for call in calls:
+                try:
+                    call["custom_data"] = json.loads(call["custom_data"]) if call["custom_data"] else {}
+                except:
+                    call["custom_data"] = {}
+        
+        last_seq = calls[-1]["change_seq"] if calls else since
+        return calls, last_seq
+    
+    def get_calls_by_status(self, statuses):
+        """
+        All calls currently in one of `statuses`, oldest first
+        
+        Used at startup to rehydrate the dispatcher queue and live call state.
+        """
+        import json
+        
+        placeholders = ", ".join("?" for _ in statuses)
+        conn = self.get_connection()
+        rows = conn.execute(f"""
+            SELECT call_uuid, phone_number, status, user_id, created_at, custom_data, plivo_call_uuid, priority
+            FROM calls
+            WHERE status IN ({placeholders})
+            ORDER BY created_at
+        """, list(statuses)).fetchall()
+        
+        calls = []
+        for row in rows:
+            try:
+                custom_data = json.loads(row[5]) if row[5] else {}
+            except:
+                custom_data = {}
+            calls.append({
+                "call_uuid": row[0],
+                "phone_number": row[1],
+                "status": row[2],
+                "user_id": row[3],
+                "created_at": row[4],
+                "custom_data": custom_data,
+                "plivo_call_uuid": row[6],
+                "priority": row[7]
+            })
+        return calls
+    
     def get_call(self, call_uuid):
         """Get a single call by UUID"""
         import json
@@ -339,7 +779,6 @@ class Database:
         
         cursor.execute("SELECT * FROM calls WHERE call_uuid = ?", (call_uuid,))
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             try:
@@ -385,9 +824,8 @@ class Database:
             conn.commit()
             logger.info(f"Customer data inserted for call {call_uuid}")
         except Exception as e:
+            conn.rollback()
             logger.error(f"Error inserting customer data: {e}")
-        finally:
-            conn.close()
     
     def get_customer_data_by_call_uuid(self, call_uuid):
         """Get customer data for a specific call"""
@@ -396,7 +834,6 @@ class Database:
         
         cursor.execute("SELECT * FROM customer_data WHERE call_uuid = ?", (call_uuid,))
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return {
@@ -450,7 +887,6 @@ class Database:
         
         cursor.execute(query, params)
         rows = cursor.fetchall()
-        conn.close()
         
         results = []
         for row in rows:
@@ -503,7 +939,6 @@ class Database:
         
         cursor.execute(query, params)
         rows = cursor.fetchall()
-        conn.close()
         
         results = []
         for row in rows:
@@ -522,3 +957,78 @@ class Database:
             })
         
         return results
+
+
+# ============================================================================
+# ASYNC ACCESS LAYER
+# ============================================================================
+
+class AsyncDatabase:
+    """
+    Awaitable facade over Database for async endpoints and the bot
+    Every call runs on a dedicated, bounded thread pool so SQLite I/O (and bcrypt)
+    never blocks the event loop that also drives live voice pipelines.
+    Each worker thread keeps its own pooled connection.
+    
+    Usage: user = await adb.get_user_by_id(user_id)
+    """
+    
+    def __init__(self, database, max_workers=DB_MAX_WORKERS):
+        self.db = database
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+    
+    async def run(self, func, *args, **kwargs):
+        """Run any blocking callable on the database executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+        
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        
+        method.__name__ = name
+        method.__doc__ = attr.__doc__
+        return method
+    
+    def close(self):
+        """Drain the executor, then close the pooled connections"""
+        self._executor.shutdown(wait=True)
+        self.db.close()
+
+
+# ============================================================================
+# SHARED INSTANCE / FASTAPI DEPENDENCY
+# ============================================================================
+
+_default_db = None
+_default_async_db = None
+_default_db_lock = threading.Lock()
+
+
+def get_db():
+    """
+    Return the process-wide Database (and its connection pool)
+    Usable directly or as a FastAPI dependency: db = Depends(get_db)
+    """
+    global _default_db
+    if _default_db is None:
+        with _default_db_lock:
+            if _default_db is None:
+                _default_db = Database()
+    return _default_db
+
+
+def get_async_db():
+    """Return the process-wide AsyncDatabase wrapping get_db() (also a FastAPI dependency)"""
+    global _default_async_db
+    if _default_async_db is None:
+        database = get_db()
+        with _default_db_lock:
+            if _default_async_db is None:
+                _default_async_db = AsyncDatabase(database)
+    return _default_async_db
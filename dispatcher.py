@@ -0,0 +1,326 @@
+"""
+Concurrent outbound call dispatcher
+
+Replaces the strictly sequential call queue: up to MAX_CONCURRENT_CALLS calls
+are dialed at once, and queued calls are taken round-robin across users so one
+large batch cannot starve everyone else. Within a user's queue, calls are
+ordered by an explicit priority and then by CALL_PRIORITY_STRATEGY.
+"""
+
+import os
+import re
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from collections import deque
+from datetime import datetime
+from loguru import logger
+
+# Calls allowed in flight at once (dialing, ringing or connected)
+MAX_CONCURRENT_CALLS = int(os.getenv("MAX_CONCURRENT_CALLS", "5"))
+
+# A call that never reports a final status releases its slot after this long
+CALL_MAX_DURATION = float(os.getenv("CALL_MAX_DURATION", "600"))
+
+# Ordering of each user's queue after explicit priority: balance, invoice_age, cutoff_date or fifo
+CALL_PRIORITY_STRATEGY = os.getenv("CALL_PRIORITY_STRATEGY", "balance")
+
+# Recent calls used to estimate how long a call holds its slot
+CALL_DURATION_SAMPLES = 50
+
+# Final statuses: a call in one no longer occupies a dialer slot (or needs its live record).
+# Dial and hangup outcomes, plus the outcome statuses set by the bot after a conversation
+TERMINAL_STATUSES = {
+    "completed", "failed", "declined", "invalid", "out_of_service",
+    "nonexistent", "unallocated", "not_reachable",
+    "completed_conversation", "completed_commitment", "completed_partial",
+    "abandoned_pre_greeting", "abandoned_post_greeting", "abandoned_early", "no_response"
+}
+
+
+def _parse_amount(value):
+    """'rupees 1,25,000.50' -> 125000.5 (None if there is no number)"""
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", str(value or ""))
+    return float(match.group().replace(",", "")) if match else None
+
+
+def _parse_date(value):
+    """Parse the date formats found in uploaded sheets (None if unparseable)"""
+    text = str(value or "").strip()[:10]
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _by_balance(custom_data):
+    """Highest outstanding balance first"""
+    amount = _parse_amount(custom_data.get("outstanding_balance"))
+    return -amount if amount is not None else math.inf
+
+
+def _by_invoice_age(custom_data):
+    """Oldest invoice first"""
+    invoice_date = _parse_date(custom_data.get("invoice_date"))
+    return invoice_date.timestamp() if invoice_date else math.inf
+
+
+def _by_cutoff_date(custom_data):
+    """Earliest cutoff date first"""
+    cutoff_date = _parse_date(custom_data.get("cutoff_date"))
+    return cutoff_date.timestamp() if cutoff_date else math.inf
+
+
+# Lower value = dialed sooner. Calls without the field go last.
+PRIORITY_STRATEGIES = {
+    "balance": _by_balance,
+    "invoice_age": _by_invoice_age,
+    "cutoff_date": _by_cutoff_date,
+    "fifo": lambda custom_data: 0,
+}
+
+
+class CallDispatcher:
+    """
+    Fair, bounded-concurrency dispatcher for queued calls
+
+    process_call(call_data) dials one call. The slot is held until
+    call_finished(call_uuid) is signalled (terminal status) or call_timeout
+    passes; get_status(call_uuid) catches calls that ended before we waited.
+    """
+
+    def __init__(self, process_call, get_status, max_concurrent=MAX_CONCURRENT_CALLS,
+                 call_timeout=CALL_MAX_DURATION, priority=CALL_PRIORITY_STRATEGY):
+        if priority not in PRIORITY_STRATEGIES:
+            raise ValueError(f"Unknown priority strategy '{priority}' (choose from {', '.join(PRIORITY_STRATEGIES)})")
+        self.process_call = process_call
+        self.get_status = get_status
+        self.max_concurrent = max_concurrent
+        self.call_timeout = call_timeout
+        self.priority = priority
+        self._priority_key = PRIORITY_STRATEGIES[priority]
+
+        # user_id -> heap of (sort_key, call_data); _users is the round-robin order
+        self._queues = {}
+        self._users = deque()
+        self._queued = {}  # call_uuid -> (user_id, sort_key)
+        self._seq = itertools.count()
+        self._in_flight = {}
+        self._completions = {}  # call_uuid -> asyncio.Event set on terminal status
+        self._tasks = set()
+        self._queue_listeners = []
+        self._wakeup = asyncio.Event()
+        self._durations = deque(maxlen=CALL_DURATION_SAMPLES)
+        self.dispatched = 0
+
+    def enqueue(self, call_data, user_id=None, priority=0):
+        """
+        Queue a call (dict with at least call_uuid, phone_number, custom_data)
+
+        Higher explicit priority is dialed first; ties are ordered by the
+        dispatcher's strategy, then by arrival.
+        """
+        sort_key = (-priority, self._priority_key(call_data.get("custom_data") or {}), next(self._seq))
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = []
+            self._users.append(user_id)
+        heapq.heappush(queue, (sort_key, call_data))
+        self._queued[call_data["call_uuid"]] = (user_id, sort_key)
+        self._wakeup.set()
+        self._queue_changed()
+
+    def add_queue_listener(self, callback):
+        """callback() is invoked whenever calls are queued or taken off the queue"""
+        self._queue_listeners.append(callback)
+
+    def _queue_changed(self):
+        for callback in self._queue_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Queue listener error: {e}")
+
+    def _next_call(self):
+        """Pop the next call, rotating through users that have queued calls"""
+        user_id = self._users.popleft()
+        queue = self._queues[user_id]
+        sort_key, call_data = heapq.heappop(queue)
+        del self._queued[call_data["call_uuid"]]
+        if queue:
+            self._users.append(user_id)
+        else:
+            del self._queues[user_id]
+        self._queue_changed()
+        return user_id, -sort_key[0], call_data
+
+    def upcoming(self, n):
+        """The next n queued calls in the order they will be dialed"""
+        heads = [
+            [call_data for _, call_data in heapq.nsmallest(n, self._queues[user_id])]
+            for user_id in self._users
+        ]
+        # Interleave per-user heads the same way the round-robin takes them
+        calls = []
+        for turn in range(n):
+            for head in heads:
+                if turn < len(head):
+                    calls.append(head[turn])
+                    if len(calls) == n:
+                        return calls
+        return calls
+
+    def position(self, call_uuid):
+        """
+        1-based position in which a queued call will be dialed (None if not queued)
+
+        Exact for the current queue contents; later arrivals with higher
+        priority or from other users can move it back.
+        """
+        if call_uuid not in self._queued:
+            return None
+        user_id, sort_key = self._queued[call_uuid]
+        # Calls ahead of it in its own user's heap
+        rank = sum(1 for key, _ in self._queues[user_id] if key < sort_key)
+
+        # Round-robin: every other user gets `rank` turns first, plus one more
+        # if they come before this user in the rotation
+        ahead = rank
+        before_user = True
+        for other in self._users:
+            if other == user_id:
+                before_user = False
+                continue
+            ahead += min(len(self._queues[other]), rank + (1 if before_user else 0))
+        return ahead + 1
+
+    def __len__(self):
+        return len(self._queued)
+
+    def queued(self, user_id):
+        """Calls queued for one user"""
+        return len(self._queues.get(user_id, ()))
+
+    def active(self):
+        """Calls holding a slot (dialing, ringing or connected)"""
+        return len(self._in_flight)
+
+    def average_call_duration(self):
+        """Mean seconds a recent call held its slot (None before any call finished)"""
+        return sum(self._durations) / len(self._durations) if self._durations else None
+
+    async def run(self):
+        """Dispatch loop - run as a background task"""
+        logger.info(f"Call dispatcher started (max {self.max_concurrent} concurrent calls)")
+        while True:
+            try:
+                if not self._users or len(self._in_flight) >= self.max_concurrent:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                user_id, priority, call_data = self._next_call()
+                self._start(call_data, user_id, priority)
+                self.dispatched += 1
+            except Exception as e:
+                logger.error(f"Error in call dispatcher: {e}")
+                await asyncio.sleep(1)
+
+    def adopt(self, call_data, user_id=None):
+        """
+        Track a call that was already dialed (e.g. before a restart) as in flight,
+        so it holds a slot until it finishes without being dialed again
+        """
+        self._start(call_data, user_id, dial=False)
+
+    def requeue(self, call_data, delay, user_id=None, priority=0):
+        """
+        Put a call back in the queue after `delay` seconds (e.g. upstream throttling)
+
+        If the call is in flight its slot is released right away, and its user
+        and priority are kept.
+        """
+        call_uuid = call_data["call_uuid"]
+        info = self._in_flight.get(call_uuid)
+        if info is not None:
+            user_id, priority = info["user_id"], info["priority"]
+            self.call_finished(call_uuid)
+        asyncio.get_running_loop().call_later(delay, self.enqueue, call_data, user_id, priority)
+
+    def _start(self, call_data, user_id, priority=0, dial=True):
+        call_uuid = call_data["call_uuid"]
+        self._in_flight[call_uuid] = {
+            "user_id": user_id,
+            "priority": priority,
+            "phone_number": call_data.get("phone_number"),
+            "started_at": datetime.now().isoformat(),
+            "started": time.monotonic()
+        }
+        # Registered before dialing so an immediate failure isn't missed
+        self._completions[call_uuid] = asyncio.Event()
+
+        task = asyncio.create_task(self._run_call(call_data, dial))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_call(self, call_data, dial=True):
+        call_uuid = call_data["call_uuid"]
+        completion = self._completions[call_uuid]
+        try:
+            if dial:
+                result = await self.process_call(call_data)
+                logger.info(f"Call processed: {result}")
+
+            # Hold the slot until the call reaches a final status
+            status = self.get_status(call_uuid)
+            if status is not None and status not in TERMINAL_STATUSES:
+                try:
+                    await asyncio.wait_for(completion.wait(), timeout=self.call_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Call {call_uuid} reported no final status after {self.call_timeout:.0f}s, releasing slot")
+            logger.info(f"Call {call_uuid} finished with status: {self.get_status(call_uuid)}")
+        except Exception as e:
+            logger.error(f"Error dispatching call {call_uuid}: {e}")
+        finally:
+            # A requeued call may already be in flight again under a new completion event
+            if self._completions.get(call_uuid) is completion:
+                del self._completions[call_uuid]
+                info = self._in_flight.pop(call_uuid, None)
+                if info is not None:
+                    self._durations.append(time.monotonic() - info["started"])
+            self._wakeup.set()
+
+    def call_finished(self, call_uuid):
+        """Signal that a call reached a terminal status and its slot can be reused"""
+        completion = self._completions.get(call_uuid)
+        if completion is not None:
+            completion.set()
+
+    def on_call_event(self, event):
+        """call_events listener - frees the slot on any terminal status change"""
+        if event["status"] in TERMINAL_STATUSES:
+            self.call_finished(event["call_uuid"])
+
+    def stats(self, user_id=None, include_calls=True):
+        """Queue and in-flight counts; per-user details restricted to user_id when given"""
+        stats = {
+            "max_concurrent_calls": self.max_concurrent,
+            "in_flight": len(self._in_flight),
+            "queued": len(self),
+            "dispatched": self.dispatched,
+            "priority": self.priority
+        }
+        if include_calls:
+            stats["in_flight_calls"] = {
+                uuid: info for uuid, info in self._in_flight.items()
+                if user_id is None or info["user_id"] == user_id
+            }
+            queued_by_user = {uid: len(queue) for uid, queue in self._queues.items()}
+            if user_id is not None:
+                queued_by_user = {user_id: queued_by_user.get(user_id, 0)}
+            stats["queued_by_user"] = queued_by_user
+        return stats
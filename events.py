@@ -0,0 +1,115 @@
+"""
+In-process pub/sub for call status changes
+
+server.py and bot.py publish every status change here. Dashboards subscribe
+per user through the /calls/events stream instead of polling /calls.
+"""
+
+import os
+import asyncio
+import json
+from datetime import datetime
+from loguru import logger
+
+# Events buffered per subscriber before the oldest are dropped (slow client)
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+
+# Seconds between keep-alive comments on an idle stream
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+
+class CallEventBus:
+    """Fan out call status events to per-user subscriber queues"""
+
+    def __init__(self, queue_size=EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        # user_id -> set of queues; key None receives every user's events (super admin "all users")
+        self._subscribers = {}
+        self._listeners = []
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, call_uuid, status, user_id=None, **fields):
+        """
+        Publish a status change. Must be called from the event loop thread.
+
+        Extra keyword arguments (ended_at, hangup_cause, ...) are included in the event.
+        """
+        event = {
+            "call_uuid": call_uuid,
+            "status": status,
+            "user_id": user_id,
+            "timestamp": datetime.now().isoformat(),
+            **fields
+        }
+        self.published += 1
+
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Call event listener error for {call_uuid}: {e}")
+
+        targets = self._subscribers.get(None, set())
+        if user_id is not None:
+            targets = targets | self._subscribers.get(user_id, set())
+        for queue in targets:
+            self._deliver(queue, event)
+
+        return event
+
+    def _deliver(self, queue, event):
+        if queue.full():
+            # Slow consumer: drop the oldest event rather than block publishers
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(event)
+
+    def subscribe(self, user_id=None):
+        """Register a subscriber queue for one user's events (None = all users)"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, queue, user_id=None):
+        queues = self._subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def add_listener(self, callback):
+        """Register a synchronous callback invoked with every event (in-process consumers)"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    async def sse_stream(self, user_id=None, keepalive=EVENTS_KEEPALIVE_SECONDS):
+        """Server-Sent Events byte stream for one subscriber"""
+        queue = self.subscribe(user_id)
+        try:
+            # Tell the client it's connected so it can stop any fallback polling
+            yield b": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield f"event: call_status\ndata: {json.dumps(event)}\n\n".encode()
+        finally:
+            self.unsubscribe(queue, user_id)
+
+    def stats(self):
+        return {
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "listeners": len(self._listeners),
+            "published": self.published,
+            "dropped": self.dropped
+        }
+
+
+# Process-wide bus shared by server.py and bot.py
+call_events = CallEventBus()
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import {
   Phone,
   MessageCircle,
@@ -33,6 +33,12 @@ const fetchWithAuth = async (url, options = {}) => {
   });
 };
 
+// /calls pagination and projection - only fetch what the status table renders
+const CALLS_PAGE_SIZE = 200;
+const CALL_LIST_FIELDS = 'call_uuid,customer_name,invoice_number,phone_number,whatsapp_number,email,status,created_at';
+const TERMINAL_CALL_STATUSES = ['completed', 'failed', 'declined', 'invalid', 'out_of_service', 'nonexistent',
+                                'unallocated', 'not_reachable'];
+
 const colors = {
   primary: 'rgb(150, 133, 117)',
   primaryHover: 'rgb(100, 89, 78)',
@@ -86,6 +92,9 @@ export default function HummingBirdMultiAgent() {
   const [parsedData, setParsedData] = useState(null);
   const [isProcessing, setIsProcessing] = useState(false);
   const [callStatus, setCallStatus] = useState([]);
+  const [callsNextCursor, setCallsNextCursor] = useState(null);
+  const changeSeqRef = useRef(null); // /calls/changes cursor for delta polling
+  const batchPendingRef = useRef(new Set()); // call_uuids of the running batch not yet finished
   const [transcripts, setTranscripts] = useState([]);
   const [whatsappMessages, setWhatsappMessages] = useState([]);
   const [emailMessages, setEmailMessages] = useState([]);
@@ -148,17 +157,33 @@ export default function HummingBirdMultiAgent() {
     }
   };
 
+  // Live status updates pushed by the server (/calls/events) instead of polling
   useEffect(() => {
-    let interval;
-    if (autoRefresh && agentType === 'voice' && activeVoiceTab === 'status') {
-      interval = setInterval(() => {
-        fetchCallStatus();
-      }, 3000);
+    if (agentType !== 'voice' || !(autoRefresh || isProcessing)) return undefined;
+
+    const params = new URLSearchParams({ token: localStorage.getItem('access_token') || '' });
+    if (user?.role === 'super_admin' && selectedUserId !== null) {
+      params.set('user_id', selectedUserId);
     }
-    return () => {
-      if (interval) clearInterval(interval);
+    const source = new EventSource(`/calls/events?${params.toString()}`);
+
+    // (Re)connected: catch up on anything missed while disconnected
+    source.onopen = () => {
+      fetchCallChanges().then(markBatchFinished);
     };
-  }, [autoRefresh, agentType, activeVoiceTab]);
+    source.addEventListener('call_status', (e) => {
+      const event = JSON.parse(e.data);
+      setCallStatus(prev => prev.map(c => (
+        c.call_uuid === event.call_uuid
+          ? { ...c, status: event.status, ...(event.ended_at ? { ended_at: event.ended_at } : {}) }
+          : c
+      )));
+      markBatchFinished([event]);
+    });
+
+    return () => source.close();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [autoRefresh, isProcessing, agentType, user?.role, selectedUserId]);
 
   // Consolidated: Fetch data when selectedUserId or activeVoiceTab changes
   useEffect(() => {
@@ -172,7 +197,7 @@ export default function HummingBirdMultiAgent() {
     
     fetchData();
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [selectedUserId, activeVoiceTab]);
+  }, [selectedUserId, activeVoiceTab, statusFilter]);
 
   const checkBackendHealth = async () => {
     try {
@@ -252,27 +277,103 @@ export default function HummingBirdMultiAgent() {
     }
   };
 
+  const buildCallsUrl = useCallback((cursor = null) => {
+    const params = new URLSearchParams({ limit: CALLS_PAGE_SIZE, fields: CALL_LIST_FIELDS });
+    // Only add user_id param if a filter is selected (not null) - null shows super admin's own data
+    if (user?.role === 'super_admin' && selectedUserId !== null) {
+      params.set('user_id', selectedUserId);
+    }
+    // Status filter is applied server-side
+    if (statusFilter !== 'all') {
+      params.set('status', statusFilter);
+    }
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    return `/calls?${params.toString()}`;
+  }, [user?.role, selectedUserId, statusFilter]);
+
   const fetchCallStatus = useCallback(async () => {
     try {
-      // Build query params for super admin
-      let url = '/calls';
-      if (user?.role === 'super_admin') {
-        // Only add user_id param if a filter is selected (not null)
-        if (selectedUserId !== null) {
-          url += `?user_id=${selectedUserId}`;
-        }
-        // If selectedUserId is null, don't add param (shows super admin's own data)
-      }
-      
-      const response = await fetchWithAuth(url);
+      // Refresh only the newest page - constant cost regardless of history size
+      const response = await fetchWithAuth(buildCallsUrl());
       const data = await response.json();
       if (isMounted) {
         setCallStatus(data.calls || []);
+        setCallsNextCursor(data.next_cursor || null);
+        changeSeqRef.current = data.change_seq ?? null;
       }
+      return data.calls || [];
     } catch (err) {
       console.error('Error fetching call status:', err);
+      return [];
     }
-  }, [user?.role, selectedUserId, isMounted]);
+  }, [buildCallsUrl, isMounted]);
+
+  // Stop the batch spinner once every call of the running batch reached a final status
+  const markBatchFinished = useCallback((calls) => {
+    const pending = batchPendingRef.current;
+    if (pending.size === 0) return;
+    calls.forEach(c => {
+      if (TERMINAL_CALL_STATUSES.includes(c.status)) pending.delete(c.call_uuid);
+    });
+    if (pending.size === 0) {
+      setIsProcessing(false);
+      console.log('All calls completed');
+    }
+  }, []);
+
+  // Delta refresh: only fetch calls changed since the last poll and merge them in
+  const fetchCallChanges = useCallback(async () => {
+    if (changeSeqRef.current === null) {
+      await fetchCallStatus();
+      return [];
+    }
+    const collected = [];
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const params = new URLSearchParams({ since: changeSeqRef.current, fields: CALL_LIST_FIELDS });
+        if (user?.role === 'super_admin' && selectedUserId !== null) {
+          params.set('user_id', selectedUserId);
+        }
+        const response = await fetchWithAuth(`/calls/changes?${params.toString()}`);
+        const data = await response.json();
+        collected.push(...(data.changes || []));
+        changeSeqRef.current = data.cursor;
+        hasMore = data.has_more;
+      }
+    } catch (err) {
+      console.error('Error fetching call changes:', err);
+    }
+    if (isMounted && collected.length > 0) {
+      setCallStatus(prev => {
+        const changed = new Map(collected.map(c => [c.call_uuid, c]));
+        const updated = prev.map(c => (changed.has(c.call_uuid) ? { ...c, ...changed.get(c.call_uuid) } : c));
+        const known = new Set(prev.map(c => c.call_uuid));
+        const added = [...changed.values()]
+          .filter(c => !known.has(c.call_uuid))
+          .filter(c => statusFilter === 'all' || c.status === statusFilter)
+          .sort((a, b) => (a.created_at < b.created_at ? 1 : -1));
+        return [...added, ...updated];
+      });
+    }
+    return collected;
+  }, [fetchCallStatus, user?.role, selectedUserId, statusFilter, isMounted]);
+
+  const loadMoreCalls = useCallback(async () => {
+    if (!callsNextCursor) return;
+    try {
+      const response = await fetchWithAuth(buildCallsUrl(callsNextCursor));
+      const data = await response.json();
+      if (isMounted) {
+        setCallStatus(prev => [...prev, ...(data.calls || [])]);
+        setCallsNextCursor(data.next_cursor || null);
+      }
+    } catch (err) {
+      console.error('Error loading more calls:', err);
+    }
+  }, [buildCallsUrl, callsNextCursor, isMounted]);
 
   const fetchTranscripts = useCallback(async () => {
     try {
@@ -289,11 +390,11 @@ export default function HummingBirdMultiAgent() {
       const response = await fetchWithAuth(url);
       const data = await response.json();
 
-      // Also fetch call status to match phone numbers
-      let callsUrl = '/calls';
+      // Also fetch call status to match phone numbers (only the fields needed for enrichment)
+      let callsUrl = '/calls?fields=call_uuid,phone_number,whatsapp_number,email';
       if (user?.role === 'super_admin') {
         if (selectedUserId !== null) {
-          callsUrl += `?user_id=${selectedUserId}`;
+          callsUrl += `&user_id=${selectedUserId}`;
         }
       }
       
@@ -358,41 +459,17 @@ export default function HummingBirdMultiAgent() {
       if (response.ok) {
         const data = await response.json();
         console.log(`Batch request successful: ${data.message}`);
-        
+        if (data.rejected?.length) {
+          console.warn(`${data.rejected.length} calls not queued` +
+            (data.retry_after ? `, retry in ${data.retry_after}s` : ''), data.rejected);
+        }
+
         // Switch to status tab immediately
         setActiveVoiceTab('status');
         
-        // Start polling for status updates
-        const pollInterval = setInterval(async () => {
-          try {
-            await fetchCallStatus();
-            
-            // Check if all calls are completed
-            let statusUrl = '/calls';
-            if (user?.role === 'super_admin') {
-              if (selectedUserId !== null) {
-                statusUrl += `?user_id=${selectedUserId}`;
-              }
-            }
-            
-            const statusResponse = await fetchWithAuth(statusUrl);
-            const statusData = await statusResponse.json();
-            const allCompleted = data.call_uuids.every(uuid => {
-              const call = statusData.calls?.find(c => c.call_uuid === uuid);
-              return call && (call.status === 'completed' || call.status === 'failed' || call.status === 'declined' || 
-                             call.status === 'invalid' || call.status === 'out_of_service' || call.status === 'nonexistent' || 
-                             call.status === 'unallocated' || call.status === 'not_reachable');
-            });
-            
-            if (allCompleted) {
-              clearInterval(pollInterval);
-              setIsProcessing(false);
-              console.log('All calls completed');
-            }
-          } catch (err) {
-            console.error('Error polling status:', err);
-          }
-        }, 3000); // Poll every 3 seconds for UI updates
+        // Load the new calls once; further updates arrive over /calls/events while isProcessing
+        batchPendingRef.current = new Set(data.call_uuids);
+        markBatchFinished(await fetchCallStatus());
         
       } else {
         console.error('Batch request failed:', await response.text());
@@ -1145,6 +1222,24 @@ export default function HummingBirdMultiAgent() {
               </tbody>
             </table>
           </div>
+          {callsNextCursor && (
+            <div style={{ display: 'flex', justifyContent: 'center', marginTop: '1rem' }}>
+              <button
+                onClick={loadMoreCalls}
+                style={{
+                  padding: '0.5rem 1rem',
+                  background: colors.background,
+                  color: colors.text,
+                  border: `1px solid ${colors.borderLight}`,
+                  borderRadius: '6px',
+                  cursor: 'pointer',
+                  fontSize: '0.875rem'
+                }}
+              >
+                Load more
+              </button>
+            </div>
+          )}
         </>
       ) : (
         <p style={{ textAlign: 'center', color: colors.textSecondary, padding: '2rem' }}>
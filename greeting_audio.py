@@ -0,0 +1,159 @@
+"""
+Greeting audio post-processing (NumPy)
+
+Trims leading/trailing silence from synthesized speech, normalizes its
+loudness, and optionally re-encodes 16-bit PCM WAV to 8-bit G.711 μ-law WAV
+(half the bytes for Plivo to download before it starts playing).
+"""
+
+import io
+import os
+import wave
+import struct
+import numpy as np
+
+# Frames quieter than this (RMS, dBFS) count as silence when trimming
+GREETING_SILENCE_DB = float(os.getenv("GREETING_SILENCE_DB", "-40"))
+
+# Silence kept before the first and after the last audible frame
+GREETING_TRIM_PAD_MS = int(os.getenv("GREETING_TRIM_PAD_MS", "40"))
+
+# Loudness target (RMS of audible frames) and peak ceiling, in dBFS
+GREETING_TARGET_DB = float(os.getenv("GREETING_TARGET_DB", "-18"))
+GREETING_PEAK_DB = float(os.getenv("GREETING_PEAK_DB", "-1"))
+
+# Frames this far below the loudest one are left out of the loudness measurement
+LOUDNESS_GATE_DB = 30
+
+# Analysis frame length for silence detection and loudness
+FRAME_MS = 10
+
+WAVE_FORMAT_MULAW = 7
+
+# G.711 μ-law constants (encoder works on 14-bit magnitudes, like the reference g711.c)
+MULAW_BIAS = 0x84
+MULAW_BIAS_14 = 0x21
+MULAW_CLIP_14 = 8159
+
+
+def read_wav(data: bytes):
+    """16-bit PCM WAV bytes -> (float32 samples in [-1, 1], sample_rate); mono only"""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit mono WAV, got {wav.getnchannels()} ch / {8 * wav.getsampwidth()}-bit")
+        frames = wav.readframes(wav.getnframes())
+        sample_rate = wav.getframerate()
+    return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768, sample_rate
+
+
+def _to_int16(samples):
+    return (np.clip(samples, -1, 32767 / 32768) * 32768).astype("<i2")
+
+
+def write_wav(samples, sample_rate: int) -> bytes:
+    """Float samples -> 16-bit PCM mono WAV bytes"""
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(_to_int16(samples).tobytes())
+    return output.getvalue()
+
+
+def _frame_db(samples, sample_rate):
+    """RMS level in dBFS of each FRAME_MS frame (the last partial frame included)"""
+    frame = max(1, sample_rate * FRAME_MS // 1000)
+    padded = np.pad(samples, (0, -len(samples) % frame))
+    rms = np.sqrt(np.mean(padded.reshape(-1, frame) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), frame
+
+
+def trim_silence(samples, sample_rate: int, silence_db: float = GREETING_SILENCE_DB,
+                 pad_ms: int = GREETING_TRIM_PAD_MS):
+    """Cut silence before the first and after the last frame louder than silence_db (keeping pad_ms)"""
+    if not len(samples):
+        return samples
+    levels, frame = _frame_db(samples, sample_rate)
+    audible = np.flatnonzero(levels > silence_db)
+    if not len(audible):
+        return samples[:0]
+    pad = sample_rate * pad_ms // 1000
+    start = max(0, audible[0] * frame - pad)
+    end = min(len(samples), (audible[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def normalize_loudness(samples, sample_rate: int, target_db: float = GREETING_TARGET_DB,
+                       peak_db: float = GREETING_PEAK_DB):
+    """
+    Scale so speech averages target_db RMS, without peaks above peak_db
+
+    Speech is every frame within LOUDNESS_GATE_DB of the loudest frame, so the
+    result doesn't depend on the input level.
+    """
+    if not len(samples) or not np.any(samples):
+        return samples
+    levels, frame = _frame_db(samples, sample_rate)
+    audible = levels > levels.max() - LOUDNESS_GATE_DB
+    padded = np.pad(samples, (0, -len(samples) % frame)).reshape(-1, frame)
+    rms = np.sqrt(np.mean(padded[audible] ** 2))
+    peak = np.max(np.abs(samples))
+    gain = min(10 ** (target_db / 20) / rms, 10 ** (peak_db / 20) / peak)
+    return (samples * gain).astype(np.float32)
+
+
+def mulaw_encode(samples):
+    """Float samples -> G.711 μ-law bytes (uint8)"""
+    pcm = _to_int16(samples).astype(np.int32) >> 2
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), MULAW_CLIP_14) + MULAW_BIAS_14
+    # Segment = position of the highest set bit above bit 5
+    exponent = np.maximum(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0)
+    mantissa = (magnitude >> (exponent + 1)) & 0x0F
+    # Past the top segment: the loudest code
+    overflow = exponent > 7
+    exponent = np.where(overflow, 7, exponent)
+    mantissa = np.where(overflow, 0x0F, mantissa)
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+def mulaw_decode(codes):
+    """G.711 μ-law bytes -> float samples"""
+    codes = ~np.asarray(codes, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = ((((codes & 0x0F) << 3) + MULAW_BIAS) << exponent) - MULAW_BIAS
+    return (np.where(codes & 0x80, -magnitude, magnitude) / 32768).astype(np.float32)
+
+
+def write_mulaw_wav(samples, sample_rate: int) -> bytes:
+    """Float samples -> 8-bit μ-law mono WAV bytes (WAVE_FORMAT_MULAW)"""
+    codes = mulaw_encode(samples).tobytes()
+    fmt = struct.pack("<HHIIHHH", WAVE_FORMAT_MULAW, 1, sample_rate, sample_rate, 1, 8, 0)
+    fact = struct.pack("<I", len(codes))
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"fact" + struct.pack("<I", len(fact)) + fact
+            + b"data" + struct.pack("<I", len(codes)) + codes + b"\x00" * (len(codes) % 2))
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def wav_format(data: bytes) -> int:
+    """WAVE format tag of WAV bytes (1 = PCM, 7 = μ-law)"""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = data[offset:offset + 4], struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        if chunk_id == b"fmt ":
+            return struct.unpack("<H", data[offset + 8:offset + 10])[0]
+        offset += 8 + size + size % 2
+    raise ValueError("WAV file has no fmt chunk")
+
+
+def postprocess(data: bytes) -> bytes:
+    """Trim silence and normalize loudness of a 16-bit PCM WAV (still 16-bit PCM)"""
+    samples, sample_rate = read_wav(data)
+    samples = trim_silence(samples, sample_rate)
+    if not len(samples):
+        return data  # Nothing audible - keep what Sarvam sent
+    return write_wav(normalize_loudness(samples, sample_rate), sample_rate)
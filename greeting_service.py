@@ -0,0 +1,687 @@
+"""
+Personalized greeting text and audio
+
+Builds the greeting spoken when a customer answers, synthesizes it with
+Sarvam TTS into a content-addressed disk cache (identical texts are rendered
+once), and pre-renders greetings for calls that are about to be dialed so
+dialing never waits on TTS.
+
+With GREETING_SEGMENTS on, a greeting is stitched locally from cached
+fragments (the fixed template text, amount words and the invoice date), so
+most calls need no Sarvam request at all.
+"""
+
+import os
+import json
+import time
+import io
+import wave
+import base64
+import hashlib
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from loguru import logger
+import httpx
+
+from http_clients import http_clients
+import greeting_audio
+
+# Sarvam AI credentials
+SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
+
+GREETINGS_DIR = Path("greetings")
+GREETINGS_DIR.mkdir(exist_ok=True)  # Create greetings directory if it doesn't exist
+
+# Rendered audio, one file per distinct (text, voice) pair
+GREETING_CACHE_DIR = GREETINGS_DIR / "cache"
+
+# Disk budget for cached greetings; least recently used files are evicted past it
+GREETING_CACHE_MAX_MB = float(os.getenv("GREETING_CACHE_MAX_MB", "200"))
+
+# Stitch greetings from cached fragments instead of synthesizing each one whole
+GREETING_SEGMENTS = os.getenv("GREETING_SEGMENTS", "true").lower() == "true"
+
+# Silence inserted between stitched fragments
+GREETING_SEGMENT_GAP_MS = int(os.getenv("GREETING_SEGMENT_GAP_MS", "0"))
+
+# Memory budget for greeting audio served to Plivo (hot files are kept in memory)
+GREETING_MEMORY_CACHE_MB = float(os.getenv("GREETING_MEMORY_CACHE_MB", "32"))
+
+# Trim silence and normalize loudness of synthesized audio before caching it
+GREETING_POSTPROCESS = os.getenv("GREETING_POSTPROCESS", "true").lower() == "true"
+
+# Serve 8 kHz greetings to Plivo as 8-bit μ-law WAV (half the bytes of 16-bit PCM)
+GREETING_MULAW = os.getenv("GREETING_MULAW", "false").lower() == "true"
+
+# How the greeting reaches the customer: "play" (Plivo fetches and <Play>s it
+# before opening the media stream) or "stream" (the bot sends it as the first
+# audio on the media stream, saving the HTTP fetch)
+GREETING_DELIVERY = os.getenv("GREETING_DELIVERY", "play")
+
+# Texts per Sarvam text-to-speech request when rendering a batch upload
+SARVAM_TTS_BATCH_SIZE = int(os.getenv("SARVAM_TTS_BATCH_SIZE", "3"))
+
+# Voice settings sent to Sarvam with every greeting (part of the cache key)
+SARVAM_TTS_PARAMS = {
+    "target_language_code": "en-IN",
+    "speaker": "anushka",  # Female voice - matches the bot's voice
+    "pitch": 0,
+    "pace": 1.0,
+    "loudness": 1.5,
+    "speech_sample_rate": 8000,
+    "enable_preprocessing": True,
+    "model": "bulbul:v2"
+}
+
+# Everything that shapes cached audio, so changing voice or post-processing settings re-renders
+GREETING_AUDIO_PARAMS = {
+    **SARVAM_TTS_PARAMS,
+    **({"postprocess": [greeting_audio.GREETING_SILENCE_DB, greeting_audio.GREETING_TRIM_PAD_MS,
+                        greeting_audio.GREETING_TARGET_DB, greeting_audio.GREETING_PEAK_DB]}
+       if GREETING_POSTPROCESS else {})
+}
+
+# Upcoming queued calls whose greetings are rendered ahead of dialing
+GREETING_LOOKAHEAD = int(os.getenv("GREETING_LOOKAHEAD", "10"))
+
+# Concurrent Sarvam requests used for pre-rendering
+GREETING_PREFETCH_CONCURRENCY = int(os.getenv("GREETING_PREFETCH_CONCURRENCY", "3"))
+
+
+def number_to_words(amount_str: str) -> str:
+    """Convert numeric amount to words for TTS"""
+    try:
+        # Remove currency symbols and commas
+        amount_str = str(amount_str).replace("₹", "").replace("rupees", "").replace(",", "").replace("+", "").strip()
+        num = int(float(amount_str))
+    except (ValueError, TypeError):
+        return str(amount_str)
+    
+    if num == 0:
+        return "zero"
+    
+    # Handle negative numbers
+    if num < 0:
+        return "minus " + number_to_words(abs(num))
+    
+    # Indian numbering system
+    ones = ["", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+    teens = ["ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", 
+             "sixteen", "seventeen", "eighteen", "nineteen"]
+    tens = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+    
+    def convert_below_thousand(n):
+        if n == 0:
+            return ""
+        elif n < 10:
+            return ones[n]
+        elif n < 20:
+            return teens[n - 10]
+        elif n < 100:
+            return tens[n // 10] + (" " + ones[n % 10] if n % 10 != 0 else "")
+        else:
+            return ones[n // 100] + " hundred" + (" " + convert_below_thousand(n % 100) if n % 100 != 0 else "")
+    
+    # Indian numbering: crore, lakh, thousand, hundred
+    if num >= 10000000:  # Crore
+        crore = num // 10000000
+        remainder = num % 10000000
+        result = convert_below_thousand(crore) + " crore"
+        if remainder > 0:
+            result += " " + number_to_words(remainder)
+        return result
+    elif num >= 100000:  # Lakh
+        lakh = num // 100000
+        remainder = num % 100000
+        result = convert_below_thousand(lakh) + " lakh"
+        if remainder > 0:
+            result += " " + number_to_words(remainder)
+        return result
+    elif num >= 1000:  # Thousand
+        thousand = num // 1000
+        remainder = num % 1000
+        result = convert_below_thousand(thousand) + " thousand"
+        if remainder > 0:
+            result += " " + convert_below_thousand(remainder)
+        return result
+    else:
+        return convert_below_thousand(num)
+
+
+def greeting_key(text: str, params: dict = GREETING_AUDIO_PARAMS) -> str:
+    """Cache key for a greeting: hash of the text, voice and post-processing parameters"""
+    payload = json.dumps({"text": text, **params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GreetingCache:
+    """
+    Content-addressed WAV cache with a size budget
+
+    Files are named <key>.wav and tracked in least-recently-used order; adding
+    a file past max_bytes evicts the oldest ones. The order survives restarts
+    through file modification times, which get() refreshes.
+    """
+
+    def __init__(self, directory=GREETING_CACHE_DIR, max_bytes=int(GREETING_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self):
+        files = []
+        for path in self.directory.glob("*.wav"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        self._entries.clear()
+        self.total_bytes = 0
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.wav"
+
+    def _forget(self, key):
+        self.total_bytes -= self._entries.pop(key, 0)
+
+    def get(self, key: str):
+        """Path of a cached greeting (marked as recently used), or None"""
+        if key in self._entries:
+            path = self.path(key)
+            try:
+                os.utime(path)
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return path
+            except FileNotFoundError:
+                # Removed behind our back
+                self._forget(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> Path:
+        """Store audio under key (atomically) and evict past the size budget"""
+        path = self.path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self._forget(key)
+        self._entries[key] = len(data)
+        self.total_bytes += len(data)
+        self.evict()
+        return path
+
+    def evict(self):
+        """Drop least recently used files until the cache fits its budget (the newest always stays)"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, _ = next(iter(self._entries.items()))
+            self._forget(key)
+            try:
+                self.path(key).unlink()
+            except FileNotFoundError:
+                pass
+            self.evictions += 1
+
+    def gc(self, legacy_dir=None, max_age=3600):
+        """
+        Reconcile with the disk and remove leftovers
+
+        Deletes half-written .tmp files and, in legacy_dir, per-call greeting
+        files older than max_age seconds from before the cache existed.
+        """
+        removed = 0
+        stale_before = time.time() - max_age
+        leftovers = list(self.directory.glob("*.tmp"))
+        if legacy_dir is not None:
+            leftovers += [p for p in Path(legacy_dir).glob("*.wav") if p.stat().st_mtime < stale_before]
+        for path in leftovers:
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        self._load()
+        self.evict()
+        if removed:
+            logger.info(f"Greeting cache GC removed {removed} stale files")
+        return removed
+
+    def stats(self):
+        return {
+            "files": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+greeting_cache = GreetingCache()
+
+
+def read_greeting_pcm(path):
+    """
+    (16-bit PCM frames, sample_rate) of a mono WAV greeting, for sending over the media stream
+
+    path may also be a file object (media workers get the WAV bytes, not a path).
+    """
+    with wave.open(path if hasattr(path, "read") else str(path), "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2 or wav.getcomptype() != "NONE":
+            raise ValueError(f"{path} is not 16-bit mono PCM")
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+
+class AudioMemoryCache:
+    """
+    Audio file bytes kept in memory, least recently used evicted past max_bytes
+
+    Entries are keyed by path and checked against the file's mtime and size on
+    every load (one stat call), so a file replaced in place (an operator's
+    GREETING_AUDIO_PATH/output.wav) is read again instead of served stale.
+    """
+
+    def __init__(self, max_bytes=int(GREETING_MEMORY_CACHE_MB * 1024 * 1024), transform=None):
+        self.max_bytes = max_bytes
+        self.transform = transform  # applied to file bytes once, when loaded
+        self._entries = OrderedDict()  # path -> ((mtime_ns, size), data, etag), oldest first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path):
+        """(data, etag) for a file; raises FileNotFoundError if it doesn't exist"""
+        path = str(path)
+        stat = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is not None:
+            if entry[0] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1:]
+            del self._entries[path]
+            self.total_bytes -= len(entry[1])
+
+        self.misses += 1
+        with open(path, "rb") as f:
+            # The version of the bytes actually read, should the file be replaced meanwhile
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        if self.transform is not None:
+            data = self.transform(data)
+        etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+        if len(data) <= self.max_bytes:
+            self._entries[path] = ((stat.st_mtime_ns, stat.st_size), data, etag)
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, (_, old_data, _) = self._entries.popitem(last=False)
+                self.total_bytes -= len(old_data)
+        return data, etag
+
+    def stats(self):
+        return {
+            "files": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def _playback_audio(data: bytes) -> bytes:
+    """8 kHz 16-bit PCM greetings re-encoded as μ-law WAV; other audio unchanged"""
+    try:
+        samples, sample_rate = greeting_audio.read_wav(data)
+    except (ValueError, wave.Error, EOFError):
+        return data
+    if sample_rate != SARVAM_TTS_PARAMS["speech_sample_rate"]:
+        return data
+    return greeting_audio.write_mulaw_wav(samples, sample_rate)
+
+
+greeting_audio_memory = AudioMemoryCache(transform=_playback_audio if GREETING_MULAW else None)
+
+# key -> task synthesizing it, so concurrent calls with the same text share one request
+_rendering = {}
+
+
+def cached_greeting_path(text: str):
+    """Path of the already rendered audio for a greeting text, or None"""
+    return greeting_cache.get(greeting_key(text))
+
+
+async def generate_greeting_audio(text: str, call_uuid: str) -> str:
+    """Greeting audio path for a call, synthesized with Sarvam AI unless already cached"""
+    key = greeting_key(text)
+    cached_path = greeting_cache.get(key)
+    if cached_path is not None:
+        logger.info(f"Using cached greeting {key[:12]} for call {call_uuid}")
+        return str(cached_path)
+
+    task = _rendering.get(key)
+    if task is None:
+        task = _rendering[key] = asyncio.create_task(_synthesize(text, key, call_uuid))
+        task.add_done_callback(lambda _: _rendering.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _sarvam_tts(texts: list) -> list:
+    """Synthesize texts in one Sarvam request; WAV bytes in the same order"""
+    url = "https://api.sarvam.ai/text-to-speech"
+    
+    payload = {"inputs": texts, **SARVAM_TTS_PARAMS}
+    
+    headers = {
+        "Content-Type": "application/json", 
+        "API-Subscription-Key": SARVAM_API_KEY
+    }
+    
+    response = await http_clients.get("sarvam").post(url, json=payload, headers=headers)
+    response.raise_for_status()
+    response_data = response.json()
+    
+    # Audio is returned as base64 encoded strings in the 'audios' list, one per input
+    audios = response_data["audios"]
+    if len(audios) != len(texts):
+        raise ValueError(f"Sarvam returned {len(audios)} audios for {len(texts)} inputs")
+    return [_postprocess(base64.b64decode(audio_base64)) for audio_base64 in audios]
+
+
+def _postprocess(audio_data: bytes) -> bytes:
+    """Trim and normalize synthesized audio (unchanged if disabled or not 16-bit mono PCM)"""
+    if not GREETING_POSTPROCESS:
+        return audio_data
+    try:
+        return greeting_audio.postprocess(audio_data)
+    except (ValueError, wave.Error, EOFError) as e:
+        logger.warning(f"Skipping greeting post-processing: {e}")
+        return audio_data
+
+
+async def _synthesize(text: str, key: str, call_uuid: str):
+    """Render text with Sarvam TTS into the cache"""
+    try:
+        logger.info(f"Generating greeting for call {call_uuid}: {text}")
+        
+        audio_data = (await _sarvam_tts([text]))[0]
+        file_path = greeting_cache.put(key, audio_data)
+        
+        logger.info(f"Successfully generated greeting audio for call {call_uuid}")
+        return str(file_path)
+        
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Sarvam AI API error for call {call_uuid}: {e.response.status_code} - {e.response.text}")
+        return None
+    except Exception as e:
+        logger.error(f"Error generating greeting audio for call {call_uuid}: {e}")
+        return None
+
+
+# Concurrent batched Sarvam requests
+_batch_semaphore = asyncio.Semaphore(GREETING_PREFETCH_CONCURRENCY)
+
+
+def synthesize_batch(texts: list, batch_size: int = SARVAM_TTS_BATCH_SIZE) -> list:
+    """
+    Render texts that aren't cached yet, batch_size texts per Sarvam request
+
+    Each text is registered as rendering right away, so a call that needs one
+    of them meanwhile waits for its batch instead of sending its own request.
+    Returns the batch request tasks.
+    """
+    pending = [
+        text for text in dict.fromkeys(texts)
+        if greeting_key(text) not in greeting_cache and greeting_key(text) not in _rendering
+    ]
+    batches = []
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        batch = asyncio.create_task(_synthesize_chunk(chunk))
+        for text in chunk:
+            key = greeting_key(text)
+            task = _rendering[key] = asyncio.create_task(_batch_result(batch, text, key))
+            task.add_done_callback(lambda _, key=key: _rendering.pop(key, None))
+        batches.append(batch)
+    if pending:
+        logger.info(f"Rendering {len(pending)} greeting texts in {len(batches)} Sarvam requests")
+    return batches
+
+
+async def _synthesize_chunk(texts: list) -> dict:
+    """text -> cached path for one batched request ({} if the request failed)"""
+    async with _batch_semaphore:
+        try:
+            audios = await _sarvam_tts(texts)
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Sarvam AI API error for batch of {len(texts)}: {e.response.status_code} - {e.response.text}")
+            return {}
+        except Exception as e:
+            logger.error(f"Error generating batch of {len(texts)} greetings: {e}")
+            return {}
+    return {text: str(greeting_cache.put(greeting_key(text), audio)) for text, audio in zip(texts, audios)}
+
+
+async def _batch_result(batch, text: str, key: str):
+    """A text's path from its batch; synthesized on its own if the batch failed"""
+    path = (await batch).get(text)
+    if path is None:
+        path = await _synthesize(text, key, "batch")
+    return path
+
+
+# Fixed parts of the greeting template, around the amount and the invoice date
+GREETING_PREFIX = "Hi, this is Sara from Hummingbird's commercial team. I'm calling regarding the T A C due of rupees"
+GREETING_MIDDLE = "for the invoice dated"
+GREETING_SUFFIX = "When can we expect the payment?"
+
+# Amount words are split after these so fragments repeat across amounts
+NUMBER_SCALE_WORDS = ("crore", "lakh", "thousand")
+
+
+def number_word_groups(words: str) -> list:
+    """'one lakh twenty thousand five hundred' -> ['one lakh', 'twenty thousand', 'five hundred']"""
+    groups, current = [], []
+    for word in words.split():
+        current.append(word)
+        if word in NUMBER_SCALE_WORDS:
+            groups.append(" ".join(current))
+            current = []
+    if current:
+        groups.append(" ".join(current))
+    return groups
+
+
+def greeting_segments(custom_data: dict) -> list:
+    """The greeting as separately synthesizable fragments (joined with spaces they form the full text)"""
+    outstanding_balance = custom_data.get("outstanding_balance", "")
+    invoice_date = custom_data.get("invoice_date", "")
+    
+    balance_in_words = number_to_words(outstanding_balance) if outstanding_balance else "unknown"
+    return [GREETING_PREFIX, *number_word_groups(balance_in_words), GREETING_MIDDLE, f"{invoice_date}.", GREETING_SUFFIX]
+
+
+def greeting_fragments(custom_data: dict) -> list:
+    """Segments that get synthesized (skips ones with nothing to say, e.g. "." with no invoice date)"""
+    return [segment for segment in greeting_segments(custom_data) if any(c.isalnum() for c in segment)]
+
+
+def build_greeting_text(custom_data: dict) -> str:
+    """Personalized greeting for a call's customer data"""
+    return " ".join(greeting_segments(custom_data))
+
+
+def stitch_wavs(wav_files: list, gap_ms: int = 0) -> bytes:
+    """
+    Concatenate PCM WAV files into one WAV
+
+    All inputs must share channels, sample width and sample rate (ValueError
+    otherwise); gap_ms of silence is inserted between them.
+    """
+    params = None
+    frames = []
+    for wav_file in wav_files:
+        with wave.open(str(wav_file), "rb") as wav:
+            if wav.getcomptype() != "NONE":
+                raise ValueError(f"{wav_file} is not PCM audio")
+            file_params = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+            if params is None:
+                params = file_params
+            elif file_params != params:
+                raise ValueError(f"{wav_file} has format {file_params}, expected {params}")
+            frames.append(wav.readframes(wav.getnframes()))
+    if params is None:
+        raise ValueError("No audio to stitch")
+
+    channels, sample_width, sample_rate = params
+    gap = b"\x00" * (sample_rate * gap_ms // 1000 * channels * sample_width)
+
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(gap.join(frames))
+    return output.getvalue()
+
+
+async def assemble_greeting_audio(custom_data: dict, call_uuid: str):
+    """
+    Greeting audio stitched from cached fragments, stored under the full text's key
+
+    Only fragments not rendered before go to Sarvam. Returns None if a
+    fragment can't be rendered or the fragments don't stitch.
+    """
+    text = build_greeting_text(custom_data)
+    key = greeting_key(text)
+    cached_path = greeting_cache.get(key)
+    if cached_path is not None:
+        return str(cached_path)
+
+    fragments = greeting_fragments(custom_data)
+    paths = await asyncio.gather(*[generate_greeting_audio(f, call_uuid) for f in fragments])
+    if not all(paths):
+        return None
+    try:
+        audio_data = stitch_wavs(paths, GREETING_SEGMENT_GAP_MS)
+    except (ValueError, wave.Error, EOFError) as e:
+        logger.error(f"Could not stitch greeting for call {call_uuid}: {e}")
+        return None
+
+    logger.info(f"Stitched greeting for call {call_uuid} from {len(fragments)} fragments")
+    return str(greeting_cache.put(key, audio_data))
+
+
+async def render_call_greeting(custom_data: dict, call_uuid: str):
+    """
+    Greeting audio path for a call: stitched from fragments when enabled, else synthesized whole
+
+    The result is loaded into greeting_audio_memory so Plivo's fetch is served from memory.
+    """
+    path = None
+    if GREETING_SEGMENTS:
+        path = await assemble_greeting_audio(custom_data, call_uuid)
+        if not path:
+            logger.warning(f"Falling back to whole-greeting synthesis for call {call_uuid}")
+    if not path:
+        path = await generate_greeting_audio(build_greeting_text(custom_data), call_uuid)
+    if path:
+        try:
+            greeting_audio_memory.load(path)
+        except OSError as e:
+            logger.warning(f"Could not load greeting for call {call_uuid} into memory: {e}")
+    return path
+
+
+def prerender_greetings(custom_datas: list) -> list:
+    """Start batched rendering of everything a batch upload's greetings need (see synthesize_batch)"""
+    texts = []
+    for custom_data in custom_datas:
+        if GREETING_SEGMENTS:
+            texts += greeting_fragments(custom_data)
+        else:
+            texts.append(build_greeting_text(custom_data))
+    return synthesize_batch(texts)
+
+
+class GreetingPrefetcher:
+    """
+    Render greetings for the next `lookahead` queued calls in the background
+
+    upcoming(n) returns the next n queued calls in dial order; render(call_data)
+    synthesizes one call's greeting and returns its path (or None).
+    """
+
+    def __init__(self, upcoming, render, lookahead=GREETING_LOOKAHEAD,
+                 concurrency=GREETING_PREFETCH_CONCURRENCY):
+        self.upcoming = upcoming
+        self.render = render
+        self.lookahead = lookahead
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = {}  # call_uuid -> rendering task
+        self._wakeup = asyncio.Event()
+        self.hits = 0  # rendered before the call was dialed
+        self.waits = 0  # still rendering when dialed
+        self.misses = 0  # never prefetched
+
+    def kick(self):
+        """The queue changed - look at the upcoming calls again"""
+        self._wakeup.set()
+
+    async def run(self):
+        """Prefetch loop - run as a background task"""
+        logger.info(f"Greeting prefetcher started (lookahead {self.lookahead})")
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                for call_data in self.upcoming(self.lookahead):
+                    call_uuid = call_data["call_uuid"]
+                    if call_uuid not in self._tasks:
+                        self._tasks[call_uuid] = asyncio.create_task(self._prefetch(call_data))
+            except Exception as e:
+                logger.error(f"Error in greeting prefetcher: {e}")
+
+    async def _prefetch(self, call_data):
+        async with self._semaphore:
+            return await self.render(call_data)
+
+    async def greeting(self, call_data):
+        """Greeting path for a call being dialed: the prefetched one, or rendered now"""
+        task = self._tasks.pop(call_data["call_uuid"], None)
+        if task is not None:
+            if task.done():
+                self.hits += 1
+            else:
+                self.waits += 1
+            path = await task
+            if path:
+                return path
+        else:
+            self.misses += 1
+        return await self.render(call_data)
+
+    def stats(self):
+        return {
+            "lookahead": self.lookahead,
+            "pending": sum(1 for task in self._tasks.values() if not task.done()),
+            "ready": sum(1 for task in self._tasks.values() if task.done()),
+            "hits": self.hits,
+            "waits": self.waits,
+            "misses": self.misses
+        }
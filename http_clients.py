@@ -0,0 +1,128 @@
+"""
+Shared, connection-pooled HTTP clients for upstream APIs (Plivo, Sarvam)
+
+One httpx.AsyncClient per upstream host for the whole process, so dials,
+greetings and hangups reuse warm TCP/TLS (and HTTP/2 when available)
+connections instead of handshaking on every request.
+"""
+
+import os
+import time
+from collections import deque
+from loguru import logger
+import httpx
+
+# Timeouts (seconds) and pool limits, shared by every upstream client
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+try:
+    import h2  # httpx needs it for HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+UPSTREAMS = {
+    "plivo": "https://api.plivo.com",
+    "sarvam": "https://api.sarvam.ai",
+}
+
+# Requests kept per host for latency percentiles
+LATENCY_WINDOW = 500
+
+
+class HostLatency:
+    """Rolling latency stats (time to response headers) for one host"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, seconds, status_code):
+        self.requests += 1
+        if status_code >= 500:
+            self.errors += 1
+        self.samples.append(seconds * 1000)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {"requests": self.requests, "errors": self.errors}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(samples[-1], 1),
+        }
+
+
+class HTTPClients:
+    """Lazily created pooled clients keyed by upstream name"""
+
+    def __init__(self, upstreams=UPSTREAMS):
+        self.upstreams = upstreams
+        self._clients = {}
+        self._latency = {}
+
+    def get(self, name):
+        """Pooled client for an upstream (created on first use)"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = httpx.AsyncClient(
+                http2=HTTP2_ENABLED and HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                event_hooks={"request": [self._on_request], "response": [self._on_response]},
+            )
+        return client
+
+    async def _on_request(self, request):
+        request.extensions["started_at"] = time.perf_counter()
+
+    async def _on_response(self, response):
+        started_at = response.request.extensions.get("started_at")
+        if started_at is not None:
+            host = response.request.url.host
+            self._latency.setdefault(host, HostLatency()).record(
+                time.perf_counter() - started_at, response.status_code
+            )
+
+    async def warm(self):
+        """Open a connection to every upstream so the first real request skips the handshake"""
+        for name, base_url in self.upstreams.items():
+            try:
+                # Any response (even 404) leaves a warm keep-alive connection in the pool
+                response = await self.get(name).head(base_url)
+                logger.info(f"Warmed HTTP client for {name} ({response.http_version})")
+            except Exception as e:
+                logger.warning(f"Could not warm HTTP client for {name}: {e}")
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def stats(self):
+        return {
+            "http2": HTTP2_ENABLED and HTTP2_AVAILABLE,
+            "clients": sorted(name for name, client in self._clients.items() if not client.is_closed),
+            "hosts": {host: latency.summary() for host, latency in self._latency.items()},
+        }
+
+
+# Process-wide clients shared by server.py and bot.py
+http_clients = HTTPClients()
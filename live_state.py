@@ -0,0 +1,691 @@
+"""
+Shared live-call state
+
+call_data_store is per process, so with several uvicorn workers (or containers)
+a Plivo webhook or the media WebSocket can land on a process that never saw
+the call. LIVE_STATE_URL selects a store the processes share:
+
+    (unset)                in-process only - one worker, as before
+    sqlite:///path/to.db   a SQLite file every process can reach (same host or shared volume)
+    redis://host:6379/0    Redis, or anything speaking its protocol (Valkey, KeyDB, ...)
+
+Every store keeps call records (dicts of JSON values, expiring), named locks
+with a TTL, and a notification channel. CallEventRelay uses the channel to
+replay call_events in every process, so dashboards and dispatcher slots see
+status changes wherever the webhook landed.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote
+from loguru import logger
+
+from call_registry import CALL_RECORD_TTL, EVENT_FIELDS
+from dispatcher import TERMINAL_STATUSES
+from database import ConnectionPool
+
+# Shared store (see module docstring); empty keeps live state in this process only
+LIVE_STATE_URL = os.getenv("LIVE_STATE_URL", "")
+
+# Seconds a live call's shared record is kept after its last write (finished calls: CALL_RECORD_TTL)
+LIVE_STATE_RECORD_TTL = float(os.getenv("LIVE_STATE_RECORD_TTL", "86400"))
+
+# Seconds lock() waits for a lock held by another process before giving up
+LIVE_STATE_LOCK_TIMEOUT = float(os.getenv("LIVE_STATE_LOCK_TIMEOUT", "10"))
+
+# SQLite store: how often notifications are polled, and how long they are kept
+LIVE_STATE_POLL_INTERVAL = float(os.getenv("LIVE_STATE_POLL_INTERVAL", "0.1"))
+LIVE_STATE_EVENT_RETENTION = float(os.getenv("LIVE_STATE_EVENT_RETENTION", "60"))
+
+# Redis store: key prefix, so several deployments can share one server
+LIVE_STATE_PREFIX = os.getenv("LIVE_STATE_PREFIX", "calling:")
+
+# Seconds between worker heartbeats; a worker missing three is treated as gone
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "5"))
+
+
+class LiveState(ABC):
+    """
+    Interface of a live-state store
+
+    Records are dicts of JSON values keyed by call_uuid; update() merges
+    fields. Locks are named, expire after their TTL and are released with the
+    token acquire() returned. messages() yields what other processes
+    published (never this process's own messages). Backends implement every
+    abstract method; update() and lock() are built on them.
+    """
+
+    shared = True
+
+    def __init__(self):
+        # Identifies this process, to skip its own messages and in worker heartbeats
+        self.origin = uuid.uuid4().hex
+
+    @abstractmethod
+    async def get(self, call_uuid):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_many(self, call_uuids):
+        """{call_uuid: record} for the calls that have a record"""
+        raise NotImplementedError
+
+    async def update(self, call_uuid, fields, ttl=LIVE_STATE_RECORD_TTL):
+        await self.update_many({call_uuid: fields}, ttl)
+
+    @abstractmethod
+    async def update_many(self, records, ttl=LIVE_STATE_RECORD_TTL):
+        """Merge fields into several records ({call_uuid: fields}), creating missing ones"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, call_uuid):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def acquire(self, name, ttl):
+        """Take a lock without waiting: its token, or None if another holder has it"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release(self, name, token):
+        """Release a lock (False if it expired and someone else took it since)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def extend(self, name, token, ttl):
+        """Push back a held lock's expiry (False if it is no longer held with this token)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def locked(self, name):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish(self, message):
+        raise NotImplementedError
+
+    @abstractmethod
+    def messages(self):
+        """Async iterator over messages published by other processes"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {"backend": type(self).__name__, "origin": self.origin}
+
+    @asynccontextmanager
+    async def lock(self, name, ttl=30, timeout=LIVE_STATE_LOCK_TIMEOUT):
+        """Hold a lock for the duration of the block (TimeoutError if not acquired within timeout)"""
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while True:
+            token = await self.acquire(name, ttl)
+            if token is not None:
+                break
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for lock '{name}'")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+        try:
+            yield token
+        finally:
+            await self.release(name, token)
+
+
+class MemoryLiveState(LiveState):
+    """
+    Single process: nothing is shared
+
+    LiveCallRegistry already holds the only copy of each record, so records
+    are not duplicated here (get() finds nothing). Locks are in-process.
+    """
+
+    shared = False
+
+    def __init__(self, clock=time.monotonic):
+        super().__init__()
+        self.clock = clock
+        self._locks = {}  # name -> (token, expires_at)
+
+    async def get(self, call_uuid):
+        return None
+
+    async def get_many(self, call_uuids):
+        return {}
+
+    async def update_many(self, records, ttl=LIVE_STATE_RECORD_TTL):
+        pass
+
+    async def delete(self, call_uuid):
+        pass
+
+    def _holder(self, name):
+        held = self._locks.get(name)
+        if held is not None and held[1] <= self.clock():
+            del self._locks[name]
+            return None
+        return held
+
+    async def acquire(self, name, ttl):
+        if self._holder(name) is not None:
+            return None
+        token = uuid.uuid4().hex
+        self._locks[name] = (token, self.clock() + ttl)
+        return token
+
+    async def release(self, name, token):
+        held = self._holder(name)
+        if held is None or held[0] != token:
+            return False
+        del self._locks[name]
+        return True
+
+    async def extend(self, name, token, ttl):
+        held = self._holder(name)
+        if held is None or held[0] != token:
+            return False
+        self._locks[name] = (token, self.clock() + ttl)
+        return True
+
+    async def locked(self, name):
+        return self._holder(name) is not None
+
+    async def publish(self, message):
+        pass
+
+    async def messages(self):
+        # No other process to hear from
+        await asyncio.Event().wait()
+        yield
+
+
+class SQLiteLiveState(LiveState):
+    """
+    Live state in a SQLite file shared by every process
+
+    Writes take SQLite's write lock (BEGIN IMMEDIATE), so read-merge-write and
+    lock handoff are atomic across processes. Notifications are rows in
+    live_events, polled every poll_interval and kept for retention seconds.
+    """
+
+    def __init__(self, path, poll_interval=LIVE_STATE_POLL_INTERVAL, retention=LIVE_STATE_EVENT_RETENTION,
+                 clock=time.time):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        # Wall clock: expiry times are compared across processes
+        self.clock = clock
+        self.pool = ConnectionPool(path)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="live-state")
+        self._last_purge = 0.0
+        with self.pool.connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS live_calls (
+                    call_uuid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS live_locks (
+                    name TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS live_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL,
+                    payload TEXT NOT NULL, created_at REAL NOT NULL);
+            """)
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    @staticmethod
+    def _begin(conn):
+        """Take the database write lock now rather than at the first write"""
+        conn.execute("BEGIN IMMEDIATE")
+
+    def _get(self, call_uuid):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM live_calls WHERE call_uuid = ? AND expires_at > ?",
+                               (call_uuid, self.clock())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _get_many(self, call_uuids):
+        records = {}
+        with self.pool.connection() as conn:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(call_uuids), 500):
+                chunk = call_uuids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT call_uuid, data FROM live_calls WHERE expires_at > ? "
+                    f"AND call_uuid IN ({','.join('?' * len(chunk))})",
+                    (self.clock(), *chunk)
+                ).fetchall()
+                records.update((call_uuid, json.loads(data)) for call_uuid, data in rows)
+        return records
+
+    def _update_many(self, records, ttl):
+        now = self.clock()
+        with self.pool.connection() as conn:
+            self._begin(conn)
+            for call_uuid, fields in records.items():
+                row = conn.execute("SELECT data FROM live_calls WHERE call_uuid = ? AND expires_at > ?",
+                                   (call_uuid, now)).fetchone()
+                data = {**json.loads(row[0]), **fields} if row else dict(fields)
+                conn.execute("INSERT OR REPLACE INTO live_calls (call_uuid, data, expires_at) VALUES (?, ?, ?)",
+                             (call_uuid, json.dumps(data), now + ttl))
+
+    def _delete(self, call_uuid):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM live_calls WHERE call_uuid = ?", (call_uuid,))
+
+    def _acquire(self, name, ttl):
+        now = self.clock()
+        token = uuid.uuid4().hex
+        with self.pool.connection() as conn:
+            self._begin(conn)
+            conn.execute("DELETE FROM live_locks WHERE name = ? AND expires_at <= ?", (name, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO live_locks (name, token, expires_at) VALUES (?, ?, ?)",
+                                  (name, token, now + ttl))
+        return token if cursor.rowcount == 1 else None
+
+    def _release(self, name, token):
+        with self.pool.connection() as conn:
+            cursor = conn.execute("DELETE FROM live_locks WHERE name = ? AND token = ? AND expires_at > ?",
+                                  (name, token, self.clock()))
+        return cursor.rowcount == 1
+
+    def _extend(self, name, token, ttl):
+        now = self.clock()
+        with self.pool.connection() as conn:
+            cursor = conn.execute("UPDATE live_locks SET expires_at = ? WHERE name = ? AND token = ? AND expires_at > ?",
+                                  (now + ttl, name, token, now))
+        return cursor.rowcount == 1
+
+    def _locked(self, name):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM live_locks WHERE name = ? AND expires_at > ?",
+                                (name, self.clock())).fetchone() is not None
+
+    def _publish(self, message):
+        with self.pool.connection() as conn:
+            conn.execute("INSERT INTO live_events (origin, payload, created_at) VALUES (?, ?, ?)",
+                         (self.origin, json.dumps(message), self.clock()))
+
+    def _last_event_id(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM live_events").fetchone()[0]
+
+    def _events_after(self, last_id):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT id, payload FROM live_events WHERE id > ? AND origin != ? ORDER BY id",
+                                (last_id, self.origin)).fetchall()
+
+    def _purge(self):
+        """Drop old notifications and expired records/locks (every process does this now and then)"""
+        now = self.clock()
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM live_events WHERE created_at < ?", (now - self.retention,))
+            conn.execute("DELETE FROM live_calls WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM live_locks WHERE expires_at <= ?", (now,))
+
+    async def get(self, call_uuid):
+        return await self._run(self._get, call_uuid)
+
+    async def get_many(self, call_uuids):
+        return await self._run(self._get_many, list(call_uuids))
+
+    async def update_many(self, records, ttl=LIVE_STATE_RECORD_TTL):
+        if records:
+            await self._run(self._update_many, records, ttl)
+
+    async def delete(self, call_uuid):
+        await self._run(self._delete, call_uuid)
+
+    async def acquire(self, name, ttl):
+        return await self._run(self._acquire, name, ttl)
+
+    async def release(self, name, token):
+        return await self._run(self._release, name, token)
+
+    async def extend(self, name, token, ttl):
+        return await self._run(self._extend, name, token, ttl)
+
+    async def locked(self, name):
+        return await self._run(self._locked, name)
+
+    async def publish(self, message):
+        await self._run(self._publish, message)
+
+    async def messages(self):
+        last_id = await self._run(self._last_event_id)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for last_id, payload in await self._run(self._events_after, last_id):
+                yield json.loads(payload)
+            if self.clock() - self._last_purge > self.retention:
+                self._last_purge = self.clock()
+                await self._run(self._purge)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close_all()
+
+    def stats(self):
+        return {**super().stats(), "path": self.path}
+
+
+class RedisError(Exception):
+    """Error reply from the Redis server"""
+
+
+class RedisConnection:
+    """
+    One connection speaking RESP2, enough for RedisLiveState
+
+    Commands on a connection are serialized; given several commands,
+    execute()/execute_all() send them in one write (a pipeline).
+    """
+
+    def __init__(self, host, port, db=0, password=None, username=None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.username = username
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            auth = ("AUTH", self.username, self.password) if self.username else ("AUTH", self.password)
+            await self._call([auth])
+        if self.db:
+            await self._call([("SELECT", self.db)])
+
+    @staticmethod
+    def _encode(command):
+        parts = [f"*{len(command)}\r\n".encode()]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            return None if length < 0 else (await self._reader.readexactly(length + 2))[:-2].decode()
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [await self.read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply from Redis: {line!r}")
+
+    async def _call(self, commands):
+        self._writer.write(b"".join(self._encode(command) for command in commands))
+        await self._writer.drain()
+        replies = [await self.read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def execute_all(self, *commands):
+        """Run commands (tuples of arguments) and return every reply, reconnecting once if the connection dropped"""
+        async with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._writer is None:
+                        await self.connect()
+                    return await self._call(commands)
+                except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                    self.close()
+                    if attempt == 2:
+                        raise
+
+    async def execute(self, *commands):
+        """Like execute_all, returning only the last reply"""
+        return (await self.execute_all(*commands))[-1]
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+# Compare-and-delete / compare-and-expire, so a lock that expired and was
+# taken by another holder is never released or extended by the old one
+RELEASE_SCRIPT = 'if redis.call("GET", KEYS[1]) == ARGV[1] then return redis.call("DEL", KEYS[1]) else return 0 end'
+EXTEND_SCRIPT = 'if redis.call("GET", KEYS[1]) == ARGV[1] then return redis.call("PEXPIRE", KEYS[1], ARGV[2]) else return 0 end'
+
+
+class RedisLiveState(LiveState):
+    """
+    Live state in Redis (or a server speaking its protocol)
+
+    A record is a hash of JSON-encoded fields, so update() is a single HSET.
+    Locks are SET NX PX keys; notifications use PUBLISH/SUBSCRIBE on one channel.
+    """
+
+    def __init__(self, url, prefix=LIVE_STATE_PREFIX):
+        super().__init__()
+        parsed = urlparse(url)
+        self.url = f"{parsed.scheme}://{parsed.hostname}:{parsed.port or 6379}{parsed.path}"
+        self.prefix = prefix
+        self._connection_args = dict(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=unquote(parsed.password) if parsed.password else None,
+            username=unquote(parsed.username) if parsed.username else None
+        )
+        self.redis = RedisConnection(**self._connection_args)
+        self.channel = f"{prefix}events"
+
+    def _call_key(self, call_uuid):
+        return f"{self.prefix}call:{call_uuid}"
+
+    def _lock_key(self, name):
+        return f"{self.prefix}lock:{name}"
+
+    @staticmethod
+    def _decode_hash(reply):
+        return {reply[i]: json.loads(reply[i + 1]) for i in range(0, len(reply), 2)} if reply else None
+
+    async def get(self, call_uuid):
+        return self._decode_hash(await self.redis.execute(("HGETALL", self._call_key(call_uuid))))
+
+    async def get_many(self, call_uuids):
+        call_uuids = list(call_uuids)
+        if not call_uuids:
+            return {}
+        replies = await self.redis.execute_all(*(("HGETALL", self._call_key(call_uuid)) for call_uuid in call_uuids))
+        return {call_uuid: self._decode_hash(reply) for call_uuid, reply in zip(call_uuids, replies) if reply}
+
+    async def update_many(self, records, ttl=LIVE_STATE_RECORD_TTL):
+        commands = []
+        for call_uuid, fields in records.items():
+            if not fields:
+                continue
+            key = self._call_key(call_uuid)
+            pairs = [part for field, value in fields.items() for part in (field, json.dumps(value))]
+            commands += [("HSET", key, *pairs), ("PEXPIRE", key, int(ttl * 1000))]
+        if commands:
+            await self.redis.execute(*commands)
+
+    async def delete(self, call_uuid):
+        await self.redis.execute(("DEL", self._call_key(call_uuid)))
+
+    async def acquire(self, name, ttl):
+        token = uuid.uuid4().hex
+        reply = await self.redis.execute(("SET", self._lock_key(name), token, "NX", "PX", int(ttl * 1000)))
+        return token if reply == "OK" else None
+
+    async def release(self, name, token):
+        return await self.redis.execute(("EVAL", RELEASE_SCRIPT, 1, self._lock_key(name), token)) == 1
+
+    async def extend(self, name, token, ttl):
+        return await self.redis.execute(
+            ("EVAL", EXTEND_SCRIPT, 1, self._lock_key(name), token, int(ttl * 1000))
+        ) == 1
+
+    async def locked(self, name):
+        return await self.redis.execute(("EXISTS", self._lock_key(name))) == 1
+
+    async def publish(self, message):
+        await self.redis.execute(("PUBLISH", self.channel, json.dumps({"origin": self.origin, "message": message})))
+
+    async def messages(self):
+        # Subscribing takes over a connection, so it gets its own
+        subscriber = RedisConnection(**self._connection_args)
+        try:
+            await subscriber.connect()
+            await subscriber.execute(("SUBSCRIBE", self.channel))
+            while True:
+                reply = await subscriber.read_reply()
+                if not isinstance(reply, list) or reply[0] != "message":
+                    continue
+                envelope = json.loads(reply[2])
+                if envelope["origin"] != self.origin:
+                    yield envelope["message"]
+        finally:
+            subscriber.close()
+
+    async def close(self):
+        self.redis.close()
+
+    def stats(self):
+        return {**super().stats(), "url": self.url}
+
+
+def open_live_state(url=LIVE_STATE_URL):
+    """Live-state store for a LIVE_STATE_URL"""
+    if not url:
+        return MemoryLiveState()
+    scheme = urlparse(url).scheme
+    if scheme == "sqlite":
+        # sqlite:///data/live.db (relative) or sqlite:////var/lib/live.db (absolute)
+        return SQLiteLiveState(unquote(url[len("sqlite:///"):]))
+    if scheme in ("redis", "valkey"):
+        return RedisLiveState(url)
+    raise ValueError(f"Unsupported LIVE_STATE_URL scheme '{scheme}' (use sqlite:/// or redis://)")
+
+
+class CallEventRelay:
+    """
+    Shares call_events between the processes of a deployment
+
+    Local events update the call's shared record and are published; events
+    published by other processes are replayed on the local bus, tagged with
+    their origin so they aren't sent back out. The relay also keeps this
+    process's worker heartbeat, which tells others whether its calls are
+    still looked after.
+    """
+
+    def __init__(self, live_state, bus, heartbeat_interval=WORKER_HEARTBEAT_INTERVAL):
+        self.live_state = live_state
+        self.bus = bus
+        self.heartbeat_interval = heartbeat_interval
+        self._outbox = asyncio.Queue()
+        self._heartbeat_token = None
+        self._tasks = []
+        self.sent = 0
+        self.received = 0
+
+    @staticmethod
+    def heartbeat_name(worker):
+        return f"worker:{worker}"
+
+    async def worker_alive(self, worker):
+        """Whether the process with this origin is still running"""
+        if worker == self.live_state.origin:
+            return True
+        return bool(worker) and await self.live_state.locked(self.heartbeat_name(worker))
+
+    def on_call_event(self, event):
+        """call_events listener - queues local events to be shared"""
+        if self.live_state.shared and "origin" not in event:
+            self._outbox.put_nowait(event)
+
+    async def start(self):
+        """Take the heartbeat and start relaying (no-op for an in-process store)"""
+        if not self.live_state.shared:
+            return
+        self._heartbeat_token = await self.live_state.acquire(self.heartbeat_name(self.live_state.origin),
+                                                              3 * self.heartbeat_interval)
+        self._tasks = [asyncio.create_task(task()) for task in (self._send, self._receive, self._heartbeat)]
+        logger.info(f"Sharing live call state through {type(self.live_state).__name__} "
+                    f"(worker {self.live_state.origin})")
+
+    async def stop(self):
+        """Stop relaying and drop the heartbeat, so other workers can take over this one's calls"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._heartbeat_token is not None:
+            await self.live_state.release(self.heartbeat_name(self.live_state.origin), self._heartbeat_token)
+            self._heartbeat_token = None
+
+    async def _send(self):
+        while True:
+            event = await self._outbox.get()
+            fields = {key: event[key] for key in EVENT_FIELDS if key in event}
+            ttl = CALL_RECORD_TTL if event["status"] in TERMINAL_STATUSES else LIVE_STATE_RECORD_TTL
+            try:
+                await self.live_state.update(event["call_uuid"], fields, ttl)
+                await self.live_state.publish({**event, "origin": self.live_state.origin})
+                self.sent += 1
+            except Exception as e:
+                logger.error(f"Error sharing status {event['status']} for call {event['call_uuid']}: {e}")
+
+    async def _receive(self):
+        while True:
+            try:
+                async for event in self.live_state.messages():
+                    extra = {key: value for key, value in event.items()
+                             if key not in ("call_uuid", "status", "user_id", "timestamp")}
+                    self.bus.publish(event["call_uuid"], event["status"], user_id=event.get("user_id"), **extra)
+                    self.received += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error receiving call events from other workers: {e}")
+                await asyncio.sleep(1)
+
+    async def _heartbeat(self):
+        name = self.heartbeat_name(self.live_state.origin)
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                if self._heartbeat_token is None or not await self.live_state.extend(
+                        name, self._heartbeat_token, 3 * self.heartbeat_interval):
+                    # Lapsed (e.g. the store was unreachable for a while): take it again
+                    self._heartbeat_token = await self.live_state.acquire(name, 3 * self.heartbeat_interval)
+            except Exception as e:
+                logger.error(f"Worker heartbeat error: {e}")
+
+    def stats(self):
+        return {
+            **self.live_state.stats(),
+            "shared": self.live_state.shared,
+            "events_sent": self.sent,
+            "events_received": self.received,
+            "events_pending": self._outbox.qsize()
+        }
@@ -0,0 +1,462 @@
+"""
+Off-process media workers
+
+By default every call's Pipecat pipeline (Silero VAD, STT/LLM/TTS, audio
+serialization) runs in the API's event loop, so concurrent calls share one
+core. With MEDIA_WORKERS > 0 the API starts that many worker processes:
+Plivo still connects to /ws/{call_uuid} on the API, which relays the socket
+to the least busy worker, and the worker runs the bot. Call events the bot
+publishes in the worker come back over the worker's /events socket and are
+re-published on the API's call_events, so the dispatcher, dashboards and
+shared live state see them as before.
+
+With several API processes on a host (uvicorn --workers), they share the
+host's workers: the process holding the host's media-workers lock starts and
+supervises them (a file lock in the temp directory, so it is released if that
+process dies), and another takes over if it exits. Each process proxies to
+every worker but only republishes events of the calls it proxied itself.
+
+Workers can also run elsewhere (another container or host) and be listed in
+MEDIA_WORKER_URLS instead:
+
+    MEDIA_WORKER_TOKEN=... python media_workers.py --host 0.0.0.0 --port 8771
+
+The API authenticates to workers with MEDIA_WORKER_TOKEN, sent on every
+worker socket; workers refuse other clients (close code 1008), and refuse to
+listen on a non-loopback address without a token.
+
+The greeting audio is sent to the worker with the session, but the bot still
+writes transcripts (transcripts/) and call rows (DB_PATH) to its own disk:
+such workers must mount the same transcripts directory and database volume
+as the API.
+"""
+
+import os
+import sys
+import hmac
+import json
+import base64
+import ipaddress
+import fcntl
+import signal
+import asyncio
+import tempfile
+import argparse
+import importlib
+import subprocess
+from io import BytesIO
+from pathlib import Path
+from dotenv import load_dotenv
+from loguru import logger
+from websockets.asyncio.client import connect
+
+if __name__ == "__main__":
+    # A worker started on its own reads .env before the settings below (the API's workers inherit its environment)
+    load_dotenv(override=True)
+
+# Worker processes to start (0 = run bots in the API process)
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "0"))
+
+# Address the started workers listen on, on consecutive ports from the base port
+MEDIA_WORKER_HOST = os.getenv("MEDIA_WORKER_HOST", "127.0.0.1")
+MEDIA_WORKER_BASE_PORT = int(os.getenv("MEDIA_WORKER_BASE_PORT", "8771"))
+
+# Comma-separated ws:// URLs of workers started separately (used instead of MEDIA_WORKERS)
+MEDIA_WORKER_URLS = os.getenv("MEDIA_WORKER_URLS", "")
+
+# Session entry point run by workers, as module:function (same signature as bot.bot)
+MEDIA_WORKER_BOT = os.getenv("MEDIA_WORKER_BOT", "bot:bot")
+
+# Shared secret the API sends to workers (required for workers listening beyond loopback)
+MEDIA_WORKER_TOKEN = os.getenv("MEDIA_WORKER_TOKEN", "")
+TOKEN_HEADER = "X-Media-Worker-Token"
+
+# Seconds to wait, after a call's socket closes, for the bot's final call events (transcript summary included)
+MEDIA_SESSION_CLOSE_TIMEOUT = float(os.getenv("MEDIA_SESSION_CLOSE_TIMEOUT", "60"))
+
+
+def is_loopback(host):
+    """Whether host only accepts connections from this machine"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class MediaWorker:
+    """One worker process (or a worker started elsewhere) as seen by the API"""
+
+    def __init__(self, url, port=None):
+        self.url = url
+        self.port = port
+        self.process = None
+        self.connected = False
+        self.sessions = 0
+        self.restarts = 0
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "pid": self.process.pid if self.process else None,
+            "connected": self.connected,
+            "sessions": self.sessions,
+            "restarts": self.restarts
+        }
+
+
+class MediaWorkerPool:
+    """
+    Hands media sessions to worker processes
+
+    proxy() relays one Plivo socket to the least busy connected worker; it
+    returns False when no worker is available, and the caller runs the bot
+    itself.
+    """
+
+    def __init__(self, bus, count=MEDIA_WORKERS, urls=MEDIA_WORKER_URLS, host=MEDIA_WORKER_HOST,
+                 base_port=MEDIA_WORKER_BASE_PORT, entry_point=MEDIA_WORKER_BOT,
+                 close_timeout=MEDIA_SESSION_CLOSE_TIMEOUT, token=MEDIA_WORKER_TOKEN):
+        self.bus = bus
+        self.host = host
+        self.token = token
+        self.entry_point = entry_point
+        self.close_timeout = close_timeout
+        if urls:
+            self.workers = [MediaWorker(url.strip().rstrip("/")) for url in urls.split(",") if url.strip()]
+        else:
+            self.workers = [MediaWorker(f"ws://{host}:{base_port + i}", port=base_port + i) for i in range(count)]
+        # Workers started on this host are run by one API process, the holder of this lock
+        self.lock_path = os.path.join(tempfile.gettempdir(), f"media-workers-{base_port}.lock")
+        self._lock_file = None
+        self._closed = {}  # call_uuid -> asyncio.Event set when the worker's session ended (calls proxied from here)
+        self._tasks = []
+        self.proxied = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self):
+        return bool(self.workers)
+
+    def _spawn(self, worker):
+        worker.process = subprocess.Popen([
+            sys.executable, os.path.abspath(__file__),
+            "--host", self.host, "--port", str(worker.port), "--bot", self.entry_point,
+            # Exits along with this process, so a successor can bind the port
+            "--parent-pid", str(os.getpid())
+        ], env={**os.environ, "MEDIA_WORKER_TOKEN": self.token})
+
+    def _connect(self, url, **kwargs):
+        headers = {TOKEN_HEADER: self.token} if self.token else None
+        return connect(url, max_size=None, additional_headers=headers, **kwargs)
+
+    @property
+    def leader(self):
+        """Whether this process runs the host's worker processes"""
+        return self._lock_file is not None
+
+    async def start(self):
+        """Start (or leave to another API process) the worker processes, and follow their call events"""
+        if not self.token and not is_loopback(self.host) and any(worker.port is not None for worker in self.workers):
+            raise RuntimeError(f"MEDIA_WORKER_TOKEN must be set for media workers listening on {self.host}")
+        for worker in self.workers:
+            self._tasks.append(asyncio.create_task(self._listen(worker)))
+        if any(worker.port is not None for worker in self.workers):
+            self._tasks.append(asyncio.create_task(self._supervise()))
+        if self.workers:
+            logger.info(f"Media sessions handed to {len(self.workers)} workers: "
+                        f"{', '.join(worker.url for worker in self.workers)}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._stop_workers()
+        if self._lock_file is not None:
+            # Closing releases the lock; another API process on the host takes over
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _stop_workers(self):
+        for worker in self.workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                try:
+                    await asyncio.to_thread(worker.process.wait, 5)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+                    worker.process.wait()
+                worker.process = None
+
+    def _lead(self):
+        """Take the host's media-workers lock if it is free; True while this process holds it"""
+        if self._lock_file is None:
+            lock_file = open(self.lock_path, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+            logger.info(f"Starting {len(self.workers)} media workers on this host")
+        return True
+
+    async def _supervise(self):
+        """
+        Run the host's worker processes once this process holds its lock,
+        restarting any that exit (their calls are already gone with them)
+        """
+        while True:
+            try:
+                if self._lead():
+                    for worker in self.workers:
+                        if worker.process is None:
+                            self._spawn(worker)
+                        elif worker.process.poll() is not None:
+                            logger.warning(f"Media worker {worker.url} exited with code {worker.process.returncode}, restarting")
+                            worker.restarts += 1
+                            self._spawn(worker)
+            except Exception as e:
+                logger.error(f"Error supervising media workers: {e}")
+            await asyncio.sleep(1)
+
+    async def _listen(self, worker):
+        """Follow one worker's /events socket, reconnecting while it (re)starts"""
+        failures = 0
+        while True:
+            try:
+                async with self._connect(f"{worker.url}/events") as events:
+                    worker.connected = True
+                    failures = 0
+                    logger.info(f"Connected to media worker {worker.url}")
+                    async for message in events:
+                        self._handle(json.loads(message))
+                logger.warning(f"Media worker {worker.url} closed its event stream, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                if worker.connected:
+                    logger.warning(f"Lost media worker {worker.url}: {e!r}, reconnecting")
+                elif failures % 60 == 0:
+                    # About every 30 s while it stays unreachable (a few misses are normal while it starts)
+                    logger.warning(f"Media worker {worker.url} unreachable for {failures // 2}s: {e!r}")
+                else:
+                    logger.debug(f"Media worker {worker.url} not reachable yet: {e!r}")
+            finally:
+                worker.connected = False
+            await asyncio.sleep(0.5)
+
+    def _handle(self, message):
+        # Every API process on the host follows the same workers; only the one
+        # that proxied a call republishes its events (it relays them to the others)
+        if message["call_uuid"] not in self._closed:
+            return
+        if message["type"] == "call_event":
+            event = dict(message["event"])
+            fields = {key: value for key, value in event.items()
+                      if key not in ("call_uuid", "status", "user_id", "timestamp")}
+            self.bus.publish(event["call_uuid"], event["status"], user_id=event.get("user_id"), **fields)
+        elif message["type"] == "session_closed":
+            self._closed[message["call_uuid"]].set()
+
+    def pick(self):
+        """Connected worker with the fewest sessions (None if none is connected)"""
+        connected = [worker for worker in self.workers if worker.connected]
+        return min(connected, key=lambda worker: worker.sessions) if connected else None
+
+    async def proxy(self, websocket, call_uuid, session):
+        """
+        Relay an accepted call socket to a worker until either side closes
+
+        session (custom_data, greeting_audio) is sent to the worker first, the
+        greeting as WAV bytes, so workers need no access to this host's files.
+        Returns False without touching the socket if no worker could take the call.
+        """
+        if not self.enabled:
+            return False
+        session = dict(session)
+        greeting_path = session.pop("greeting_audio", None)
+        if greeting_path:
+            try:
+                wav = await asyncio.to_thread(Path(greeting_path).read_bytes)
+                session["greeting_wav"] = base64.b64encode(wav).decode()
+            except OSError as e:
+                logger.warning(f"Could not read greeting {greeting_path} for call {call_uuid}: {e}")
+        worker = self.pick()
+        if worker is None:
+            logger.warning(f"No media worker connected, running call {call_uuid} in the API process")
+            self.fallbacks += 1
+            return False
+        # Counted before connecting, so calls arriving together are spread out; registered
+        # before the session starts, so none of its events is taken for another process's
+        worker.sessions += 1
+        closed = self._closed[call_uuid] = asyncio.Event()
+        try:
+            upstream = await self._connect(f"{worker.url}/ws/{call_uuid}", compression=None)
+            await upstream.send(json.dumps(session))
+        except Exception as e:
+            worker.sessions -= 1
+            self._closed.pop(call_uuid, None)
+            logger.warning(f"Media worker {worker.url} unavailable for call {call_uuid} ({e}), running it here")
+            self.fallbacks += 1
+            return False
+
+        self.proxied += 1
+        try:
+            async with upstream:
+                await self._relay(websocket, upstream)
+            # The worker sends the bot's final call events before it reports the session closed
+            try:
+                await asyncio.wait_for(closed.wait(), timeout=self.close_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Media worker {worker.url} did not close call {call_uuid} within {self.close_timeout:.0f}s")
+        finally:
+            worker.sessions -= 1
+            self._closed.pop(call_uuid, None)
+        return True
+
+    @staticmethod
+    async def _relay(websocket, upstream):
+        async def to_worker():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                await upstream.send(message["text"] if message.get("text") is not None else message["bytes"])
+
+        async def from_worker():
+            async for data in upstream:
+                if isinstance(data, str):
+                    await websocket.send_text(data)
+                else:
+                    await websocket.send_bytes(data)
+            # The bot ended the call
+            await websocket.close()
+
+        tasks = [asyncio.create_task(to_worker()), asyncio.create_task(from_worker())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            if task.exception() is not None:
+                logger.debug(f"Media relay ended: {task.exception()!r}")
+
+    def stats(self):
+        return {
+            "leader": self.leader,
+            "workers": [worker.stats() for worker in self.workers],
+            "sessions": sum(worker.sessions for worker in self.workers),
+            "proxied": self.proxied,
+            "fallbacks": self.fallbacks
+        }
+
+
+def create_worker_app(entry_point=MEDIA_WORKER_BOT, parent_pid=None, token=MEDIA_WORKER_TOKEN):
+    """
+    FastAPI app of a media worker: /ws/{call_uuid} runs the bot, /events streams its call events
+
+    With parent_pid, the worker shuts down once that process (the API that started it) is gone.
+    With token, sockets that don't send it are closed with 1008 (policy violation).
+    """
+    from fastapi import FastAPI, WebSocket
+    from pipecat.runner.types import WebSocketRunnerArguments
+    from events import call_events
+
+    module_name, function_name = entry_point.split(":")
+    run_session = getattr(importlib.import_module(module_name), function_name)
+
+    app = FastAPI()
+    subscribers = set()
+    sessions = set()
+
+    def send(message):
+        for queue in subscribers:
+            queue.put_nowait(message)
+
+    call_events.add_listener(lambda event: send({"type": "call_event", "call_uuid": event["call_uuid"], "event": event}))
+
+    async def accept(websocket):
+        """Accept the socket; False (after closing it) if the client didn't send the token"""
+        await websocket.accept()
+        if token and not hmac.compare_digest(websocket.headers.get(TOKEN_HEADER, "").encode(), token.encode()):
+            logger.warning(f"Refused media worker socket from {websocket.client}: missing or wrong token")
+            await websocket.close(code=1008)
+            return False
+        return True
+
+    async def watch_parent():
+        while os.getppid() == parent_pid:
+            await asyncio.sleep(1)
+        logger.warning(f"API process {parent_pid} exited, stopping media worker {os.getpid()}")
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    @app.on_event("startup")
+    async def startup():
+        if parent_pid is not None:
+            asyncio.create_task(watch_parent())
+
+    @app.websocket("/events")
+    async def events(websocket: WebSocket):
+        if not await accept(websocket):
+            return
+        queue = asyncio.Queue()
+        subscribers.add(queue)
+
+        async def forward():
+            while True:
+                await websocket.send_text(json.dumps(await queue.get()))
+
+        sender = asyncio.create_task(forward())
+        try:
+            # Returns once the API disconnects (it reconnects on its own)
+            await websocket.receive()
+        finally:
+            sender.cancel()
+            subscribers.discard(queue)
+
+    @app.websocket("/ws/{call_uuid}")
+    async def media_session(websocket: WebSocket, call_uuid: str):
+        if not await accept(websocket):
+            return
+        session = json.loads(await websocket.receive_text())
+        websocket.state.call_uuid = call_uuid
+        websocket.state.custom_data = session.get("custom_data") or {}
+        greeting_wav = session.get("greeting_wav")
+        websocket.state.greeting_audio = BytesIO(base64.b64decode(greeting_wav)) if greeting_wav else None
+        sessions.add(call_uuid)
+        try:
+            runner_args = WebSocketRunnerArguments(websocket=websocket)
+            runner_args.handle_sigint = False
+            await run_session(runner_args)
+        except Exception as e:
+            logger.error(f"Error in media session for call {call_uuid}: {e}")
+        finally:
+            sessions.discard(call_uuid)
+            send({"type": "session_closed", "call_uuid": call_uuid})
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "pid": os.getpid(), "sessions": len(sessions)}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Media worker: runs call pipelines handed over by the API")
+    parser.add_argument("--host", default=MEDIA_WORKER_HOST)
+    parser.add_argument("--port", type=int, default=MEDIA_WORKER_BASE_PORT)
+    parser.add_argument("--bot", default=MEDIA_WORKER_BOT, help="session entry point, module:function")
+    parser.add_argument("--parent-pid", type=int, help="exit when this process exits")
+    args = parser.parse_args()
+    if not MEDIA_WORKER_TOKEN and not is_loopback(args.host):
+        parser.error(f"MEDIA_WORKER_TOKEN must be set to listen on {args.host} (anyone reaching it could run calls)")
+
+    uvicorn.run(create_worker_app(args.bot, args.parent_pid), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,150 @@
+"""
+Plivo Call API with an outbound rate limiter
+
+Call creation goes through a token bucket sized to this process's share of
+the account's calls-per-second limit: PLIVO_CPS split evenly across the
+PLIVO_CPS_PROCESSES API processes dialing on the account. Throttled (429)
+and 5xx responses pause the bucket, halve its rate, and raise
+PlivoRetryableError so the caller can re-queue the call instead of failing
+it; the rate recovers gradually on success.
+"""
+
+import os
+import time
+import random
+import asyncio
+from loguru import logger
+
+from http_clients import http_clients
+
+PLIVO_AUTH_ID = os.getenv("PLIVO_AUTH_ID")
+PLIVO_AUTH_TOKEN = os.getenv("PLIVO_AUTH_TOKEN")
+PLIVO_PHONE_NUMBER = os.getenv("PLIVO_PHONE_NUMBER")
+
+# Outbound calls per second allowed on the Plivo account
+PLIVO_CPS = float(os.getenv("PLIVO_CPS", "2"))
+
+# API processes dialing on the account (uvicorn --workers, which defaults to WEB_CONCURRENCY), each allowed an equal share
+PLIVO_CPS_PROCESSES = max(1, int(os.getenv("PLIVO_CPS_PROCESSES", os.getenv("WEB_CONCURRENCY", "1"))))
+
+# Attempts per call (first dial included) before a throttled call is marked failed
+PLIVO_MAX_ATTEMPTS = int(os.getenv("PLIVO_MAX_ATTEMPTS", "5"))
+
+# Exponential backoff between attempts, in seconds
+PLIVO_BACKOFF_BASE = float(os.getenv("PLIVO_BACKOFF_BASE", "1"))
+PLIVO_BACKOFF_MAX = float(os.getenv("PLIVO_BACKOFF_MAX", "60"))
+
+
+class PlivoRetryableError(Exception):
+    """Plivo throttled the request or failed server-side; retry after `retry_after` seconds"""
+
+    def __init__(self, status_code, detail, retry_after):
+        super().__init__(f"Plivo API {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Async token bucket with pause and multiplicative-decrease/additive-increase rate"""
+
+    def __init__(self, rate, burst=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttle_count = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait for a token; callers are served in arrival order"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttled(self, pause):
+        """Upstream pushed back: stop issuing tokens for `pause` seconds and halve the rate"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, now + pause)
+        self.rate = max(self.max_rate / 10, self.rate / 2)
+        self.throttle_count += 1
+
+    def succeeded(self):
+        """Recover towards the configured rate after a successful request"""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def stats(self):
+        return {
+            "configured_rate": self.max_rate,
+            "current_rate": round(self.rate, 3),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "throttled": self.throttle_count
+        }
+
+
+# The bucket is per process, so each gets its share of the account's limit
+call_rate_limiter = TokenBucket(PLIVO_CPS / PLIVO_CPS_PROCESSES)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to wait before attempt `attempt + 1` (honours Retry-After when given)"""
+    if retry_after is not None:
+        return min(PLIVO_BACKOFF_MAX, retry_after)
+    delay = min(PLIVO_BACKOFF_MAX, PLIVO_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def create_call(to, answer_url, hangup_url, attempt=1):
+    """
+    Create an outbound call, waiting for the rate limiter first
+
+    Returns the httpx response for 2xx/4xx; raises PlivoRetryableError on 429/5xx.
+    """
+    await call_rate_limiter.acquire()
+
+    response = await http_clients.get("plivo").post(
+        f"https://api.plivo.com/v1/Account/{PLIVO_AUTH_ID}/Call/",
+        json={
+            "from": PLIVO_PHONE_NUMBER,
+            "to": to,
+            "answer_url": answer_url,
+            "answer_method": "POST",
+            "hangup_url": hangup_url,
+            "hangup_method": "POST"
+        },
+        auth=(PLIVO_AUTH_ID, PLIVO_AUTH_TOKEN)
+    )
+
+    if response.status_code == 429 or response.status_code >= 500:
+        delay = backoff_delay(attempt, _retry_after(response))
+        call_rate_limiter.throttled(delay)
+        logger.warning(f"Plivo call API returned {response.status_code} (attempt {attempt}), "
+                       f"backing off {delay:.1f}s at {call_rate_limiter.rate:.2f} CPS")
+        raise PlivoRetryableError(response.status_code, response.text, delay)
+
+    if response.status_code < 300:
+        call_rate_limiter.succeeded()
+    return response
@@ -1,35 +1,48 @@
 import os
+import json
 import uuid
 import base64
 import asyncio
-from typing import Dict
 from datetime import datetime
 from pathlib import Path
 import pytz
 
-from fastapi import FastAPI, WebSocket, Request, HTTPException, Depends
+from fastapi import FastAPI, WebSocket, Request, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response, FileResponse
+from fastapi.responses import JSONResponse, Response, FileResponse, StreamingResponse
 from loguru import logger
 from dotenv import load_dotenv
-import httpx
 from pydantic import BaseModel
 
+# Before the project imports below: their settings are read from the environment at import time
+load_dotenv(override=True)
+
 # Import bot function and services
 from bot import bot
 from whatsapp_service import send_whatsapp_message, format_payment_reminder_message
 from email_service import send_email, format_payment_reminder_email
 
 # Import authentication modules
-from database import Database
-from auth import create_access_token, get_current_user, require_super_admin
-
-load_dotenv(override=True)
+from database import Database, get_db, get_async_db
+from auth import create_access_token, get_current_user, get_current_user_sse, require_super_admin
+from events import call_events
+from dispatcher import TERMINAL_STATUSES, CallDispatcher
+from admission import AdmissionController, read_json_limited
+from call_registry import CallRecord, LiveCallRegistry
+from live_state import CallEventRelay, open_live_state
+from media_workers import MediaWorkerPool
+from http_clients import http_clients
+from greeting_service import (GREETING_DELIVERY, GREETINGS_DIR, GreetingPrefetcher, build_greeting_text, cached_greeting_path,
+                              greeting_audio_memory, greeting_cache, prerender_greetings, render_call_greeting)
+import plivo_api
+from plivo_api import PlivoRetryableError, PLIVO_MAX_ATTEMPTS
 
 app = FastAPI()
 
-# Initialize database
-db = Database()
+# Initialize database (shared pooled instance, also available via Depends(get_db))
+db = get_db()
+# Async facade - use this from handlers so SQLite I/O stays off the event loop
+adb = get_async_db()
 logger.info("Database initialized")
 
 # CORS middleware for Streamlit frontend
@@ -44,40 +57,188 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize queue lock and start background tasks"""
-    global queue_lock
-    queue_lock = asyncio.Lock()
-    # Start the queue processor
-    asyncio.create_task(process_call_queue())
-    logger.info("Call queue processor started")
+    """Restore queued/in-flight calls and start background tasks"""
+    # Heartbeat first, so other workers see this one's calls as looked after
+    await call_event_relay.start()
+    await rehydrate_calls()
+    if live_state.shared:
+        asyncio.create_task(sweep_orphaned_calls())
+    await media_workers.start()
+    # Drop half-written and pre-cache per-call greeting files
+    greeting_cache.gc(legacy_dir=GREETINGS_DIR)
+    # Open pooled connections to Plivo/Sarvam in the background
+    asyncio.create_task(http_clients.warm())
+    # Start the call dispatcher and greeting pre-rendering
+    asyncio.create_task(dispatcher.run())
+    asyncio.create_task(greeting_prefetcher.run())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled database and HTTP connections"""
+    # Hand this worker's calls over to the others right away
+    await call_event_relay.stop()
+    await live_state.close()
+    await media_workers.stop()
+    adb.close()
+    await http_clients.close()
+    logger.info("Database and HTTP connections closed")
+
+# In-memory state of live calls (finished calls are evicted after CALL_RECORD_TTL)
+call_data_store = LiveCallRegistry()
+call_events.add_listener(call_data_store.on_call_event)
+
+# Live state shared with the other workers (LIVE_STATE_URL; in-process only when unset)
+live_state = open_live_state()
+call_event_relay = CallEventRelay(live_state, call_events)
+call_events.add_listener(call_event_relay.on_call_event)
+
+# Call pipelines run in MEDIA_WORKERS worker processes (in this process when 0)
+media_workers = MediaWorkerPool(call_events)
+
+# Call queue - dialed concurrently (MAX_CONCURRENT_CALLS), round-robin across users
+dispatcher = CallDispatcher(
+    process_call=lambda call_data: process_single_call(call_data),
+    get_status=lambda call_uuid: call_data_store.get(call_uuid, {}).get("status")
+)
+# Capacity limits for /start and /start_batch (MAX_ACTIVE_CALLS, MAX_QUEUED_CALLS[_PER_USER])
+admission = AdmissionController(dispatcher)
+
+# Statuses of calls that were dialed and may still be live at Plivo
+LIVE_CALL_STATUSES = ["calling", "connected", "greeting_playing"]
 
-# In-memory storage for call data
-call_data_store: Dict[str, dict] = {}
+# Seconds between checks for calls left behind by a worker that died (shared live state only)
+LIVE_STATE_SWEEP_INTERVAL = float(os.getenv("LIVE_STATE_SWEEP_INTERVAL", "60"))
 
-# Call queue for sequential processing
-call_queue = []
-queue_lock = None  # Will be initialized in startup
-is_processing_queue = False
+# plivo_hangup, websocket_endpoint and bot finalization publish terminal statuses,
+# which signal the call's completion event so its slot is reused immediately
+call_events.add_listener(dispatcher.on_call_event)
+
+# Greetings for the next GREETING_LOOKAHEAD queued calls are synthesized ahead of dialing
+greeting_prefetcher = GreetingPrefetcher(
+    upcoming=dispatcher.upcoming,
+    render=lambda call_data: render_greeting(call_data)
+)
+dispatcher.add_queue_listener(greeting_prefetcher.kick)
 
 # Plivo credentials
 PLIVO_AUTH_ID = os.getenv("PLIVO_AUTH_ID")
 PLIVO_AUTH_TOKEN = os.getenv("PLIVO_AUTH_TOKEN")
 PLIVO_PHONE_NUMBER = os.getenv("PLIVO_PHONE_NUMBER")
 
-# Sarvam AI credentials
-SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
-
 # Server configuration
 SERVER_URL = os.getenv("SERVER_URL", "https://seagull-winning-personally.ngrok-free.app")
 
 # Audio file paths
 GREETING_AUDIO_PATH = os.getenv("GREETING_AUDIO_PATH", "output.wav")
-GREETINGS_DIR = Path("greetings")
-GREETINGS_DIR.mkdir(exist_ok=True)  # Create greetings directory if it doesn't exist
+
+
+def _call_state_from_db(call: dict) -> dict:
+    """call_data_store entry for a call loaded from the calls table"""
+    return {
+        "phone_number": call["phone_number"],
+        "custom_data": call["custom_data"],
+        "status": call["status"],
+        "created_at": call["created_at"],
+        "plivo_call_uuid": call["plivo_call_uuid"],
+        "user_id": call["user_id"],
+        "greeting_text": build_greeting_text(call["custom_data"])
+    }
+
+
+async def rehydrate_calls():
+    """
+    Rebuild the dispatcher queue and live call state from the calls table
+    
+    Queued calls are re-enqueued with their priority. Calls that were ringing or
+    playing the greeting are tracked again so their Plivo webhooks still resolve.
+    Calls that were mid-conversation lost their bot with the old process, and
+    /start calls that were never dialed (still "initiated") lost their request;
+    both are marked failed.
+    
+    With a shared live state, calls whose worker is still running are left to
+    it and this worker takes over the rest; workers do this one at a time.
+    """
+    restored = {"queued": 0, "live": 0, "failed": 0, "elsewhere": 0}
+    
+    async with live_state.lock("rehydrate", ttl=300, timeout=300):
+        calls = await adb.get_calls_by_status(["queued", "initiated", "in_progress"] + LIVE_CALL_STATUSES)
+        shared_calls = await live_state.get_many([call["call_uuid"] for call in calls])
+        alive = {}
+        taken = {}
+        
+        for call in calls:
+            call_uuid = call["call_uuid"]
+            worker = (shared_calls.get(call_uuid) or {}).get("worker")
+            if worker is not None:
+                if worker not in alive:
+                    alive[worker] = await call_event_relay.worker_alive(worker)
+                if alive[worker]:
+                    restored["elsewhere"] += 1
+                    continue
+            
+            if call["status"] in ("in_progress", "initiated"):
+                cause = "Server restarted during call" if call["status"] == "in_progress" else "Server restarted before dialing"
+                await adb.update_call_status(call_uuid, "failed", ended_at=datetime.now().isoformat(),
+                                             hangup_cause=cause)
+                restored["failed"] += 1
+                continue
+            
+            call_data_store[call_uuid] = _call_state_from_db(call)
+            taken[call_uuid] = {"worker": live_state.origin}
+            queued_call = {
+                "call_uuid": call_uuid,
+                "phone_number": call["phone_number"],
+                "custom_data": call["custom_data"]
+            }
+            if call["status"] == "queued":
+                dispatcher.enqueue(queued_call, user_id=call["user_id"], priority=call["priority"])
+                restored["queued"] += 1
+            else:
+                dispatcher.adopt(queued_call, user_id=call["user_id"])
+                restored["live"] += 1
+        
+        await live_state.update_many(taken)
+    
+    if restored["queued"] or restored["live"] or restored["failed"]:
+        logger.info(f"Rehydrated calls from database: {restored}")
+
+
+async def sweep_orphaned_calls():
+    """Take over calls of workers that stopped without handing them over (shared live state)"""
+    while True:
+        await asyncio.sleep(LIVE_STATE_SWEEP_INTERVAL)
+        try:
+            await rehydrate_calls()
+        except Exception as e:
+            logger.error(f"Error sweeping orphaned calls: {e}")
+
+
+async def get_call_state(call_uuid: str):
+    """call_data_store entry, loaded from the shared live state or the database if this process doesn't have it"""
+    call = call_data_store.get(call_uuid)
+    if call is None:
+        # Another worker's copy when the live state is shared (it has answer_xml etc.)
+        fields = await live_state.get(call_uuid) or {}
+        if "custom_data" not in fields:
+            db_call = await adb.get_call(call_uuid)
+            if db_call is None:
+                return None
+            fields = {**_call_state_from_db(db_call), **fields}
+        call_data_store[call_uuid] = {key: value for key, value in fields.items() if key in CallRecord.FIELDS}
+        call = call_data_store[call_uuid]
+        logger.info(f"Loaded call {call_uuid} (status: {call.get('status')})")
+    return call
+
+
+def publish_call_status(call_uuid: str, status: str, **fields):
+    """Notify dashboard subscribers of a status change"""
+    user_id = call_data_store.get(call_uuid, {}).get("user_id")
+    call_events.publish(call_uuid, status, user_id=user_id, **fields)
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(database: Database = Depends(get_db)):
     """Health check endpoint"""
     india_tz = pytz.timezone('Asia/Kolkata')
     return {
@@ -86,7 +247,18 @@ async def health_check():
         "plivo_configured": bool(PLIVO_AUTH_ID and PLIVO_AUTH_TOKEN),
         "whatsapp_configured": bool(os.getenv("WHATSAPP_ACCESS_TOKEN")),
         "email_configured": bool(os.getenv("SMTP_USERNAME")),
-        "audio_file_exists": os.path.exists(GREETING_AUDIO_PATH)
+        "audio_file_exists": os.path.exists(GREETING_AUDIO_PATH),
+        "database_pool": database.pool.stats(),
+        "call_events": call_events.stats(),
+        "dispatcher": dispatcher.stats(include_calls=False),
+        "admission": admission.stats(),
+        "live_calls": call_data_store.stats(),
+        "live_state": call_event_relay.stats(),
+        "media_workers": media_workers.stats(),
+        "greeting_prefetch": greeting_prefetcher.stats(),
+        "greeting_delivery": GREETING_DELIVERY,
+        "greeting_cache": greeting_cache.stats(),
+        "greeting_audio_memory": greeting_audio_memory.stats()
     }
 
 
@@ -117,9 +289,9 @@ class ChangePasswordRequest(BaseModel):
 @app.post("/api/auth/login")
 async def login(request: LoginRequest):
     """Login endpoint - returns JWT token"""
-    user = db.get_user_by_username(request.username)
+    user = await adb.get_user_by_username(request.username)
     
-    if not user or not db.verify_password(request.password, user["password_hash"]):
+    if not user or not await adb.verify_password(request.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     if not user["is_active"]:
@@ -149,7 +321,7 @@ async def login(request: LoginRequest):
 @app.get("/api/auth/me")
 async def get_me(current_user = Depends(get_current_user)):
     """Get current user info from JWT token"""
-    user = db.get_user_by_id(current_user["user_id"])
+    user = await adb.get_user_by_id(current_user["user_id"])
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -167,7 +339,7 @@ async def get_me(current_user = Depends(get_current_user)):
 async def create_user(request: CreateUserRequest, current_user = Depends(require_super_admin)):
     """Create new user (super admin only)"""
     try:
-        user_id = db.create_user(request.username, request.email, request.password, request.role)
+        user_id = await adb.create_user(request.username, request.email, request.password, request.role)
         
         # Create user-specific transcript directory
         user_transcript_dir = Path(f"transcripts/user_{user_id}")
@@ -188,7 +360,7 @@ async def create_user(request: CreateUserRequest, current_user = Depends(require
 @app.get("/api/users")
 async def get_users(current_user = Depends(require_super_admin)):
     """Get all users (super admin only)"""
-    users = db.get_all_users()
+    users = await adb.get_all_users()
     return {"users": users}
 
 
@@ -196,8 +368,8 @@ async def get_users(current_user = Depends(require_super_admin)):
 async def update_user(user_id: int, request: UpdateUserRequest, current_user = Depends(require_super_admin)):
     """Update user (super admin only)"""
     try:
-        db.update_user(user_id, email=request.email, is_active=request.is_active)
-        user = db.get_user_by_id(user_id)
+        await adb.update_user(user_id, email=request.email, is_active=request.is_active)
+        user = await adb.get_user_by_id(user_id)
         return {
             "id": user["id"],
             "username": user["username"],
@@ -218,7 +390,7 @@ async def delete_user(user_id: int, current_user = Depends(require_super_admin))
         if user_id == current_user["user_id"]:
             raise HTTPException(status_code=400, detail="Cannot delete your own account")
         
-        db.delete_user(user_id)
+        await adb.delete_user(user_id)
         return {"message": "User deactivated successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -228,7 +400,7 @@ async def delete_user(user_id: int, current_user = Depends(require_super_admin))
 async def change_own_password(request: ChangePasswordRequest, current_user = Depends(get_current_user)):
     """Change own password (any authenticated user)"""
     try:
-        user = db.get_user_by_id(current_user["user_id"])
+        user = await adb.get_user_by_id(current_user["user_id"])
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -237,11 +409,11 @@ async def change_own_password(request: ChangePasswordRequest, current_user = Dep
         if not request.old_password:
             raise HTTPException(status_code=400, detail="Old password is required")
         
-        if not db.verify_password(request.old_password, user["password_hash"]):
+        if not await adb.verify_password(request.old_password, user["password_hash"]):
             raise HTTPException(status_code=401, detail="Current password is incorrect")
         
         # Change password
-        db.change_password(current_user["user_id"], request.new_password)
+        await adb.change_password(current_user["user_id"], request.new_password)
         
         logger.info(f"User {user['username']} changed their password")
         return {"message": "Password changed successfully"}
@@ -255,13 +427,13 @@ async def change_own_password(request: ChangePasswordRequest, current_user = Dep
 async def reset_user_password(user_id: int, request: ChangePasswordRequest, current_user = Depends(require_super_admin)):
     """Reset user password (super admin only)"""
     try:
-        user = db.get_user_by_id(user_id)
+        user = await adb.get_user_by_id(user_id)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Super admin doesn't need to provide old password
-        db.change_password(user_id, request.new_password)
+        await adb.change_password(user_id, request.new_password)
         
         logger.info(f"Super admin {current_user['username']} reset password for user {user['username']}")
         return {"message": f"Password reset successfully for user {user['username']}"}
@@ -278,6 +450,70 @@ async def reset_user_password(user_id: int, request: ChangePasswordRequest, curr
 # EXPORT ENDPOINTS
 # ============================================================================
 
+def _add_transcript_outcomes(data, transcript_base_dir: Path):
+    """Set call_outcomes and cutoff_date on export records from their transcript files (and drop call_uuid)"""
+    for record in data:
+        call_uuid = record["call_uuid"]
+        invoice_number = record["invoice_number"]
+        
+        # Find transcript file
+        transcript_file = None
+        if transcript_base_dir.exists():
+            # Look for transcript file matching invoice_number and call_uuid
+            for file in transcript_base_dir.glob(f"{invoice_number}_*.txt"):
+                if call_uuid in file.stem:
+                    transcript_file = file
+                    break
+        
+        # Extract call outcomes and cutoff date from transcript
+        call_outcomes = "N/A"
+        cutoff_date = ""
+        if transcript_file and transcript_file.exists():
+            try:
+                with open(transcript_file, "r", encoding="utf-8") as f:
+                    content = f.read()
+                
+                # Extract outcomes from summary
+                if "**CALL OUTCOMES:**" in content:
+                    start = content.index("**CALL OUTCOMES:**") + len("**CALL OUTCOMES:**")
+                    # Find end of outcomes section (before numbered list)
+                    end = content.find("\n\n", start)
+                    if end == -1:
+                        end = content.find("1.", start)
+                    if end == -1:
+                        end = len(content)
+                    
+                    outcomes_text = content[start:end].strip()
+                    # Extract just the outcome names (remove "- " and details after ":")
+                    outcomes = []
+                    for line in outcomes_text.split('\n'):
+                        line = line.strip()
+                        if line.startswith('- '):
+                            outcome = line[2:].split(':')[0].strip()
+                            if outcome:
+                                outcomes.append(outcome)
+                            
+                            # Extract cutoff date if outcome is CUT_OFF_DATE_PROVIDED
+                            if outcome == "CUT_OFF_DATE_PROVIDED" and ':' in line:
+                                date_text = line.split(':', 1)[1].strip()
+                                # Try to parse the date
+                                try:
+                                    from dateutil import parser as date_parser
+                                    parsed_date = date_parser.parse(date_text, fuzzy=True)
+                                    cutoff_date = parsed_date.strftime("%Y-%m-%d")
+                                except:
+                                    cutoff_date = date_text  # Use raw text if parsing fails
+                    
+                    call_outcomes = ", ".join(outcomes) if outcomes else "N/A"
+            except Exception as e:
+                logger.warning(f"Error reading transcript for {call_uuid}: {e}")
+        
+        record["call_outcomes"] = call_outcomes
+        record["cutoff_date"] = cutoff_date
+        # Remove call_uuid from export
+        del record["call_uuid"]
+
+
 @app.get("/api/export/call_status")
 async def export_call_status(
     status: str = "all",
@@ -297,7 +533,7 @@ async def export_call_status(
         from datetime import datetime, timedelta
         
         # Get data from database (same as transcripts export)
-        data = db.get_export_data_with_transcripts(user_id=current_user["user_id"])
+        data = await adb.get_export_data_with_transcripts(user_id=current_user["user_id"])
         
         if not data:
             raise HTTPException(status_code=404, detail="No data found for export")
@@ -382,66 +618,7 @@ async def export_call_status(
         # Enrich with call outcomes from transcript files (same logic as transcripts export)
         transcript_base_dir = Path(f"transcripts/user_{current_user['user_id']}")
         
-        for record in data:
-            call_uuid = record["call_uuid"]
-            invoice_number = record["invoice_number"]
-            
-            # Find transcript file
-            transcript_file = None
-            if transcript_base_dir.exists():
-                # Look for transcript file matching invoice_number and call_uuid
-                for file in transcript_base_dir.glob(f"{invoice_number}_*.txt"):
-                    if call_uuid in file.stem:
-                        transcript_file = file
-                        break
-            
-            # Extract call outcomes and cutoff date from transcript
-            call_outcomes = "N/A"
-            cutoff_date = ""
-            if transcript_file and transcript_file.exists():
-                try:
-                    with open(transcript_file, "r", encoding="utf-8") as f:
-                        content = f.read()
-                    
-                    # Extract outcomes from summary
-                    if "**CALL OUTCOMES:**" in content:
-                        start = content.index("**CALL OUTCOMES:**") + len("**CALL OUTCOMES:**")
-                        # Find end of outcomes section (before numbered list)
-                        end = content.find("\n\n", start)
-                        if end == -1:
-                            end = content.find("1.", start)
-                        if end == -1:
-                            end = len(content)
-                        
-                        outcomes_text = content[start:end].strip()
-                        # Extract just the outcome names (remove "- " and details after ":")
-                        outcomes = []
-                        for line in outcomes_text.split('\n'):
-                            line = line.strip()
-                            if line.startswith('- '):
-                                outcome = line[2:].split(':')[0].strip()
-                                if outcome:
-                                    outcomes.append(outcome)
-                                
-                                # Extract cutoff date if outcome is CUT_OFF_DATE_PROVIDED
-                                if outcome == "CUT_OFF_DATE_PROVIDED" and ':' in line:
-                                    date_text = line.split(':', 1)[1].strip()
-                                    # Try to parse the date
-                                    try:
-                                        from dateutil import parser as date_parser
-                                        parsed_date = date_parser.parse(date_text, fuzzy=True)
-                                        cutoff_date = parsed_date.strftime("%Y-%m-%d")
-                                    except:
-                                        cutoff_date = date_text  # Use raw text if parsing fails
-                        
-                        call_outcomes = ", ".join(outcomes) if outcomes else "N/A"
-                except Exception as e:
-                    logger.warning(f"Error reading transcript for {call_uuid}: {e}")
-            
-            record["call_outcomes"] = call_outcomes
-            record["cutoff_date"] = cutoff_date
-            # Remove call_uuid from export
-            del record["call_uuid"]
+        await asyncio.to_thread(_add_transcript_outcomes, data, transcript_base_dir)
         
         # Create CSV in memory
         output = io.StringIO()
@@ -494,7 +671,7 @@ async def export_transcripts(
         from datetime import datetime, timedelta
         
         # Get data from database
-        data = db.get_export_data_with_transcripts(user_id=current_user["user_id"])
+        data = await adb.get_export_data_with_transcripts(user_id=current_user["user_id"])
         
         if not data:
             raise HTTPException(status_code=404, detail="No data found for export")
@@ -502,66 +679,7 @@ async def export_transcripts(
         # Enrich with call outcomes from transcript files
         transcript_base_dir = Path(f"transcripts/user_{current_user['user_id']}")
         
-        for record in data:
-            call_uuid = record["call_uuid"]
-            invoice_number = record["invoice_number"]
-            
-            # Find transcript file
-            transcript_file = None
-            if transcript_base_dir.exists():
-                # Look for transcript file matching invoice_number and call_uuid
-                for file in transcript_base_dir.glob(f"{invoice_number}_*.txt"):
-                    if call_uuid in file.stem:
-                        transcript_file = file
-                        break
-            
-            # Extract call outcomes and cutoff date from transcript
-            call_outcomes = "N/A"
-            cutoff_date = ""
-            if transcript_file and transcript_file.exists():
-                try:
-                    with open(transcript_file, "r", encoding="utf-8") as f:
-                        content = f.read()
-                    
-                    # Extract outcomes from summary
-                    if "**CALL OUTCOMES:**" in content:
-                        start = content.index("**CALL OUTCOMES:**") + len("**CALL OUTCOMES:**")
-                        # Find end of outcomes section (before numbered list)
-                        end = content.find("\n\n", start)
-                        if end == -1:
-                            end = content.find("1.", start)
-                        if end == -1:
-                            end = len(content)
-                        
-                        outcomes_text = content[start:end].strip()
-                        # Extract just the outcome names (remove "- " and details after ":")
-                        outcomes = []
-                        for line in outcomes_text.split('\n'):
-                            line = line.strip()
-                            if line.startswith('- '):
-                                outcome = line[2:].split(':')[0].strip()
-                                if outcome:
-                                    outcomes.append(outcome)
-                                
-                                # Extract cutoff date if outcome is CUT_OFF_DATE_PROVIDED
-                                if outcome == "CUT_OFF_DATE_PROVIDED" and ':' in line:
-                                    date_text = line.split(':', 1)[1].strip()
-                                    # Try to parse the date
-                                    try:
-                                        from dateutil import parser as date_parser
-                                        parsed_date = date_parser.parse(date_text, fuzzy=True)
-                                        cutoff_date = parsed_date.strftime("%Y-%m-%d")
-                                    except:
-                                        cutoff_date = date_text  # Use raw text if parsing fails
-                        
-                        call_outcomes = ", ".join(outcomes) if outcomes else "N/A"
-                except Exception as e:
-                    logger.warning(f"Error reading transcript for {call_uuid}: {e}")
-            
-            record["call_outcomes"] = call_outcomes
-            record["cutoff_date"] = cutoff_date
-            # Remove call_uuid from export
-            del record["call_uuid"]
+        await asyncio.to_thread(_add_transcript_outcomes, data, transcript_base_dir)
         
         # Apply filters after enriching data
         filtered_data = []
@@ -695,141 +813,114 @@ async def export_transcripts(
 # ============================================================================
 
 
+# Cache-Control for content-addressed greetings (a call's greeting never changes once rendered)
+GREETING_AUDIO_MAX_AGE = int(os.getenv("GREETING_AUDIO_MAX_AGE", "86400"))
+
+
+def _byte_range(range_header: str, size: int):
+    """
+    (start, end) inclusive for a single 'bytes=' range, None to send the whole
+    file (absent, malformed or multi-range), or False if unsatisfiable
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start, _, end = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(end)
+            if suffix == 0:
+                return False
+            start, end = max(0, size - suffix), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def audio_response(request: Request, path, cache_control: str) -> Response:
+    """WAV response served from greeting_audio_memory, with ETag revalidation and Range support"""
+    data, etag = greeting_audio_memory.load(path)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = _byte_range(request.headers.get("range"), len(data))
+    if byte_range is False:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(data)}"})
+    if byte_range is not None:
+        start, end = byte_range
+        return Response(data[start:end + 1], status_code=206, media_type="audio/wav",
+                        headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(data)}"})
+    return Response(data, media_type="audio/wav", headers=headers)
+
+
 @app.get("/audio/greeting.wav")
-async def serve_greeting_audio():
+async def serve_greeting_audio(request: Request):
     """Serve the greeting audio file."""
-    if not os.path.exists(GREETING_AUDIO_PATH):
+    try:
+        return audio_response(request, GREETING_AUDIO_PATH, "public, no-cache")
+    except FileNotFoundError:
         logger.error(f"Audio file not found at: {GREETING_AUDIO_PATH}")
         raise HTTPException(status_code=404, detail="Audio file not found")
-    
-    logger.info(f"Serving audio file from: {GREETING_AUDIO_PATH}")
-    return FileResponse(GREETING_AUDIO_PATH, media_type="audio/wav")
 
 
 @app.get("/audio/greeting/{call_uuid}.wav")
-async def serve_dynamic_greeting(call_uuid: str):
-    """Serve dynamic greeting audio for a specific call"""
-    file_path = GREETINGS_DIR / f"{call_uuid}.wav"
+async def serve_dynamic_greeting(call_uuid: str, request: Request):
+    """Serve dynamic greeting audio for a specific call (resolved through the greeting cache)"""
+    file_path = await call_greeting_path(call_uuid)
     
-    if not file_path.exists():
-        logger.warning(f"Dynamic greeting not found for {call_uuid}, using default")
-        # Fallback to default greeting
-        if os.path.exists(GREETING_AUDIO_PATH):
-            return FileResponse(GREETING_AUDIO_PATH, media_type="audio/wav")
-        raise HTTPException(status_code=404, detail="Audio file not found")
+    if file_path is not None:
+        try:
+            return audio_response(request, file_path, f"public, max-age={GREETING_AUDIO_MAX_AGE}, immutable")
+        except FileNotFoundError:
+            pass
     
-    logger.info(f"Serving dynamic greeting for call {call_uuid}")
-    return FileResponse(file_path, media_type="audio/wav")
+    logger.warning(f"Dynamic greeting not found for {call_uuid}, using default")
+    # Fallback to default greeting (revalidated, the call's own greeting may still be rendered)
+    try:
+        return audio_response(request, GREETING_AUDIO_PATH, "public, no-cache")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Audio file not found")
 
 
-def number_to_words(amount_str: str) -> str:
-    """Convert numeric amount to words for TTS"""
-    try:
-        # Remove currency symbols and commas
-        amount_str = str(amount_str).replace("₹", "").replace("rupees", "").replace(",", "").replace("+", "").strip()
-        num = int(float(amount_str))
-    except (ValueError, TypeError):
-        return str(amount_str)
-    
-    if num == 0:
-        return "zero"
-    
-    # Handle negative numbers
-    if num < 0:
-        return "minus " + number_to_words(abs(num))
+async def requeue_throttled_call(call_data: dict, error: PlivoRetryableError) -> bool:
+    """Put a call Plivo pushed back on into the queue again; False once attempts are used up"""
+    call_uuid = call_data["call_uuid"]
+    attempt = call_data.get("attempt", 1)
+    if attempt >= PLIVO_MAX_ATTEMPTS:
+        logger.error(f"Call {call_uuid} still throttled after {attempt} attempts, giving up")
+        return False
     
-    # Indian numbering system
-    ones = ["", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
-    teens = ["ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", 
-             "sixteen", "seventeen", "eighteen", "nineteen"]
-    tens = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+    call_data["attempt"] = attempt + 1
+    call_data_store[call_uuid]["status"] = "queued"
     
-    def convert_below_thousand(n):
-        if n == 0:
-            return ""
-        elif n < 10:
-            return ones[n]
-        elif n < 20:
-            return teens[n - 10]
-        elif n < 100:
-            return tens[n // 10] + (" " + ones[n % 10] if n % 10 != 0 else "")
-        else:
-            return ones[n // 100] + " hundred" + (" " + convert_below_thousand(n % 100) if n % 100 != 0 else "")
+    # Persist to database
+    await adb.update_call_status(call_uuid, "queued")
+    publish_call_status(call_uuid, "queued")
     
-    # Indian numbering: crore, lakh, thousand, hundred
-    if num >= 10000000:  # Crore
-        crore = num // 10000000
-        remainder = num % 10000000
-        result = convert_below_thousand(crore) + " crore"
-        if remainder > 0:
-            result += " " + number_to_words(remainder)
-        return result
-    elif num >= 100000:  # Lakh
-        lakh = num // 100000
-        remainder = num % 100000
-        result = convert_below_thousand(lakh) + " lakh"
-        if remainder > 0:
-            result += " " + number_to_words(remainder)
-        return result
-    elif num >= 1000:  # Thousand
-        thousand = num // 1000
-        remainder = num % 1000
-        result = convert_below_thousand(thousand) + " thousand"
-        if remainder > 0:
-            result += " " + convert_below_thousand(remainder)
-        return result
-    else:
-        return convert_below_thousand(num)
+    dispatcher.requeue(call_data, error.retry_after, user_id=call_data_store[call_uuid].get("user_id"))
+    logger.info(f"Call {call_uuid} requeued in {error.retry_after:.1f}s (attempt {attempt + 1}/{PLIVO_MAX_ATTEMPTS})")
+    return True
 
 
-async def generate_greeting_audio(text: str, call_uuid: str) -> str:
-    """Generate TTS audio using Sarvam AI and save to file"""
-    try:
-        logger.info(f"Generating greeting for call {call_uuid}: {text}")
-        
-        url = "https://api.sarvam.ai/text-to-speech"
-        
-        payload = {
-            "inputs": [text],
-            "target_language_code": "en-IN",
-            "speaker": "anushka",  # Female voice - matches the bot's voice
-            "pitch": 0,
-            "pace": 1.0,
-            "loudness": 1.5,
-            "speech_sample_rate": 8000,
-            "enable_preprocessing": True,
-            "model": "bulbul:v2"
-        }
-        
-        headers = {
-            "Content-Type": "application/json", 
-            "API-Subscription-Key": SARVAM_API_KEY
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            response_data = response.json()
-        
-        # Audio is returned as base64 encoded string in the 'audios' list
-        audio_base64 = response_data["audios"][0]
-        audio_data = base64.b64decode(audio_base64)
-            
-        file_path = GREETINGS_DIR / f"{call_uuid}.wav"
-        
-        # Write to file
-        with open(file_path, "wb") as f:
-            f.write(audio_data)
-        
-        logger.info(f"Successfully generated greeting audio for call {call_uuid}")
-        return str(file_path)
-        
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Sarvam AI API error for call {call_uuid}: {e.response.status_code} - {e.response.text}")
-        return None
-    except Exception as e:
-        logger.error(f"Error generating greeting audio for call {call_uuid}: {e}")
+async def render_greeting(call_data: dict):
+    """Render a call's greeting into the greeting cache (reused if the same text was rendered)"""
+    return await render_call_greeting(call_data["custom_data"], call_data["call_uuid"])
+
+
+async def call_greeting_path(call_uuid: str):
+    """Cached greeting audio for a call, or None if it was never rendered (or was evicted)"""
+    call_state = await get_call_state(call_uuid)
+    if call_state is None:
         return None
+    greeting_text = call_state.get("greeting_text") or build_greeting_text(call_state.get("custom_data") or {})
+    return cached_greeting_path(greeting_text)
 
 
 async def process_single_call(call_data: dict) -> dict:
@@ -841,48 +932,42 @@ async def process_single_call(call_data: dict) -> dict:
     try:
         logger.info(f"Processing call {call_uuid} to {phone_number}")
         
-        # Generate Dynamic Greeting
-        customer_name = custom_data.get("customer_name", "")
-        invoice_number = custom_data.get("invoice_number", "unknown")
-        outstanding_balance = custom_data.get("outstanding_balance", "")
-        invoice_date = custom_data.get("invoice_date", "")
-        
         # Build personalized greeting text
-        balance_in_words = number_to_words(outstanding_balance) if outstanding_balance else "unknown"
-        greeting_text = f"Hi, this is Sara from Hummingbird's commercial team. I'm calling regarding the T A C due of rupees {balance_in_words} for the invoice dated {invoice_date}. When can we expect the payment?"
+        greeting_text = build_greeting_text(custom_data)
         
         logger.info(f"Greeting text: {greeting_text}")
         
         # Store greeting text in call_data_store for bot to access
         call_data_store[call_uuid]["greeting_text"] = greeting_text
         
-        # Generate the audio file
-        generated_path = await generate_greeting_audio(greeting_text, call_uuid)
+        # Usually already rendered by the prefetcher (or by an earlier attempt if requeued)
+        generated_path = await greeting_prefetcher.greeting(call_data)
         
         if not generated_path:
             logger.warning(f"Greeting generation failed for {call_uuid}, will use default")
         
-        # Make Plivo API call
-        plivo_url = f"https://api.plivo.com/v1/Account/{PLIVO_AUTH_ID}/Call/"
+        # Rendered now so plivo_answer only has to look it up
+        call_data_store[call_uuid]["answer_xml"] = build_answer_xml(call_uuid, bool(generated_path))
+        
+        # Shared before dialing, so whichever worker Plivo's webhooks reach can answer
+        await live_state.update(call_uuid, {**call_data_store[call_uuid].to_dict(), "worker": live_state.origin})
+        
+        # Make Plivo API call (rate limited; throttled calls go back in the queue)
         answer_url = f"{SERVER_URL}/plivo_answer/{call_uuid}"
         hangup_url = f"{SERVER_URL}/plivo_hangup/{call_uuid}"
         
-        plivo_payload = {
-            "from": PLIVO_PHONE_NUMBER,
-            "to": phone_number,
-            "answer_url": answer_url,
-            "answer_method": "POST",
-            "hangup_url": hangup_url,
-            "hangup_method": "POST"
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                plivo_url,
-                json=plivo_payload,
-                auth=(PLIVO_AUTH_ID, PLIVO_AUTH_TOKEN),
-                timeout=30.0
-            )
+        try:
+            response = await plivo_api.create_call(phone_number, answer_url, hangup_url,
+                                                   attempt=call_data.get("attempt", 1))
+        except PlivoRetryableError as e:
+            if await requeue_throttled_call(call_data, e):
+                return {
+                    "success": False,
+                    "call_uuid": call_uuid,
+                    "requeued": True,
+                    "error": str(e)
+                }
+            raise
         
         if response.status_code in [200, 201, 202]:
             plivo_response = response.json()
@@ -892,7 +977,8 @@ async def process_single_call(call_data: dict) -> dict:
             call_data_store[call_uuid]["status"] = "calling"
             
             # Persist to database
-            db.update_call_status(call_uuid, "calling", plivo_call_uuid=plivo_call_uuid)
+            await adb.update_call_status(call_uuid, "calling", plivo_call_uuid=plivo_call_uuid)
+            publish_call_status(call_uuid, "calling")
             
             logger.info(f"Call initiated successfully: {call_uuid} (Plivo: {plivo_call_uuid})")
             
@@ -908,7 +994,8 @@ async def process_single_call(call_data: dict) -> dict:
             call_data_store[call_uuid]["status"] = "failed"
             
             # Persist to database
-            db.update_call_status(call_uuid, "failed")
+            await adb.update_call_status(call_uuid, "failed")
+            publish_call_status(call_uuid, "failed")
             
             return {
                 "success": False,
@@ -922,7 +1009,8 @@ async def process_single_call(call_data: dict) -> dict:
             call_data_store[call_uuid]["status"] = "failed"
             
             # Persist to database
-            db.update_call_status(call_uuid, "failed")
+            await adb.update_call_status(call_uuid, "failed")
+            publish_call_status(call_uuid, "failed")
         return {
             "success": False,
             "call_uuid": call_uuid,
@@ -930,50 +1018,6 @@ async def process_single_call(call_data: dict) -> dict:
         }
 
 
-async def process_call_queue():
-    """Background task to process calls from queue sequentially"""
-    global is_processing_queue
-    
-    logger.info("Call queue processor started")
-    
-    while True:
-        try:
-            async with queue_lock:
-                if not call_queue:
-                    is_processing_queue = False
-                    await asyncio.sleep(1)
-                    continue
-                
-                is_processing_queue = True
-                call_data = call_queue.pop(0)
-            
-            # Process the call
-            result = await process_single_call(call_data)
-            logger.info(f"Call processed: {result}")
-            
-            # Wait for call to complete by monitoring call_data_store
-            call_uuid = call_data["call_uuid"]
-            max_wait_time = 600  # 10 minutes max
-            elapsed_time = 0
-            
-            while elapsed_time < max_wait_time:
-                await asyncio.sleep(2)  # Check every 2 seconds
-                elapsed_time += 2
-                
-                if call_uuid in call_data_store:
-                    status = call_data_store[call_uuid].get("status")
-                    if status in ["completed", "failed", "declined", "invalid", "out_of_service", "nonexistent", "unallocated", "not_reachable"]:
-                        logger.info(f"Call {call_uuid} finished with status: {status}")
-                        break
-            
-            # Small delay before next call
-            await asyncio.sleep(1)
-            
-        except Exception as e:
-            logger.error(f"Error in process_call_queue: {e}")
-            await asyncio.sleep(1)
-
-
 VERIFY_TOKEN = "aaqil123"  # Set this to the same value you provide in Meta dashboard
 
 
@@ -1021,122 +1065,142 @@ async def start_call(request: Request, current_user = Depends(get_current_user))
         if not phone_number:
             raise HTTPException(status_code=400, detail="phone_number is required")
         
-        # Generate unique call UUID
-        call_uuid = str(uuid.uuid4())
-        
-        # Store call data with India timezone and user_id
-        india_tz = pytz.timezone('Asia/Kolkata')
-        created_at = datetime.now(india_tz).isoformat()
-        
-        call_data_store[call_uuid] = {
-            "phone_number": phone_number,
-            "custom_data": custom_data,
-            "status": "initiated",
-            "created_at": created_at,
-            "plivo_call_uuid": None,
-            "user_id": current_user["user_id"]  # Add user_id for data isolation
-        }
-        
-        # Persist to database
-        db.create_call(
-            call_uuid=call_uuid,
-            phone_number=phone_number,
-            customer_name=custom_data.get("customer_name", ""),
-            invoice_number=custom_data.get("invoice_number", ""),
-            user_id=current_user["user_id"],
-            custom_data=custom_data,
-            created_at=created_at
-        )
-        
-        # Insert customer data (standard columns only)
-        db.insert_customer_data(
-            call_uuid=call_uuid,
-            customer_name=custom_data.get("customer_name", ""),
-            phone_number=phone_number,
-            whatsapp_number=custom_data.get("whatsapp_number", ""),
-            email=custom_data.get("email", ""),
-            invoice_number=custom_data.get("invoice_number", ""),
-            invoice_date=custom_data.get("invoice_date", ""),
-            total_amount=custom_data.get("total_amount", ""),
-            outstanding_balance=custom_data.get("outstanding_balance", ""),
-            created_at=created_at
-        )
-        
-        logger.info(f"Initiating call {call_uuid} to {phone_number}")
-        logger.info(f"Custom data received (customer info redacted for security)")
-        
-        # Generate Dynamic Greeting BEFORE initiating the call
-        customer_name = custom_data.get("customer_name", "")
-        invoice_number = custom_data.get("invoice_number", "unknown")
-        outstanding_balance = custom_data.get("outstanding_balance", "")
-        invoice_date = custom_data.get("invoice_date", "")
-        
-        # Build personalized greeting text
-        balance_in_words = number_to_words(outstanding_balance) if outstanding_balance else "unknown"
-        greeting_text = f"Hi, this is Sara from Hummingbird's commercial team. I'm calling regarding the T A C due of rupees {balance_in_words} for the invoice dated {invoice_date}. When can we expect the payment?"
-        
-        logger.info(f"Greeting text: {greeting_text}")
-        
-        # Generate the audio file
-        generated_path = await generate_greeting_audio(greeting_text, call_uuid)
-        
-        if not generated_path:
-            logger.warning(f"Greeting generation failed for {call_uuid}, will use default")
-        
-        # Make Plivo API call to initiate the call
-        plivo_url = f"https://api.plivo.com/v1/Account/{PLIVO_AUTH_ID}/Call/"
-        
-        # Construct the answer URL and hangup URL with call UUID
-        answer_url = f"{SERVER_URL}/plivo_answer/{call_uuid}"
-        hangup_url = f"{SERVER_URL}/plivo_hangup/{call_uuid}"
-        
-        plivo_payload = {
-            "from": PLIVO_PHONE_NUMBER,
-            "to": phone_number,
-            "answer_url": answer_url,
-            "answer_method": "POST",
-            "hangup_url": hangup_url,
-            "hangup_method": "POST"
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                plivo_url,
-                json=plivo_payload,
-                auth=(PLIVO_AUTH_ID, PLIVO_AUTH_TOKEN),
-                timeout=30.0
+        # Dialed right away, so only while a call slot is free (queued calls go first)
+        retry_after = admission.admit_call()
+        if retry_after is not None:
+            logger.warning(f"Refusing call to {phone_number}: all {admission.max_active} call slots busy")
+            return JSONResponse(
+                {"success": False, "error": "All call slots are busy, retry later", "retry_after": retry_after},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
             )
         
-        if response.status_code in [200, 201, 202]:
-            plivo_response = response.json()
-            plivo_call_uuid = plivo_response.get("request_uuid") or plivo_response.get("message_uuid")
-            
-            call_data_store[call_uuid]["plivo_call_uuid"] = plivo_call_uuid
-            call_data_store[call_uuid]["status"] = "calling"
-            
-            # Persist to database
-            db.update_call_status(call_uuid, "calling", plivo_call_uuid=plivo_call_uuid)
+        try:
+            # Generate unique call UUID
+            call_uuid = str(uuid.uuid4())
             
-            logger.info(f"Call initiated successfully: {call_uuid} (Plivo: {plivo_call_uuid})")
+            # Store call data with India timezone and user_id
+            india_tz = pytz.timezone('Asia/Kolkata')
+            created_at = datetime.now(india_tz).isoformat()
             
-            return JSONResponse({
-                "success": True,
-                "call_uuid": call_uuid,
-                "plivo_call_uuid": plivo_call_uuid,
+            call_data_store[call_uuid] = {
                 "phone_number": phone_number,
-                "status": "calling"
-            })
-        else:
-            logger.error(f"Plivo API error: {response.status_code} - {response.text}")
-            call_data_store[call_uuid]["status"] = "failed"
+                "custom_data": custom_data,
+                "status": "initiated",
+                "created_at": created_at,
+                "plivo_call_uuid": None,
+                "user_id": current_user["user_id"]  # Add user_id for data isolation
+            }
+            
+            # Claimed before the row exists, so another worker's sweep never takes this "initiated" call for orphaned
+            await live_state.update(call_uuid, {**call_data_store[call_uuid].to_dict(), "worker": live_state.origin})
             
             # Persist to database
-            db.update_call_status(call_uuid, "failed")
+            await adb.create_call(
+                call_uuid=call_uuid,
+                phone_number=phone_number,
+                customer_name=custom_data.get("customer_name", ""),
+                invoice_number=custom_data.get("invoice_number", ""),
+                user_id=current_user["user_id"],
+                custom_data=custom_data,
+                created_at=created_at
+            )
             
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to initiate call: {response.text}"
+            # Insert customer data (standard columns only)
+            await adb.insert_customer_data(
+                call_uuid=call_uuid,
+                customer_name=custom_data.get("customer_name", ""),
+                phone_number=phone_number,
+                whatsapp_number=custom_data.get("whatsapp_number", ""),
+                email=custom_data.get("email", ""),
+                invoice_number=custom_data.get("invoice_number", ""),
+                invoice_date=custom_data.get("invoice_date", ""),
+                total_amount=custom_data.get("total_amount", ""),
+                outstanding_balance=custom_data.get("outstanding_balance", ""),
+                created_at=created_at
             )
+            
+            logger.info(f"Initiating call {call_uuid} to {phone_number}")
+            logger.info(f"Custom data received (customer info redacted for security)")
+            
+            # Generate Dynamic Greeting BEFORE initiating the call
+            greeting_text = build_greeting_text(custom_data)
+            call_data_store[call_uuid]["greeting_text"] = greeting_text
+            
+            logger.info(f"Greeting text: {greeting_text}")
+            
+            # Generate the audio file
+            generated_path = await render_call_greeting(custom_data, call_uuid)
+            
+            if not generated_path:
+                logger.warning(f"Greeting generation failed for {call_uuid}, will use default")
+            
+            # Rendered now so plivo_answer only has to look it up
+            call_data_store[call_uuid]["answer_xml"] = build_answer_xml(call_uuid, bool(generated_path))
+            
+            # Shared before dialing, so whichever worker Plivo's webhooks reach can answer
+            await live_state.update(call_uuid, {**call_data_store[call_uuid].to_dict(), "worker": live_state.origin})
+            
+            # Make Plivo API call to initiate the call
+            # Construct the answer URL and hangup URL with call UUID
+            answer_url = f"{SERVER_URL}/plivo_answer/{call_uuid}"
+            hangup_url = f"{SERVER_URL}/plivo_hangup/{call_uuid}"
+            
+            try:
+                response = await plivo_api.create_call(phone_number, answer_url, hangup_url)
+            except PlivoRetryableError as e:
+                # Throttled: hand the call to the dispatcher instead of failing it
+                call_data = {"call_uuid": call_uuid, "phone_number": phone_number, "custom_data": custom_data}
+                if not await requeue_throttled_call(call_data, e):
+                    raise
+                return JSONResponse({
+                    "success": True,
+                    "call_uuid": call_uuid,
+                    "phone_number": phone_number,
+                    "status": "queued"
+                })
+            
+            if response.status_code in [200, 201, 202]:
+                plivo_response = response.json()
+                plivo_call_uuid = plivo_response.get("request_uuid") or plivo_response.get("message_uuid")
+                
+                call_data_store[call_uuid]["plivo_call_uuid"] = plivo_call_uuid
+                call_data_store[call_uuid]["status"] = "calling"
+                
+                # Persist to database
+                await adb.update_call_status(call_uuid, "calling", plivo_call_uuid=plivo_call_uuid)
+                publish_call_status(call_uuid, "calling")
+                
+                # Holds a dispatcher slot until it ends, like a batch call
+                dispatcher.adopt({
+                    "call_uuid": call_uuid,
+                    "phone_number": phone_number,
+                    "custom_data": custom_data
+                }, user_id=current_user["user_id"])
+                
+                logger.info(f"Call initiated successfully: {call_uuid} (Plivo: {plivo_call_uuid})")
+                
+                return JSONResponse({
+                    "success": True,
+                    "call_uuid": call_uuid,
+                    "plivo_call_uuid": plivo_call_uuid,
+                    "phone_number": phone_number,
+                    "status": "calling"
+                })
+            else:
+                logger.error(f"Plivo API error: {response.status_code} - {response.text}")
+                call_data_store[call_uuid]["status"] = "failed"
+                
+                # Persist to database
+                await adb.update_call_status(call_uuid, "failed")
+                publish_call_status(call_uuid, "failed")
+                
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"Failed to initiate call: {response.text}"
+                )
+        finally:
+            admission.call_started()
     
     except HTTPException:
         raise
@@ -1148,12 +1212,14 @@ async def start_call(request: Request, current_user = Depends(get_current_user))
 @app.post("/start_batch")
 async def start_batch_calls(request: Request, current_user = Depends(get_current_user)):
     """
-    Initiate a batch of calls sequentially (requires authentication)
+    Queue a batch of calls for the dispatcher (requires authentication)
     Expected JSON body:
     {
+        "priority": 0,              # optional, higher is dialed first
         "calls": [
             {
                 "phone_number": "+919876543210",
+                "priority": 5,      # optional, overrides the batch priority
                 "body": {
                     "customer_name": "John Doe",
                     "invoice_number": "INV-001",
@@ -1163,88 +1229,101 @@ async def start_batch_calls(request: Request, current_user = Depends(get_current
             ...
         ]
     }
+    Within the same priority, calls are ordered by CALL_PRIORITY_STRATEGY
+    (outstanding balance by default).
+    
+    Calls are queued up to MAX_QUEUED_CALLS_PER_USER / MAX_QUEUED_CALLS, in
+    array order; the rest come back in "rejected" (with their index and a
+    reason) and a Retry-After. If none could be queued the status is 429.
     """
     try:
-        data = await request.json()
-        calls = data.get("calls", [])
+        # Bodies over MAX_BATCH_BYTES are refused (413) before being read
+        data = await read_json_limited(request)
+        calls = data.get("calls", []) if isinstance(data, dict) else None
         
-        if not calls:
+        if not calls or not isinstance(calls, list):
             raise HTTPException(status_code=400, detail="calls array is required")
         
+        try:
+            batch_priority = int(data.get("priority", 0))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="priority must be an integer")
+        
         logger.info(f"Received batch request for {len(calls)} calls from user {current_user['user_id']}")
         
-        # Add all calls to queue
-        call_uuids = []
-        async with queue_lock:
-            for call_data in calls:
-                phone_number = call_data.get("phone_number")
-                custom_data = call_data.get("body", {})
-                
-                if not phone_number:
-                    logger.warning("Skipping call with missing phone_number")
-                    continue
-                
-                # Generate unique call UUID
-                call_uuid = str(uuid.uuid4())
-                
-                # Store call data with India timezone and user_id
-                india_tz = pytz.timezone('Asia/Kolkata')
-                created_at = datetime.now(india_tz).isoformat()
-                
-                call_data_store[call_uuid] = {
-                    "phone_number": phone_number,
-                    "custom_data": custom_data,
-                    "status": "queued",
-                    "created_at": created_at,
-                    "plivo_call_uuid": None,
-                    "user_id": current_user["user_id"]  # Add user_id for data isolation
-                }
-                
-                # Persist to database
-                db.create_call(
-                    call_uuid=call_uuid,
-                    phone_number=phone_number,
-                    customer_name=custom_data.get("customer_name", ""),
-                    invoice_number=custom_data.get("invoice_number", ""),
-                    user_id=current_user["user_id"],
-                    custom_data=custom_data,
-                    created_at=created_at
-                )
-                
-                # Insert customer data (standard columns only)
-                db.insert_customer_data(
-                    call_uuid=call_uuid,
-                    customer_name=custom_data.get("customer_name", ""),
-                    phone_number=phone_number,
-                    whatsapp_number=custom_data.get("whatsapp_number", ""),
-                    email=custom_data.get("email", ""),
-                    invoice_number=custom_data.get("invoice_number", ""),
-                    invoice_date=custom_data.get("invoice_date", ""),
-                    total_amount=custom_data.get("total_amount", ""),
-                    outstanding_balance=custom_data.get("outstanding_balance", ""),
-                    created_at=created_at
-                )
-                
-                # Update status to queued in database
-                db.update_call_status(call_uuid, "queued")
-                
-                # Add to queue
-                call_queue.append({
-                    "call_uuid": call_uuid,
-                    "phone_number": phone_number,
-                    "custom_data": custom_data
-                })
-                
-                call_uuids.append(call_uuid)
+        # Build all call records up front (no DB or lock held)
+        india_tz = pytz.timezone('Asia/Kolkata')
+        new_calls = []
+        indexes = []
+        rejected = []
+        for index, call_data in enumerate(calls):
+            phone_number = call_data.get("phone_number") if isinstance(call_data, dict) else None
+            
+            if not phone_number:
+                logger.warning("Skipping call with missing phone_number")
+                rejected.append({"index": index, "phone_number": None, "reason": "missing_phone_number"})
+                continue
+            custom_data = call_data.get("body", {})
+            
+            try:
+                priority = int(call_data.get("priority", batch_priority))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"priority must be an integer (call to {phone_number})")
+            
+            new_calls.append({
+                "call_uuid": str(uuid.uuid4()),
+                "phone_number": phone_number,
+                "custom_data": custom_data,
+                "priority": priority,
+                "created_at": datetime.now(india_tz).isoformat()
+            })
+            indexes.append(index)
+        
+        # Only as many calls as the queue has room for; the rest are refused now rather than queued for hours
+        user_id = current_user["user_id"]
+        admitted, reason = admission.admit_batch(user_id, len(new_calls))
+        retry_after = None
+        if reason is not None:
+            retry_after = admission.retry_after(len(new_calls) - admitted)
+            rejected.extend(
+                {"index": index, "phone_number": new_call["phone_number"], "reason": reason}
+                for index, new_call in zip(indexes[admitted:], new_calls[admitted:])
+            )
+            new_calls = new_calls[:admitted]
+            logger.warning(f"Batch from user {user_id}: queue room for {admitted} of {len(indexes)} calls ({reason})")
+            if not new_calls:
+                return JSONResponse({
+                    "success": False,
+                    "error": f"Call queue is full ({reason}), retry later",
+                    "call_uuids": [],
+                    "accepted": 0,
+                    "rejected": rejected,
+                    "retry_after": retry_after,
+                    "queue_length": len(dispatcher)
+                }, status_code=429, headers={"Retry-After": str(retry_after)})
+        
+        try:
+            call_uuids = await queue_batch_calls(new_calls, user_id)
+        finally:
+            admission.batch_queued(user_id, admitted)
         
-        logger.info(f"Added {len(call_uuids)} calls to queue for user {current_user['user_id']}")
+        logger.info(f"Added {len(call_uuids)} calls to queue for user {user_id}")
         
-        return JSONResponse({
+        message = f"Added {len(call_uuids)} calls to queue"
+        if rejected:
+            message = f"Added {len(call_uuids)} of {len(calls)} calls to queue, {len(rejected)} rejected"
+        response = {
             "success": True,
-            "message": f"Added {len(call_uuids)} calls to queue",
+            "message": message,
             "call_uuids": call_uuids,
-            "queue_length": len(call_queue)
-        })
+            "accepted": len(call_uuids),
+            "rejected": rejected,
+            "queue_length": len(dispatcher)
+        }
+        if retry_after is None:
+            return JSONResponse(response)
+        response["retry_after"] = retry_after
+        return JSONResponse(response, headers={"Retry-After": str(retry_after)})
     
     except HTTPException:
         raise
@@ -1253,76 +1332,168 @@ async def start_batch_calls(request: Request, current_user = Depends(get_current
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def queue_batch_calls(new_calls, user_id):
+    """Persist admitted batch calls and hand them to the dispatcher; returns their call_uuids"""
+    records = {
+        new_call["call_uuid"]: {
+            "phone_number": new_call["phone_number"],
+            "custom_data": new_call["custom_data"],
+            "status": "queued",
+            "created_at": new_call["created_at"],
+            "plivo_call_uuid": None,
+            "user_id": user_id  # Add user_id for data isolation
+        }
+        for new_call in new_calls
+    }
+    
+    # Shared first: another worker rehydrating from the calls table must see them as this one's
+    await live_state.update_many({
+        call_uuid: {**record, "worker": live_state.origin} for call_uuid, record in records.items()
+    })
+    
+    # Persist calls + customer data in one transaction, directly as "queued"
+    if new_calls:
+        await adb.create_calls_bulk(new_calls, user_id=user_id, status="queued")
+    
+    # Greeting audio for the whole batch in batched Sarvam requests (registered
+    # before enqueueing, so the prefetcher waits on these instead of duplicating them)
+    prerender_greetings([new_call["custom_data"] for new_call in new_calls])
+    
+    # Add all calls to queue
+    call_uuids = []
+    for new_call in new_calls:
+        call_uuid = new_call["call_uuid"]
+        
+        call_data_store[call_uuid] = records[call_uuid]
+        
+        dispatcher.enqueue({
+            "call_uuid": call_uuid,
+            "phone_number": new_call["phone_number"],
+            "custom_data": new_call["custom_data"]
+        }, user_id=user_id, priority=new_call["priority"])
+        
+        call_uuids.append(call_uuid)
+    
+    return call_uuids
+
+
+@app.get("/metrics/http")
+async def http_metrics(current_user = Depends(get_current_user)):
+    """Per-host latency of upstream API calls (Plivo, Sarvam) and the Plivo call rate limiter (requires authentication)"""
+    return {
+        **http_clients.stats(),
+        "plivo_call_rate_limiter": plivo_api.call_rate_limiter.stats()
+    }
+
+
+@app.get("/queue")
+async def queue_status(current_user = Depends(get_current_user)):
+    """
+    Dispatcher state: calls in flight and queued
+    - Regular users: counts plus their own in-flight/queued calls
+    - Super admin: every user's
+    """
+    if current_user["role"] == "super_admin":
+        return dispatcher.stats()
+    return dispatcher.stats(user_id=current_user["user_id"])
+
+
+@app.get("/queue/{call_uuid}")
+async def call_queue_position(call_uuid: str, current_user = Depends(get_current_user)):
+    """Queue position of one call (1 = dialed next); null once it has been dialed"""
+    call = call_data_store.get(call_uuid)
+    if not call or (current_user["role"] != "super_admin" and call.get("user_id") != current_user["user_id"]):
+        raise HTTPException(status_code=404, detail="Call not found")
+    
+    return {
+        "call_uuid": call_uuid,
+        "status": call.get("status"),
+        "queue_position": dispatcher.position(call_uuid),
+        "queue_length": len(dispatcher)
+    }
+
+
+def build_answer_xml(call_uuid: str, has_greeting: bool) -> str:
+    """Plivo XML that plays the greeting (unless it is streamed) and connects the call to the WebSocket"""
+    ws_url = f"{SERVER_URL.replace('https://', 'wss://').replace('http://', 'ws://')}/ws/{call_uuid}"
+    stream = f"""    <Stream bidirectional="true" keepCallAlive="true" contentType="audio/x-mulaw;rate=8000">
+        {ws_url}
+    </Stream>"""
+    
+    if GREETING_DELIVERY == "stream":
+        # The bot sends the greeting as the stream's first audio - no <Play> fetch
+        play = ""
+    else:
+        # Use dynamic greeting if available
+        audio_url = (f"{SERVER_URL}/audio/greeting/{call_uuid}.wav" if has_greeting
+                     else f"{SERVER_URL}/audio/greeting.wav")
+        play = f"    <Play>{audio_url}</Play>\n"
+    
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+{play}{stream}
+</Response>"""
+
+
+async def persist_call_status(call_uuid: str, status: str, only_from=None, **fields):
+    """
+    Write a status change that was already applied in memory, then notify subscribers
+
+    The write is deferred, so the call may have moved on by then (the stream
+    connecting sets in_progress). With only_from, the row is only updated from
+    those statuses, and nothing is published unless the call's record still
+    has this status.
+    """
+    try:
+        await adb.update_call_status(call_uuid, status, only_from=only_from, **fields)
+    except Exception as e:
+        logger.error(f"Error persisting status {status} for call {call_uuid}: {e}")
+    if only_from is not None and call_data_store.get(call_uuid, {}).get("status") != status:
+        logger.info(f"Call {call_uuid} moved on before its {status} status was written, not publishing it")
+        return
+    publish_call_status(call_uuid, status, **fields)
+
+
+# Statuses in which an answer callback (re)starts the greeting
+ANSWERABLE_STATUSES = {"initiated", "calling", "queued", "connected", "greeting_playing"}
+
+
 @app.post("/plivo_answer/{call_uuid}")
-async def plivo_answer(call_uuid: str, request: Request):
+async def plivo_answer(call_uuid: str, background_tasks: BackgroundTasks):
     """
     Plivo answer URL - returns XML to play audio greeting and connect call to WebSocket
+    
+    Plivo holds the line until this returns, so the XML is rendered when the
+    call is dialed and the status write happens after the response is sent.
     """
     try:
-        logger.info(f"Plivo answer callback for call {call_uuid}")
+        call_state = call_data_store.get(call_uuid)
+        if call_state is None:
+            # Falls back to the database for calls dialed before a restart
+            call_state = await get_call_state(call_uuid)
+            if call_state is None:
+                logger.error(f"Call UUID {call_uuid} not found")
+                return JSONResponse(
+                    content={"error": "Call not found"},
+                    status_code=404
+                )
         
-        if call_uuid not in call_data_store:
-            logger.error(f"Call UUID {call_uuid} not found")
-            return JSONResponse(
-                content={"error": "Call not found"},
-                status_code=404
+        xml_response = call_state.get("answer_xml")
+        if xml_response is None:
+            xml_response = call_state["answer_xml"] = build_answer_xml(
+                call_uuid, await call_greeting_path(call_uuid) is not None
             )
         
-        # Get current status
-        current_status = call_data_store[call_uuid].get("status")
-        logger.info(f"Current status for call {call_uuid}: {current_status}")
-        
         # Only update status if call is in early stages (not yet in progress or completed)
         # Include "greeting_playing" to allow Plivo's second call after greeting finishes
-        if current_status in ["initiated", "calling", "queued", "connected", "greeting_playing"]:
-            # Update call status
-            call_data_store[call_uuid]["status"] = "connected"
-            
-            # Track greeting start time and set status to greeting_playing
-            call_data_store[call_uuid]["greeting_start_time"] = datetime.now().isoformat()
-            call_data_store[call_uuid]["status"] = "greeting_playing"
-            
-            # Persist to database
-            db.update_call_status(call_uuid, "greeting_playing")
-            
-            logger.info(f"Updated call {call_uuid} status to greeting_playing")
-        else:
-            # Call already progressed past greeting stage - don't change status
-            logger.info(f"Call {call_uuid} already in state {current_status}, not updating status")
-        
-        # Get custom data for this call
-        custom_data = call_data_store[call_uuid].get("custom_data", {})
-        
-        # Construct WebSocket URL
-        ws_url = f"{SERVER_URL.replace('https://', 'wss://').replace('http://', 'ws://')}/ws/{call_uuid}"
-        
-        # Construct audio URL - use dynamic greeting if available
-        dynamic_greeting_path = GREETINGS_DIR / f"{call_uuid}.wav"
-        if dynamic_greeting_path.exists():
-            audio_url = f"{SERVER_URL}/audio/greeting/{call_uuid}.wav"
-            logger.info(f"Using dynamic greeting for call {call_uuid}")
-        else:
-            audio_url = f"{SERVER_URL}/audio/greeting.wav"
-            logger.warning(f"Dynamic greeting not found for {call_uuid}, using default")
-        
-        logger.info(f"Audio URL: {audio_url}")
-        logger.info(f"WebSocket URL: {ws_url}")
-        
-        # Return Plivo XML to play audio greeting and connect to WebSocket
-        xml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Play>{audio_url}</Play>
-    <Stream bidirectional="true" keepCallAlive="true" contentType="audio/x-mulaw;rate=8000">
-        {ws_url}
-    </Stream>
-</Response>"""
-        
-        logger.info(f"Returning Plivo XML for call {call_uuid}")
-        
-        return Response(
-            content=xml_response,
-            media_type="application/xml"
-        )
+        current_status = call_state.get("status")
+        if current_status in ANSWERABLE_STATUSES:
+            call_state["greeting_start_time"] = datetime.now().isoformat()
+            call_state["status"] = "greeting_playing"
+            background_tasks.add_task(persist_call_status, call_uuid, "greeting_playing", only_from=ANSWERABLE_STATUSES)
+        
+        logger.info(f"Answered call {call_uuid} (status {current_status})")
+        return Response(content=xml_response, media_type="application/xml")
     
     except Exception as e:
         logger.error(f"Error in plivo_answer: {e}")
@@ -1345,7 +1516,9 @@ async def plivo_hangup(call_uuid: str, request: Request):
         logger.info(f"Hangup webhook for call {call_uuid}")
         logger.info(f"Hangup data: {dict(form_data)}")
         
-        if call_uuid not in call_data_store:
+        # Keep the record itself: a finished call may be evicted from call_data_store meanwhile
+        call_state = await get_call_state(call_uuid)
+        if call_state is None:
             logger.warning(f"Call UUID {call_uuid} not found in hangup webhook")
             return Response(status_code=200)
         
@@ -1358,17 +1531,13 @@ async def plivo_hangup(call_uuid: str, request: Request):
         ended_at = datetime.now().isoformat()
         
         # Update call data
-        call_data_store[call_uuid]["hangup_cause"] = hangup_cause
-        call_data_store[call_uuid]["hangup_source"] = hangup_source
-        call_data_store[call_uuid]["ended_at"] = ended_at
+        call_state["hangup_cause"] = hangup_cause
+        call_state["hangup_source"] = hangup_source
+        call_state["ended_at"] = ended_at
         
         # Only update status if not already completed (avoid overwriting WebSocket status)
-        current_status = call_data_store[call_uuid].get("status")
-        if current_status not in ["completed", "in_progress",
-                                   "completed_conversation", "completed_commitment",
-                                   "completed_partial", "abandoned_pre_greeting",
-                                   "abandoned_post_greeting", "abandoned_early",
-                                   "no_response"]:
+        current_status = call_state.get("status")
+        if current_status != "in_progress" and current_status not in TERMINAL_STATUSES:
             # Map hangup causes to specific statuses
             if hangup_cause_name == "Rejected" or hangup_cause_code == "3020":
                 status = "declined"
@@ -1392,11 +1561,12 @@ async def plivo_hangup(call_uuid: str, request: Request):
                 # Set status to completed for all other cases
                 status = "completed"
             
-            call_data_store[call_uuid]["status"] = status
+            call_state["status"] = status
             
             # Persist to database
-            db.update_call_status(call_uuid, status, ended_at=ended_at, 
-                                hangup_cause=hangup_cause, hangup_source=hangup_source)
+            await adb.update_call_status(call_uuid, status, ended_at=ended_at, 
+                                         hangup_cause=hangup_cause, hangup_source=hangup_source)
+            publish_call_status(call_uuid, status, ended_at=ended_at, hangup_cause=hangup_cause)
             
             logger.info(f"Call {call_uuid} marked as {status} via hangup webhook")
         else:
@@ -1420,34 +1590,49 @@ async def websocket_endpoint(websocket: WebSocket, call_uuid: str):
     logger.info(f"WebSocket connection established for call {call_uuid}")
     
     # Store custom data in websocket state for bot to access
-    if call_uuid in call_data_store:
-        websocket.state.custom_data = call_data_store[call_uuid].get("custom_data", {})
+    call_state = await get_call_state(call_uuid)
+    if call_state is not None:
+        websocket.state.custom_data = call_state.get("custom_data", {})
         # Add greeting_text to custom_data so bot knows what was said
-        websocket.state.custom_data["greeting_text"] = call_data_store[call_uuid].get("greeting_text", "")
+        websocket.state.custom_data["greeting_text"] = call_state.get("greeting_text", "")
         # Add user_id to custom_data for transcript organization
-        websocket.state.custom_data["user_id"] = call_data_store[call_uuid].get("user_id")
+        websocket.state.custom_data["user_id"] = call_state.get("user_id")
         websocket.state.call_uuid = call_uuid
-        call_data_store[call_uuid]["status"] = "in_progress"
+        # The bot runs here, whichever worker dialed the call
+        await live_state.update(call_uuid, {"worker": live_state.origin})
+        if GREETING_DELIVERY == "stream":
+            # The bot plays this first, over the media stream
+            websocket.state.greeting_audio = await call_greeting_path(call_uuid) or (
+                GREETING_AUDIO_PATH if os.path.exists(GREETING_AUDIO_PATH) else None
+            )
+        call_state["status"] = "in_progress"
         
         # Persist to database
-        db.update_call_status(call_uuid, "in_progress")
+        await adb.update_call_status(call_uuid, "in_progress")
+        publish_call_status(call_uuid, "in_progress")
     else:
         logger.warning(f"Call UUID {call_uuid} not found in store")
         websocket.state.custom_data = {}
         websocket.state.call_uuid = call_uuid
     
     try:
-        # Import runner arguments - use WebSocketRunnerArguments for WebSocket connections
-        from pipecat.runner.types import WebSocketRunnerArguments
-        
-        # Create runner arguments
-        runner_args = WebSocketRunnerArguments(
-            websocket=websocket
-        )
-        runner_args.handle_sigint = False
-        
-        # Run the bot
-        await bot(runner_args)
+        # With media workers this loop only relays the call's frames to one of them
+        session = {
+            "custom_data": websocket.state.custom_data,
+            "greeting_audio": getattr(websocket.state, "greeting_audio", None)
+        }
+        if not await media_workers.proxy(websocket, call_uuid, session):
+            # Import runner arguments - use WebSocketRunnerArguments for WebSocket connections
+            from pipecat.runner.types import WebSocketRunnerArguments
+            
+            # Create runner arguments
+            runner_args = WebSocketRunnerArguments(
+                websocket=websocket
+            )
+            runner_args.handle_sigint = False
+            
+            # Run the bot
+            await bot(runner_args)
         
     except Exception as e:
         logger.error(f"Error in WebSocket for call {call_uuid}: {e}")
@@ -1459,79 +1644,182 @@ async def websocket_endpoint(websocket: WebSocket, call_uuid: str):
             call_data_store[call_uuid]["ended_at"] = ended_at
             
             # Persist to database
-            db.update_call_status(call_uuid, "completed", ended_at=ended_at)
-        
-        # Clean up dynamic greeting file
-        dynamic_greeting_path = GREETINGS_DIR / f"{call_uuid}.wav"
-        if dynamic_greeting_path.exists():
-            try:
-                dynamic_greeting_path.unlink()
-                logger.info(f"Deleted dynamic greeting for call {call_uuid}")
-            except Exception as e:
-                logger.error(f"Error deleting greeting file for {call_uuid}: {e}")
+            await adb.update_call_status(call_uuid, "completed", ended_at=ended_at)
+            publish_call_status(call_uuid, "completed", ended_at=ended_at)
+        # Greeting audio stays in the shared cache (other calls may use the same text)
+
+
+CALLS_MAX_PAGE_SIZE = int(os.getenv("CALLS_MAX_PAGE_SIZE", "500"))
+
+# Fields returned by /calls when the client doesn't ask for a projection
+DEFAULT_CALL_FIELDS = [
+    "call_uuid", "phone_number", "status", "created_at", "ended_at",
+    "customer_name", "invoice_number", "whatsapp_number", "email", "user_id"
+]
+
+
+def _encode_cursor(after) -> str:
+    """Opaque pagination cursor from a (created_at, call_uuid) keyset position"""
+    return base64.urlsafe_b64encode(json.dumps(list(after)).encode()).decode()
+
+
+def _calls_filter_user_id(user_id, current_user):
+    """Which user's calls a request may see (None = all users)"""
+    if current_user["role"] == "super_admin":
+        if user_id == 0:
+            # user_id=0 means "all users" for super admin
+            return None
+        elif user_id is not None:
+            # Super admin viewing specific user's calls
+            return user_id
+        # No user_id specified, show super admin's own calls
+        return current_user["user_id"]
+    # Regular user can only see their own calls
+    return current_user["user_id"]
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, call_uuid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (created_at, call_uuid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @app.get("/calls")
-async def list_calls(user_id: int = None, current_user = Depends(get_current_user)):
+async def list_calls(
+    user_id: int = None,
+    limit: int = None,
+    cursor: str = None,
+    status: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    search: str = None,
+    fields: str = None,
+    current_user = Depends(get_current_user)
+):
     """
     List calls with their current status from database (persistent call history)
     - Regular users: see only their own calls
     - Super admin: can see all calls or filter by user_id parameter
+    
+    Optional query parameters (all applied in SQL):
+    - limit / cursor: keyset pagination, newest first; pass back next_cursor for the next page
+    - status: one status or a comma-separated list
+    - start_date / end_date: YYYY-MM-DD, inclusive
+    - search: matches customer name, invoice number or phone number
+    - fields: comma-separated subset of fields to return (call_uuid and created_at always included)
     """
-    # Determine which user's calls to show
-    if current_user["role"] == "super_admin":
-        if user_id == 0:
-            # user_id=0 means "all users" for super admin
-            filter_user_id = None
-        elif user_id is not None:
-            # Super admin viewing specific user's calls
-            filter_user_id = user_id
-        else:
-            # No user_id specified, show super admin's own calls
-            filter_user_id = current_user["user_id"]
-    else:
-        # Regular user can only see their own calls
-        filter_user_id = current_user["user_id"]
+    filter_user_id = _calls_filter_user_id(user_id, current_user)
+    
+    if limit is not None:
+        limit = max(1, min(limit, CALLS_MAX_PAGE_SIZE))
+    
+    requested_fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_CALL_FIELDS
+    statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+    
+    # Read the change sequence before the page so that no change made while
+    # the page is being built can be missed by a following /calls/changes poll
+    change_seq = await adb.get_max_change_seq()
     
     # Get calls from database
-    db_calls = db.get_calls(user_id=filter_user_id)
+    try:
+        db_calls, next_after = await adb.get_calls_page(
+            user_id=filter_user_id,
+            limit=limit,
+            after=_decode_cursor(cursor) if cursor else None,
+            statuses=statuses,
+            start_date=start_date,
+            end_date=end_date,
+            search=search,
+            fields=requested_fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filter: {e}")
     
     # Merge with in-memory data for active calls (to get real-time status)
     calls_list = []
     for db_call in db_calls:
-        call_uuid = db_call["call_uuid"]
+        call = dict(db_call)
         
         # If call is in memory, use memory status (more up-to-date for active calls)
-        if call_uuid in call_data_store:
-            memory_data = call_data_store[call_uuid]
-            calls_list.append({
-                "call_uuid": call_uuid,
-                "phone_number": db_call["phone_number"],
-                "status": memory_data.get("status", db_call["status"]),
-                "created_at": db_call["created_at"],
-                "ended_at": memory_data.get("ended_at", db_call["ended_at"]),
-                "customer_name": db_call["customer_name"] or "Unknown",
-                "invoice_number": db_call["invoice_number"] or "N/A",
-                "whatsapp_number": db_call.get("whatsapp_number", ""),
-                "email": db_call.get("email", ""),
-                "user_id": db_call["user_id"]
-            })
-        else:
-            # Use database data for completed calls
-            calls_list.append({
-                "call_uuid": call_uuid,
-                "phone_number": db_call["phone_number"],
-                "status": db_call["status"],
-                "created_at": db_call["created_at"],
-                "ended_at": db_call["ended_at"],
-                "customer_name": db_call["customer_name"] or "Unknown",
-                "invoice_number": db_call["invoice_number"] or "N/A",
-                "whatsapp_number": db_call.get("whatsapp_number", ""),
-                "email": db_call.get("email", ""),
-                "user_id": db_call["user_id"]
-            })
+        memory_data = call_data_store.get(call["call_uuid"])
+        if memory_data:
+            if "status" in call:
+                call["status"] = memory_data.get("status", call["status"])
+            if "ended_at" in call:
+                call["ended_at"] = memory_data.get("ended_at", call["ended_at"])
+        
+        if "customer_name" in call:
+            call["customer_name"] = call["customer_name"] or "Unknown"
+        if "invoice_number" in call:
+            call["invoice_number"] = call["invoice_number"] or "N/A"
+        if "whatsapp_number" in call:
+            call["whatsapp_number"] = call["whatsapp_number"] or ""
+        if "email" in call:
+            call["email"] = call["email"] or ""
+        
+        calls_list.append(call)
+    
+    return {
+        "calls": calls_list,
+        "next_cursor": _encode_cursor(next_after) if next_after else None,
+        "change_seq": change_seq
+    }
+
+
+@app.get("/calls/changes")
+async def list_call_changes(
+    since: int = 0,
+    user_id: int = None,
+    limit: int = None,
+    fields: str = None,
+    current_user = Depends(get_current_user)
+):
+    """
+    Calls changed since a change sequence number (delta polling)
+    
+    Start from the change_seq returned by /calls, then pass the returned
+    cursor back as `since`. When has_more is true, poll again immediately.
+    """
+    filter_user_id = _calls_filter_user_id(user_id, current_user)
+    limit = max(1, min(limit or CALLS_MAX_PAGE_SIZE, CALLS_MAX_PAGE_SIZE))
+    requested_fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    
+    changes, cursor = await adb.get_call_changes(
+        since, user_id=filter_user_id, limit=limit, fields=requested_fields
+    )
+    
+    # The live status in memory can be ahead of the last persisted change
+    for call in changes:
+        memory_data = call_data_store.get(call["call_uuid"])
+        if memory_data:
+            if "status" in call:
+                call["status"] = memory_data.get("status", call["status"])
+            if "ended_at" in call:
+                call["ended_at"] = memory_data.get("ended_at", call["ended_at"])
+    
+    return {
+        "changes": changes,
+        "cursor": cursor,
+        "has_more": len(changes) == limit
+    }
+
+
+@app.get("/calls/events")
+async def stream_call_events(user_id: int = None, current_user = Depends(get_current_user_sse)):
+    """
+    Server-Sent Events stream of call status changes (replaces polling /calls)
     
-    return {"calls": calls_list}
+    Same scoping as /calls. Browsers' EventSource cannot send headers, so the
+    token may be passed as ?token=... instead of the Authorization header.
+    """
+    filter_user_id = _calls_filter_user_id(user_id, current_user)
+    return StreamingResponse(
+        call_events.sse_stream(filter_user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.get("/transcripts")
@@ -1560,148 +1848,154 @@ async def list_transcripts(user_id: int = None, current_user = Depends(get_curre
             # Regular user can only see their own transcripts
             filter_user_ids = [current_user["user_id"]]
         
-        transcripts = []
-        transcripts_base_dir = Path("transcripts")
-        
-        # Check if directory exists
-        if not transcripts_base_dir.exists():
-            return {"transcripts": []}
-        
-        # Determine which user folders to scan
-        if filter_user_ids is None:
-            # Scan all user folders
-            user_folders = [d for d in transcripts_base_dir.iterdir() if d.is_dir() and d.name.startswith("user_")]
-        else:
-            # Scan specific user folders
-            user_folders = [transcripts_base_dir / f"user_{uid}" for uid in filter_user_ids if (transcripts_base_dir / f"user_{uid}").exists()]
-        
-        # Iterate through user folders and their transcript files
-        for user_folder in user_folders:
-            # Extract user_id from folder name (user_123 -> 123)
-            try:
-                folder_user_id = int(user_folder.name.replace("user_", ""))
-            except:
-                continue
+        def scan_transcripts():
+            """Metadata of every transcript in the selected user folders (reads each file)"""
+            transcripts = []
+            transcripts_base_dir = Path("transcripts")
+            
+            # Check if directory exists
+            if not transcripts_base_dir.exists():
+                return []
+            
+            # Determine which user folders to scan
+            if filter_user_ids is None:
+                # Scan all user folders
+                user_folders = [d for d in transcripts_base_dir.iterdir() if d.is_dir() and d.name.startswith("user_")]
+            else:
+                # Scan specific user folders
+                user_folders = [transcripts_base_dir / f"user_{uid}" for uid in filter_user_ids if (transcripts_base_dir / f"user_{uid}").exists()]
             
-            for transcript_file in user_folder.glob("*.txt"):
+            # Iterate through user folders and their transcript files
+            for user_folder in user_folders:
+                # Extract user_id from folder name (user_123 -> 123)
                 try:
-                    # Parse filename: invoicenumber_calluuid.txt
-                    filename = transcript_file.name
-                    parts = filename.replace(".txt", "").split("_", 1)
-                    
-                    # Get sanitized invoice number from filename (fallback)
-                    invoice_number_from_filename = parts[0] if len(parts) > 0 else "unknown"
-                    call_uuid = parts[1] if len(parts) > 1 else "unknown"
-                    
-                    # Read file to extract metadata
-                    with open(transcript_file, "r", encoding="utf-8") as f:
-                        content = f.read()
-                    
-                    # Extract Started timestamp from transcript content (actual call time)
-                    started_time = None
-                    if "Started:" in content:
-                        try:
-                            start_idx = content.index("Started:") + len("Started:")
-                            end_idx = content.index("\n", start_idx)
-                            started_time = content[start_idx:end_idx].strip()
-                        except:
-                            pass
-                    
-                    # Extract metadata from file
-                    metadata = {
-                        "filename": filename,
-                        "invoice_number": invoice_number_from_filename,  # Will be overwritten if found in content
-                        "call_uuid": call_uuid,
-                        "file_size": transcript_file.stat().st_size,
-                        "created_at": started_time if started_time else datetime.fromtimestamp(transcript_file.stat().st_ctime).isoformat(),
-                        "modified_at": datetime.fromtimestamp(transcript_file.stat().st_mtime).isoformat(),
-                        "user_id": folder_user_id  # Add user_id to metadata
-                    }
-                    
-                    # Try to extract customer name from content
-                    if "Customer Name:" in content:
-                        start = content.index("Customer Name:") + len("Customer Name:")
-                        end = content.index("\n", start)
-                        metadata["customer_name"] = content[start:end].strip()
-                    else:
-                        metadata["customer_name"] = "N/A"
-                    
-                    # Try to extract ORIGINAL invoice number from content (with slashes intact)
-                    if "Invoice Number:" in content:
-                        start = content.index("Invoice Number:") + len("Invoice Number:")
-                        end = content.index("\n", start)
-                        metadata["invoice_number"] = content[start:end].strip()
-                    
-                    # Check if summary exists
-                    metadata["has_summary"] = "CALL SUMMARY (Generated by AI)" in content
-                    
-                    # Extract status
-                    if "Status: Completed" in content:
-                        metadata["status"] = "completed"
-                    else:
-                        metadata["status"] = "in_progress"
-                    
-                    # Extract call outcomes from summary (now supports multiple outcomes)
-                    metadata["call_outcomes"] = []
-                    metadata["cut_off_date"] = None
-                    if "**CALL OUTCOMES:**" in content:
-                        try:
-                            start = content.index("**CALL OUTCOMES:**") + len("**CALL OUTCOMES:**")
-                            # Find the end of the outcomes section (before the numbered list starts)
-                            end = content.index("\n1.", start) if "\n1." in content[start:] else len(content)
-                            outcomes_section = content[start:end].strip()
-                            
-                            # Parse each outcome line (format: "- OUTCOME_NAME: details")
-                            for line in outcomes_section.split('\n'):
-                                line = line.strip()
-                                if line.startswith('-'):
-                                    # Extract outcome name (before the colon)
-                                    outcome_part = line[1:].strip()  # Remove the dash
-                                    if ':' in outcome_part:
-                                        outcome_name = outcome_part.split(':')[0].strip()
-                                    else:
-                                        outcome_name = outcome_part.strip()
-                                    
-                                    if outcome_name:
-                                        metadata["call_outcomes"].append(outcome_name)
-                            
-                            # Extract cut-off date if CUT_OFF_DATE_PROVIDED is one of the outcomes
-                            if "CUT_OFF_DATE_PROVIDED" in metadata["call_outcomes"]:
-                                # Extract date from the CUT_OFF_DATE_PROVIDED line specifically
-                                if "- CUT_OFF_DATE_PROVIDED:" in content:
-                                    try:
-                                        cutoff_line_start = content.index("- CUT_OFF_DATE_PROVIDED:")
-                                        cutoff_line_end = content.index("\n", cutoff_line_start)
-                                        cutoff_line = content[cutoff_line_start:cutoff_line_end]
-                                        
-                                        # Extract text after the colon
-                                        date_text = cutoff_line.split(":", 1)[1].strip()
+                    folder_user_id = int(user_folder.name.replace("user_", ""))
+                except:
+                    continue
+                
+                for transcript_file in user_folder.glob("*.txt"):
+                    try:
+                        # Parse filename: invoicenumber_calluuid.txt
+                        filename = transcript_file.name
+                        parts = filename.replace(".txt", "").split("_", 1)
+                        
+                        # Get sanitized invoice number from filename (fallback)
+                        invoice_number_from_filename = parts[0] if len(parts) > 0 else "unknown"
+                        call_uuid = parts[1] if len(parts) > 1 else "unknown"
+                        
+                        # Read file to extract metadata
+                        with open(transcript_file, "r", encoding="utf-8") as f:
+                            content = f.read()
+                        
+                        # Extract Started timestamp from transcript content (actual call time)
+                        started_time = None
+                        if "Started:" in content:
+                            try:
+                                start_idx = content.index("Started:") + len("Started:")
+                                end_idx = content.index("\n", start_idx)
+                                started_time = content[start_idx:end_idx].strip()
+                            except:
+                                pass
+                        
+                        # Extract metadata from file
+                        metadata = {
+                            "filename": filename,
+                            "invoice_number": invoice_number_from_filename,  # Will be overwritten if found in content
+                            "call_uuid": call_uuid,
+                            "file_size": transcript_file.stat().st_size,
+                            "created_at": started_time if started_time else datetime.fromtimestamp(transcript_file.stat().st_ctime).isoformat(),
+                            "modified_at": datetime.fromtimestamp(transcript_file.stat().st_mtime).isoformat(),
+                            "user_id": folder_user_id  # Add user_id to metadata
+                        }
+                        
+                        # Try to extract customer name from content
+                        if "Customer Name:" in content:
+                            start = content.index("Customer Name:") + len("Customer Name:")
+                            end = content.index("\n", start)
+                            metadata["customer_name"] = content[start:end].strip()
+                        else:
+                            metadata["customer_name"] = "N/A"
+                        
+                        # Try to extract ORIGINAL invoice number from content (with slashes intact)
+                        if "Invoice Number:" in content:
+                            start = content.index("Invoice Number:") + len("Invoice Number:")
+                            end = content.index("\n", start)
+                            metadata["invoice_number"] = content[start:end].strip()
+                        
+                        # Check if summary exists
+                        metadata["has_summary"] = "CALL SUMMARY (Generated by AI)" in content
+                        
+                        # Extract status
+                        if "Status: Completed" in content:
+                            metadata["status"] = "completed"
+                        else:
+                            metadata["status"] = "in_progress"
+                        
+                        # Extract call outcomes from summary (now supports multiple outcomes)
+                        metadata["call_outcomes"] = []
+                        metadata["cut_off_date"] = None
+                        if "**CALL OUTCOMES:**" in content:
+                            try:
+                                start = content.index("**CALL OUTCOMES:**") + len("**CALL OUTCOMES:**")
+                                # Find the end of the outcomes section (before the numbered list starts)
+                                end = content.index("\n1.", start) if "\n1." in content[start:] else len(content)
+                                outcomes_section = content[start:end].strip()
+                                
+                                # Parse each outcome line (format: "- OUTCOME_NAME: details")
+                                for line in outcomes_section.split('\n'):
+                                    line = line.strip()
+                                    if line.startswith('-'):
+                                        # Extract outcome name (before the colon)
+                                        outcome_part = line[1:].strip()  # Remove the dash
+                                        if ':' in outcome_part:
+                                            outcome_name = outcome_part.split(':')[0].strip()
+                                        else:
+                                            outcome_name = outcome_part.strip()
                                         
-                                        # Use python-dateutil to parse the date
-                                        from dateutil import parser as date_parser
+                                        if outcome_name:
+                                            metadata["call_outcomes"].append(outcome_name)
+                                
+                                # Extract cut-off date if CUT_OFF_DATE_PROVIDED is one of the outcomes
+                                if "CUT_OFF_DATE_PROVIDED" in metadata["call_outcomes"]:
+                                    # Extract date from the CUT_OFF_DATE_PROVIDED line specifically
+                                    if "- CUT_OFF_DATE_PROVIDED:" in content:
                                         try:
-                                            parsed_date = date_parser.parse(date_text, fuzzy=True)
-                                            metadata["cut_off_date"] = parsed_date.strftime("%Y-%m-%d")
-                                            logger.info(f"Extracted cutoff date from transcript {filename}: {metadata['cut_off_date']}")
+                                            cutoff_line_start = content.index("- CUT_OFF_DATE_PROVIDED:")
+                                            cutoff_line_end = content.index("\n", cutoff_line_start)
+                                            cutoff_line = content[cutoff_line_start:cutoff_line_end]
+                                            
+                                            # Extract text after the colon
+                                            date_text = cutoff_line.split(":", 1)[1].strip()
+                                            
+                                            # Use python-dateutil to parse the date
+                                            from dateutil import parser as date_parser
+                                            try:
+                                                parsed_date = date_parser.parse(date_text, fuzzy=True)
+                                                metadata["cut_off_date"] = parsed_date.strftime("%Y-%m-%d")
+                                                logger.info(f"Extracted cutoff date from transcript {filename}: {metadata['cut_off_date']}")
+                                            except Exception as e:
+                                                logger.warning(f"Could not parse cutoff date from '{date_text}': {e}")
+                                                metadata["cut_off_date"] = None
                                         except Exception as e:
-                                            logger.warning(f"Could not parse cutoff date from '{date_text}': {e}")
+                                            logger.warning(f"Error extracting cutoff date from transcript {filename}: {e}")
                                             metadata["cut_off_date"] = None
-                                    except Exception as e:
-                                        logger.warning(f"Error extracting cutoff date from transcript {filename}: {e}")
-                                        metadata["cut_off_date"] = None
-                        except Exception as e:
-                            logger.error(f"Error parsing outcomes: {e}")
-                            # Fallback to empty list
-                            metadata["call_outcomes"] = []
-                    
-                    transcripts.append(metadata)
-                    
-                except Exception as e:
-                    logger.error(f"Error parsing transcript file {transcript_file}: {e}")
-                    continue
+                            except Exception as e:
+                                logger.error(f"Error parsing outcomes: {e}")
+                                # Fallback to empty list
+                                metadata["call_outcomes"] = []
+                        
+                        transcripts.append(metadata)
+                        
+                    except Exception as e:
+                        logger.error(f"Error parsing transcript file {transcript_file}: {e}")
+                        continue
+            
+            # Sort by created_at descending (most recent first)
+            transcripts.sort(key=lambda x: x["created_at"], reverse=True)
+            return transcripts
         
-        # Sort by created_at descending (most recent first)
-        transcripts.sort(key=lambda x: x["created_at"], reverse=True)
+        # Directory scans and file reads stay off the event loop
+        transcripts = await asyncio.to_thread(scan_transcripts)
         
         return {"transcripts": transcripts}
     
@@ -1717,27 +2011,32 @@ async def get_transcript(filename: str):
     Returns the transcript with conversation and summary
     """
     try:
-        transcripts_base_dir = Path("transcripts")
-        
-        # Search for the file in all user subdirectories
-        transcript_file = None
-        for user_folder in transcripts_base_dir.glob("user_*"):
-            if user_folder.is_dir():
-                potential_file = user_folder / filename
-                if potential_file.exists():
-                    transcript_file = potential_file
-                    break
-        
-        if transcript_file is None:
-            raise HTTPException(status_code=404, detail="Transcript not found")
-        
-        # Security check: ensure file is in transcripts directory
-        if not transcript_file.resolve().is_relative_to(transcripts_base_dir.resolve()):
-            raise HTTPException(status_code=400, detail="Invalid filename")
+        def read_transcript():
+            """Content and stat of the transcript file, searched in every user folder"""
+            transcripts_base_dir = Path("transcripts")
+            
+            # Search for the file in all user subdirectories
+            transcript_file = None
+            for user_folder in transcripts_base_dir.glob("user_*"):
+                if user_folder.is_dir():
+                    potential_file = user_folder / filename
+                    if potential_file.exists():
+                        transcript_file = potential_file
+                        break
+            
+            if transcript_file is None:
+                raise HTTPException(status_code=404, detail="Transcript not found")
+            
+            # Security check: ensure file is in transcripts directory
+            if not transcript_file.resolve().is_relative_to(transcripts_base_dir.resolve()):
+                raise HTTPException(status_code=400, detail="Invalid filename")
+            
+            # Read file content
+            with open(transcript_file, "r", encoding="utf-8") as f:
+                content = f.read()
+            return content, transcript_file.stat()
         
-        # Read file content
-        with open(transcript_file, "r", encoding="utf-8") as f:
-            content = f.read()
+        content, file_stat = await asyncio.to_thread(read_transcript)
         
         # Parse the content into sections
         sections = {
@@ -1784,9 +2083,9 @@ async def get_transcript(filename: str):
             "filename": filename,
             "full_content": content,
             "sections": sections,
-            "file_size": transcript_file.stat().st_size,
-            "created_at": datetime.fromtimestamp(transcript_file.stat().st_ctime).isoformat(),
-            "modified_at": datetime.fromtimestamp(transcript_file.stat().st_mtime).isoformat(),
+            "file_size": file_stat.st_size,
+            "created_at": datetime.fromtimestamp(file_stat.st_ctime).isoformat(),
+            "modified_at": datetime.fromtimestamp(file_stat.st_mtime).isoformat(),
         }
     
     except HTTPException:
@@ -1922,6 +2221,8 @@ if os.path.exists(frontend_build_path):
         if (full_path.startswith("api/") or 
             full_path.startswith("health") or 
             full_path.startswith("calls") or 
+            full_path.startswith("queue") or 
+            full_path.startswith("metrics") or 
             full_path.startswith("transcripts") or 
             full_path.startswith("start") or 
             full_path.startswith("webhook") or
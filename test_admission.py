@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Admission control: /start and /start_batch past capacity get 429s and partial acceptance, not a growing queue"""
+
+import os
+import json
+import time
+import atexit
+import base64
+import tempfile
+
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "admission.db"))
+for name in ("PLIVO_AUTH_ID", "PLIVO_AUTH_TOKEN", "PLIVO_PHONE_NUMBER", "SARVAM_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+import httpx
+from fastapi.testclient import TestClient
+
+from admission import MAX_BATCH_BYTES, AdmissionController
+from dispatcher import CallDispatcher
+from test_greeting_segments import make_wav
+from test_support import report, run_tests
+
+
+def batch(size, start=0):
+    return {"calls": [{"phone_number": f"+9190000{start + i:05d}",
+                       "body": {"customer_name": f"Customer {i}", "outstanding_balance": "1000"}}
+                      for i in range(size)]}
+
+
+def test_batch_limits():
+    """Per-user and total queue limits, with room reserved while a batch is being stored"""
+    dispatcher = CallDispatcher(process_call=None, get_status=lambda call_uuid: None)
+    admission = AdmissionController(dispatcher, max_active=2, max_queued=8, max_queued_per_user=5)
+
+    first = admission.admit_batch(1, 7)
+    passed = report("user limit", first == (5, "user_queue_full"), str(first))
+    passed &= report("reserved before enqueue", admission.admit_batch(1, 1) == (0, "user_queue_full"))
+    for n in range(5):
+        dispatcher.enqueue({"call_uuid": f"u1-{n}"}, user_id=1)
+    admission.batch_queued(1, 5)
+
+    second = admission.admit_batch(2, 7)
+    passed &= report("total limit", second == (3, "queue_full"), str(second))
+    admission.batch_queued(2, 3)
+    passed &= report("reservations released", admission.stats()["reserved"] == 0)
+    passed &= report("rejections counted", admission.stats()["rejected"] == {"user_queue_full": 3, "queue_full": 4},
+                     str(admission.stats()["rejected"]))
+    assert passed
+
+
+_served = None
+
+
+def serve():
+    """
+    The API with Plivo and Sarvam mocked; dialed calls stay live until hung up
+
+    Started once per process (its shutdown closes the database pool for good).
+    """
+    global _served
+    if _served is not None:
+        return _served
+    import server
+    from http_clients import http_clients
+
+    def plivo(request):
+        return httpx.Response(201, json={"request_uuid": f"plivo-{time.monotonic()}"})
+
+    def sarvam(request):
+        inputs = json.loads(request.content)["inputs"]
+        return httpx.Response(200, json={"audios": [base64.b64encode(make_wav(0.2)).decode() for _ in inputs]})
+
+    client = TestClient(server.app)
+    client.__enter__()
+    atexit.register(client.__exit__, None, None, None)
+    http_clients._clients["plivo"] = httpx.AsyncClient(transport=httpx.MockTransport(plivo))
+    http_clients._clients["sarvam"] = httpx.AsyncClient(transport=httpx.MockTransport(sarvam))
+    token = client.post("/api/auth/login", json={"username": "admin", "password": "admin123"}).json()["access_token"]
+    _served = server, client, {"Authorization": f"Bearer {token}"}
+    return _served
+
+
+def hang_up(client, call_uuid):
+    client.post(f"/plivo_hangup/{call_uuid}", data={"HangupCauseName": "Normal Hangup"})
+
+
+def test_start_refused_when_slots_busy():
+    """/start answers 429 with Retry-After while every call slot is taken, and dials again once one frees up"""
+    server, client, headers = serve()
+    server.dispatcher.max_concurrent = server.admission.max_active = 2
+    call = batch(1)["calls"][0]
+
+    started = [client.post("/start", headers=headers, json=call) for _ in range(2)]
+    passed = report("calls up to the limit dialed", all(r.status_code == 200 for r in started))
+
+    refused = client.post("/start", headers=headers, json=call)
+    passed &= report("429 past the limit", refused.status_code == 429, refused.text)
+    passed &= report("Retry-After header", refused.headers.get("Retry-After", "").isdigit(),
+                     refused.headers.get("Retry-After"))
+
+    hang_up(client, started[0].json()["call_uuid"])
+    time.sleep(0.2)
+    again = client.post("/start", headers=headers, json=call)
+    passed &= report("dialed again after a hangup", again.status_code == 200, again.text)
+    for response in (started[1], again):
+        hang_up(client, response.json()["call_uuid"])
+    time.sleep(0.2)
+    assert passed
+
+
+def test_batch_flood():
+    """A flood of batches fills the queue to its limit; the rest is rejected, quickly, with feedback"""
+    server, client, headers = serve()
+    server.dispatcher.max_concurrent = server.admission.max_active = 2
+    server.admission.max_queued_per_user = 50
+    server.admission.max_queued = 100
+
+    accepted = rejected = refused = 0
+    peak_queue = 0
+    slowest = 0.0
+    retry_after_given = True
+    for n in range(20):
+        began = time.perf_counter()
+        response = client.post("/start_batch", headers=headers, json=batch(25, start=25 * n))
+        slowest = max(slowest, time.perf_counter() - began)
+        body = response.json()
+        accepted += body["accepted"]
+        rejected += len(body["rejected"])
+        refused += response.status_code == 429
+        peak_queue = max(peak_queue, len(server.dispatcher))
+        retry_after_given &= not body["rejected"] or response.headers.get("Retry-After", "").isdigit()
+
+    passed = report("Retry-After with every rejection", retry_after_given)
+    passed &= report("every call accepted or rejected", accepted + rejected == 500, f"{accepted} + {rejected}")
+    passed &= report("queue bounded", peak_queue <= 50, f"peak {peak_queue} queued")
+    passed &= report("full batches refused with 429", refused >= 15, f"{refused} of 20")
+    passed &= report("requests stay fast", slowest < 2.0, f"slowest {slowest * 1000:.0f} ms")
+
+    oversized = client.post("/start_batch", headers={**headers, "Content-Type": "application/json"},
+                            content=b"x" * (MAX_BATCH_BYTES + 1))
+    passed &= report("oversized body refused", oversized.status_code == 413)
+    assert passed
+
+
+if __name__ == "__main__":
+    run_tests("🚦 ADMISSION CONTROL TEST", (test_batch_limits, test_start_refused_when_slots_busy, test_batch_flood))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Soak test for the live call registry: memory stays flat over 100k simulated calls"""
+
+import gc
+import uuid
+import tracemalloc
+
+from call_registry import CallRecord, LiveCallRegistry
+from test_support import report, run_tests
+
+CALLS = 100_000
+
+# One simulated call starts every 10 ms; finished calls are kept for 60 s
+CALL_INTERVAL = 0.01
+TTL = 60
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate_call(store, on_call_event, n):
+    """One call's lifecycle, as server.py drives it: queued -> calling -> ... -> completed"""
+    call_uuid = str(uuid.uuid4())
+    store[call_uuid] = {
+        "phone_number": f"+9190000{n % 100000:05d}",
+        "custom_data": {"customer_name": f"Customer {n}", "invoice_number": f"INV-{n}",
+                        "invoice_date": "2026-01-01", "outstanding_balance": str(1000 + n)},
+        "status": "queued",
+        "created_at": "2026-01-01T10:00:00+05:30",
+        "plivo_call_uuid": None,
+        "user_id": n % 7
+    }
+    record = store[call_uuid]
+    record["greeting_text"] = "Hi, this is Sara from Hummingbird's commercial team. " * 3
+    record["answer_xml"] = f"<Response><Stream>wss://example/ws/{call_uuid}</Stream></Response>"
+    record["plivo_call_uuid"] = f"plivo-{call_uuid}"
+    for status in ("calling", "greeting_playing", "in_progress", "completed"):
+        record["status"] = status
+        on_call_event({"call_uuid": call_uuid, "status": status})
+    record["ended_at"] = "2026-01-01T10:02:00"
+    return call_uuid
+
+
+def run(store, on_call_event, clock):
+    """Memory in use after each 10k calls"""
+    samples = []
+    for n in range(CALLS):
+        clock.now += CALL_INTERVAL
+        simulate_call(store, on_call_event, n)
+        if (n + 1) % 10_000 == 0:
+            gc.collect()
+            samples.append(tracemalloc.get_traced_memory()[0])
+    return samples
+
+
+def test_memory_flat_over_100k_calls():
+    """Once the TTL window is full, memory stops growing"""
+    clock = FakeClock()
+    registry = LiveCallRegistry(ttl=TTL, clock=clock)
+
+    tracemalloc.start()
+    samples = run(registry, registry.on_call_event, clock)
+    tracemalloc.stop()
+
+    # The 60 s window holds 6000 calls, so it is full well before the 20k mark
+    steady = samples[1:]
+    growth = (max(steady) - steady[0]) / steady[0]
+    window = int(TTL / CALL_INTERVAL)
+
+    print("  memory after each 10k calls (MB): " + " ".join(f"{m / 1e6:.1f}" for m in samples))
+    passed = report("memory flat", growth < 0.10, f"{growth:+.1%} from 20k to 100k calls")
+    passed &= report("records bounded by TTL window", len(registry) <= window + 1,
+                     f"{len(registry)} records, {registry.evicted} evicted")
+    assert passed
+
+
+def test_unbounded_dict_baseline():
+    """For comparison: the old plain dict grows with every call"""
+    clock = FakeClock()
+    store = {}
+
+    tracemalloc.start()
+    samples = run(store, lambda event: None, clock)
+    tracemalloc.stop()
+
+    print("  memory after each 10k calls (MB): " + " ".join(f"{m / 1e6:.1f}" for m in samples))
+    assert report("plain dict keeps every call", len(store) == CALLS and samples[-1] > 3 * samples[1],
+                  f"{len(store)} records")
+
+
+def test_live_calls_never_evicted():
+    """Calls that haven't finished stay past the TTL and the record cap"""
+    clock = FakeClock()
+    registry = LiveCallRegistry(ttl=1, max_records=2, clock=clock)
+    registry["live"] = {"status": "in_progress"}
+    registry["done"] = {"status": "completed"}
+    registry["requeued"] = {"status": "failed"}
+    registry["requeued"]["status"] = "queued"
+    clock.now += 10
+    registry["other"] = {"status": "calling"}
+
+    passed = report("finished call evicted", "done" not in registry)
+    passed &= report("live calls kept", all(uuid in registry for uuid in ("live", "requeued", "other")),
+                     f"{len(registry)} records")
+    assert passed
+
+
+def test_record_access():
+    """Records act like the dicts they replace"""
+    record = CallRecord(status="queued", user_id=3)
+    passed = report("get with default", record.get("ended_at", "n/a") == "n/a" and record.get("user_id") == 3)
+    passed &= report("membership", "status" in record and "ended_at" not in record)
+    try:
+        record["not_a_field"] = 1
+        passed &= report("unknown field rejected", False)
+    except KeyError:
+        passed &= report("unknown field rejected", True)
+    passed &= report("compact", not hasattr(record, "__dict__"))
+    assert passed
+
+
+if __name__ == "__main__":
+    run_tests("🧠 LIVE CALL REGISTRY - SOAK TEST",
+              (test_record_access, test_live_calls_never_evicted, test_memory_flat_over_100k_calls,
+               test_unbounded_dict_baseline))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Offline tests for greeting audio post-processing, using output.wav"""
+
+import struct
+import numpy as np
+
+import greeting_audio
+from greeting_audio import (FRAME_MS, mulaw_decode, normalize_loudness, postprocess, read_wav,
+                            trim_silence, wav_format, write_mulaw_wav, write_wav)
+from test_support import report, run_tests
+
+GREETING_AUDIO_PATH = "output.wav"
+
+
+def load_greeting():
+    with open(GREETING_AUDIO_PATH, "rb") as f:
+        return read_wav(f.read())
+
+
+def first_audible_seconds(samples, sample_rate, silence_db=greeting_audio.GREETING_SILENCE_DB):
+    """Time to the first frame louder than silence_db"""
+    frame = sample_rate * FRAME_MS // 1000
+    for i in range(0, len(samples), frame):
+        rms = np.sqrt(np.mean(samples[i:i + frame] ** 2))
+        if 20 * np.log10(max(rms, 1e-10)) > silence_db:
+            return i / sample_rate
+    return None
+
+
+def speech_rms_db(samples, sample_rate):
+    """RMS level of frames within LOUDNESS_GATE_DB of the loudest one"""
+    frame = sample_rate * FRAME_MS // 1000
+    frames = samples[:len(samples) // frame * frame].reshape(-1, frame)
+    levels = 20 * np.log10(np.maximum(np.sqrt(np.mean(frames ** 2, axis=1)), 1e-10))
+    audible = frames[levels > levels.max() - greeting_audio.LOUDNESS_GATE_DB]
+    return 20 * np.log10(np.sqrt(np.mean(audible ** 2)))
+
+
+def test_trim_silence():
+    """Dead air added around output.wav is cut; the speech itself is kept"""
+    samples, sample_rate = load_greeting()
+    rng = np.random.default_rng(0)
+    silence = rng.normal(0, 10 ** (-65 / 20), sample_rate).astype(np.float32)  # 1 s of faint noise
+    padded = np.concatenate([silence, samples, silence])
+
+    trimmed = trim_silence(padded, sample_rate)
+    before = first_audible_seconds(padded, sample_rate)
+    after = first_audible_seconds(trimmed, sample_rate)
+    max_lead = (greeting_audio.GREETING_TRIM_PAD_MS + FRAME_MS) / 1000
+
+    passed = report("time to first audible frame", after <= max_lead,
+                    f"{before * 1000:.0f} ms -> {after * 1000:.0f} ms")
+    passed &= report("speech kept", len(trimmed) >= 0.9 * len(trim_silence(samples, sample_rate)),
+                     f"{len(padded) / sample_rate:.2f} s -> {len(trimmed) / sample_rate:.2f} s")
+    passed &= report("all-silent input becomes empty", len(trim_silence(silence, sample_rate)) == 0)
+    assert passed
+
+
+def test_normalize_loudness():
+    """Quiet and loud versions of output.wav both end up at the target level, under the peak ceiling"""
+    samples, sample_rate = load_greeting()
+    target = greeting_audio.GREETING_TARGET_DB
+    ceiling = 10 ** (greeting_audio.GREETING_PEAK_DB / 20)
+
+    passed = True
+    for name, scale in (("quiet", 0.05), ("original", 1.0)):
+        normalized = normalize_loudness(samples * scale, sample_rate)
+        level = speech_rms_db(normalized, sample_rate)
+        peak = np.max(np.abs(normalized))
+        # Either at the target, or held below it by the peak ceiling
+        at_target = abs(level - target) < 0.5 or (level < target and abs(peak - ceiling) < 1e-3)
+        passed &= report(f"{name} loudness", at_target and peak <= ceiling + 1e-6,
+                         f"{speech_rms_db(samples * scale, sample_rate):.1f} -> {level:.1f} dBFS, peak {peak:.3f}")
+    assert passed
+
+
+def test_postprocess_wav():
+    """postprocess() keeps 16-bit mono PCM WAV at the same sample rate"""
+    with open(GREETING_AUDIO_PATH, "rb") as f:
+        original = f.read()
+    processed = postprocess(original)
+    samples, sample_rate = read_wav(processed)
+    _, original_rate = read_wav(original)
+
+    passed = report("format", wav_format(processed) == 1 and sample_rate == original_rate,
+                    f"format {wav_format(processed)}, {sample_rate} Hz")
+    passed &= report("not longer than input", len(processed) <= len(original), f"{len(original)} -> {len(processed)} bytes")
+    assert passed
+
+
+def test_mulaw_encoding():
+    """8 kHz μ-law WAV is half the size of 16-bit PCM, with a valid header and faithful audio"""
+    samples, sample_rate = load_greeting()
+    # Resample to the 8 kHz rate greetings are synthesized at
+    positions = np.arange(0, len(samples), sample_rate / 8000)
+    samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    pcm = write_wav(samples, 8000)
+    mulaw = write_mulaw_wav(samples, 8000)
+
+    fmt_tag, channels, rate, byte_rate, block_align, bits = struct.unpack("<HHIIHH", mulaw[20:36])
+    passed = report("header", (wav_format(mulaw), channels, rate, byte_rate, block_align, bits) == (7, 1, 8000, 8000, 1, 8),
+                    f"format {fmt_tag}, {channels} ch, {rate} Hz, {bits}-bit")
+    passed &= report("size halved", len(mulaw) <= 0.52 * len(pcm), f"{len(pcm)} -> {len(mulaw)} bytes")
+
+    data_offset = mulaw.index(b"data") + 8
+    decoded = mulaw_decode(np.frombuffer(mulaw[data_offset:data_offset + len(samples)], dtype=np.uint8))
+    pcm_samples = np.frombuffer(pcm[44:], dtype="<i2") / 32768
+    snr = 10 * np.log10(np.sum(pcm_samples ** 2) / np.sum((pcm_samples - decoded) ** 2))
+    passed &= report("round trip", snr > 30, f"SNR {snr:.1f} dB")
+    assert passed
+
+
+if __name__ == "__main__":
+    run_tests("🔊 GREETING AUDIO POST-PROCESSING - TEST SUITE",
+              (test_trim_silence, test_normalize_loudness, test_postprocess_wav, test_mulaw_encoding))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Test greetings stitched from cached audio fragments (runs offline, no Sarvam requests)"""
+
+import io
+import math
+import wave
+import struct
+import asyncio
+import tempfile
+
+import httpx
+
+import greeting_service
+from greeting_service import (GreetingCache, assemble_greeting_audio, build_greeting_text,
+                              greeting_key, greeting_segments, number_to_words, stitch_wavs)
+from http_clients import http_clients
+from test_support import report, run_tests
+
+SAMPLE_RATE = 8000
+
+CUSTOM_DATA = {"outstanding_balance": "1,20,500", "invoice_date": "2024-03-15"}
+
+
+def make_wav(seconds, sample_rate=SAMPLE_RATE, frequency=440):
+    """16-bit mono sine tone as WAV bytes"""
+    frames = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate)))
+        for i in range(int(seconds * sample_rate))
+    )
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+    return output.getvalue()
+
+
+def test_segments_match_greeting_text():
+    """Fragments joined with spaces give exactly the old greeting text"""
+    balance_in_words = number_to_words(CUSTOM_DATA["outstanding_balance"])
+    expected = (f"Hi, this is Sara from Hummingbird's commercial team. I'm calling regarding the T A C due "
+                f"of rupees {balance_in_words} for the invoice dated {CUSTOM_DATA['invoice_date']}. "
+                f"When can we expect the payment?")
+    segments = greeting_segments(CUSTOM_DATA)
+
+    passed = report("greeting text unchanged", build_greeting_text(CUSTOM_DATA) == expected)
+    passed &= report("amount split into groups", "one lakh" in segments and "twenty thousand" in segments,
+                     str(segments[1:-3]))
+    assert passed
+
+
+def test_stitched_audio():
+    """Stitched greeting has the fragments' total length, 8 kHz sample rate and 16-bit mono PCM format"""
+    fragment_seconds = {}
+    requests = []
+
+    def sarvam(request):
+        requests.append(request)
+        return httpx.Response(500)
+
+    saved_cache = greeting_service.greeting_cache
+    saved_client = http_clients._clients.get("sarvam")
+    mock_client = http_clients._clients["sarvam"] = httpx.AsyncClient(transport=httpx.MockTransport(sarvam))
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = greeting_service.greeting_cache = GreetingCache(cache_dir, max_bytes=50 * 1024 * 1024)
+
+            # Every fragment is already cached, as after earlier calls
+            for i, fragment in enumerate(greeting_segments(CUSTOM_DATA)):
+                fragment_seconds[fragment] = 0.25 * (i + 1)
+                cache.put(greeting_key(fragment), make_wav(fragment_seconds[fragment], frequency=300 + 50 * i))
+
+            path = asyncio.run(assemble_greeting_audio(CUSTOM_DATA, "test-call"))
+            passed = report("assembled without Sarvam requests", path is not None and not requests,
+                            f"{len(requests)} requests")
+
+            with wave.open(path, "rb") as wav:
+                expected_frames = sum(int(s * SAMPLE_RATE) for s in fragment_seconds.values())
+                passed &= report("length", wav.getnframes() == expected_frames,
+                                 f"{wav.getnframes()} frames, expected {expected_frames}")
+                passed &= report("sample rate", wav.getframerate() == SAMPLE_RATE, f"{wav.getframerate()} Hz")
+                wav_format = (wav.getnchannels(), wav.getsampwidth(), wav.getcomptype())
+                passed &= report("format", wav_format == (1, 2, "NONE"),
+                                 f"{wav.getnchannels()} ch, {8 * wav.getsampwidth()}-bit {wav.getcomptype()}")
+
+            # Resolvable by the full greeting text, like a whole-synthesized greeting
+            passed &= report("cached under greeting text",
+                             cache.get(greeting_key(build_greeting_text(CUSTOM_DATA))) is not None)
+    finally:
+        greeting_service.greeting_cache = saved_cache
+        if saved_client is None:
+            http_clients._clients.pop("sarvam", None)
+        else:
+            http_clients._clients["sarvam"] = saved_client
+        asyncio.run(mock_client.aclose())
+    assert passed
+
+
+def test_stitch_gap_and_mismatch():
+    """Gaps add silence; fragments with different sample rates are rejected"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second, other_rate = f"{tmp}/a.wav", f"{tmp}/b.wav", f"{tmp}/c.wav"
+        for path, seconds, rate in ((first, 0.5, SAMPLE_RATE), (second, 0.5, SAMPLE_RATE), (other_rate, 0.5, 16000)):
+            with open(path, "wb") as f:
+                f.write(make_wav(seconds, sample_rate=rate))
+
+        with wave.open(io.BytesIO(stitch_wavs([first, second], gap_ms=100)), "rb") as wav:
+            passed = report("gap length", wav.getnframes() == 2 * 4000 + 800, f"{wav.getnframes()} frames")
+
+        try:
+            stitch_wavs([first, other_rate])
+            passed &= report("mismatched sample rate rejected", False)
+        except ValueError as e:
+            passed &= report("mismatched sample rate rejected", True, str(e))
+    assert passed
+
+
+if __name__ == "__main__":
+    run_tests("🎤 GREETING SEGMENT ASSEMBLY - TEST SUITE",
+              (test_segments_match_greeting_text, test_stitched_audio, test_stitch_gap_and_mismatch))
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared live-state stores (SQLite file and Redis protocol)
+
+The Redis store is tested against a small in-process stand-in speaking RESP;
+set TEST_REDIS_URL to run the same tests against a real server instead.
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+import threading
+import multiprocessing
+
+from events import CallEventBus
+from live_state import EXTEND_SCRIPT, RELEASE_SCRIPT, CallEventRelay, LiveState, MemoryLiveState, open_live_state
+from test_support import report, run_tests
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+WORKERS = 4
+INCREMENTS = 25
+
+
+class RedisStandIn:
+    """Just enough of a Redis server for RedisLiveState, on a background thread"""
+
+    def __init__(self):
+        self.data = {}  # key -> (value, expires_at or None); value is str or dict (hash)
+        self.subscribers = {}  # channel -> set of writers
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        threading.Thread(target=self._serve, args=(started,), daemon=True).start()
+        started.wait()
+        self.url = f"redis://127.0.0.1:{self.port}/0"
+
+    def _serve(self, started):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self._client, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        started.set()
+        self.loop.run_forever()
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    @staticmethod
+    def _encode(reply):
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(RedisStandIn._encode(item) for item in reply)
+        if reply == "OK":
+            return b"+OK\r\n"
+        data = reply.encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _command(self, args, writer):
+        name, args = args[0].upper(), args[1:]
+        if name in ("PING", "SELECT", "AUTH"):
+            return "OK"
+        if name == "HSET":
+            entry = self._live(args[0]) or ({}, None)
+            entry[0].update(zip(args[1::2], args[2::2]))
+            self.data[args[0]] = entry
+            return len(args[1:]) // 2
+        if name == "HGETALL":
+            entry = self._live(args[0])
+            return [part for field, value in entry[0].items() for part in (field, value)] if entry else []
+        if name == "PEXPIRE":
+            entry = self._live(args[0])
+            if entry is None:
+                return 0
+            self.data[args[0]] = (entry[0], time.time() + int(args[1]) / 1000)
+            return 1
+        if name == "DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == "EXISTS":
+            return int(self._live(args[0]) is not None)
+        if name == "GET":
+            entry = self._live(args[0])
+            return entry[0] if entry else None
+        if name == "SET":
+            key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+            if "NX" in options and self._live(key) is not None:
+                return None
+            expires_at = time.time() + int(args[2 + options.index("PX") + 1]) / 1000 if "PX" in options else None
+            self.data[key] = (value, expires_at)
+            return "OK"
+        if name == "EVAL":
+            script, key, token = args[0], args[2], args[3]
+            entry = self._live(key)
+            if entry is None or entry[0] != token:
+                return 0
+            if script == RELEASE_SCRIPT:
+                del self.data[key]
+                return 1
+            if script == EXTEND_SCRIPT:
+                self.data[key] = (token, time.time() + int(args[4]) / 1000)
+                return 1
+            return 0
+        if name == "PUBLISH":
+            message = self._encode(["message", args[0], args[1]])
+            receivers = self.subscribers.get(args[0], set())
+            for subscriber in receivers:
+                subscriber.write(message)
+            return len(receivers)
+        if name == "SUBSCRIBE":
+            self.subscribers.setdefault(args[0], set()).add(writer)
+            return ["subscribe", args[0], 1]
+        raise ValueError(f"ERR unknown command '{name}'")
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2].decode())
+                try:
+                    writer.write(self._encode(self._command(args, writer)))
+                except ValueError as e:
+                    writer.write(f"-{e}\r\n".encode())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for subscribers in self.subscribers.values():
+                subscribers.discard(writer)
+            writer.close()
+
+
+_stand_in = None
+
+
+def backend_urls():
+    """(name, url) of each store under test"""
+    global _stand_in
+    if TEST_REDIS_URL is None and _stand_in is None:
+        _stand_in = RedisStandIn()
+    sqlite_path = os.path.join(tempfile.mkdtemp(), "live.db")
+    return [("sqlite", f"sqlite:///{sqlite_path}"), ("redis", TEST_REDIS_URL or _stand_in.url)]
+
+
+async def check_records(url):
+    # Two stores on the same URL stand for two worker processes
+    a, b = open_live_state(url), open_live_state(url)
+    try:
+        await a.update("call-1", {"status": "queued", "custom_data": {"customer_name": "Asha"}, "plivo_call_uuid": None})
+        await b.update("call-1", {"status": "calling", "answer_xml": "<Response/>"})
+        seen = await a.get("call-1")
+        passed = seen == {"status": "calling", "custom_data": {"customer_name": "Asha"},
+                          "plivo_call_uuid": None, "answer_xml": "<Response/>"}
+
+        await a.update_many({"call-2": {"status": "queued"}, "call-3": {"status": "queued"}})
+        passed &= set(await b.get_many(["call-1", "call-2", "call-3", "missing"])) == {"call-1", "call-2", "call-3"}
+
+        await b.delete("call-2")
+        await a.update("call-4", {"status": "completed"}, ttl=0.2)
+        await asyncio.sleep(0.3)
+        passed &= await a.get("call-2") is None and await b.get("call-4") is None
+        return passed
+    finally:
+        await a.close()
+        await b.close()
+
+
+async def check_locks(url):
+    a, b = open_live_state(url), open_live_state(url)
+    try:
+        token = await a.acquire("rehydrate", ttl=5)
+        passed = token is not None and await b.acquire("rehydrate", ttl=5) is None and await b.locked("rehydrate")
+        try:
+            async with b.lock("rehydrate", timeout=0.2):
+                passed = False
+        except TimeoutError:
+            pass
+        passed &= await a.release("rehydrate", token) and not await b.locked("rehydrate")
+
+        # An expired lock goes to the next caller; the old holder can no longer touch it
+        stale = await a.acquire("slot", ttl=0.2)
+        await asyncio.sleep(0.3)
+        fresh = await b.acquire("slot", ttl=5)
+        passed &= fresh is not None
+        passed &= not await a.release("slot", stale) and not await a.extend("slot", stale, 5)
+        passed &= await b.extend("slot", fresh, 5) and await b.locked("slot")
+        return passed
+    finally:
+        await a.close()
+        await b.close()
+
+
+async def check_notifications(url):
+    a, b = open_live_state(url), open_live_state(url)
+    received_by_a, received_by_b = [], []
+
+    async def listen(store, received):
+        async for message in store.messages():
+            received.append(message)
+
+    listeners = [asyncio.create_task(listen(a, received_by_a)), asyncio.create_task(listen(b, received_by_b))]
+    try:
+        await asyncio.sleep(0.3)  # let both subscribe
+        await a.publish({"call_uuid": "call-1", "status": "completed"})
+        await a.publish({"call_uuid": "call-2", "status": "failed"})
+        await asyncio.sleep(0.5)
+        return received_by_b == [{"call_uuid": "call-1", "status": "completed"},
+                                 {"call_uuid": "call-2", "status": "failed"}] and received_by_a == []
+    finally:
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+        await a.close()
+        await b.close()
+
+
+def increment_worker(url):
+    """One worker process: read-modify-write a shared counter under the lock"""
+    async def run():
+        store = open_live_state(url)
+        try:
+            for _ in range(INCREMENTS):
+                async with store.lock("counter"):
+                    record = await store.get("counter") or {"value": 0}
+                    await asyncio.sleep(0.001)  # widen the race window
+                    await store.update("counter", {"value": record["value"] + 1})
+        finally:
+            await store.close()
+    asyncio.run(run())
+
+
+async def check_relay(url):
+    """A status change published in one worker reaches the other worker's bus and the shared record"""
+    a, b = open_live_state(url), open_live_state(url)
+    bus_a, bus_b = CallEventBus(), CallEventBus()
+    relay_a = CallEventRelay(a, bus_a, heartbeat_interval=0.1)
+    relay_b = CallEventRelay(b, bus_b, heartbeat_interval=0.1)
+    for relay, bus in ((relay_a, bus_a), (relay_b, bus_b)):
+        bus.add_listener(relay.on_call_event)
+    seen_by_a, seen_by_b = [], []
+    bus_a.add_listener(seen_by_a.append)
+    bus_b.add_listener(seen_by_b.append)
+    try:
+        await relay_a.start()
+        await relay_b.start()
+        await asyncio.sleep(0.3)
+        bus_a.publish("call-9", "completed", user_id=7, ended_at="2026-01-01T10:02:00")
+        await asyncio.sleep(0.5)
+
+        passed = len(seen_by_a) == 1 and len(seen_by_b) == 1
+        passed &= seen_by_b[0]["status"] == "completed" and seen_by_b[0]["user_id"] == 7
+        passed &= seen_by_b[0]["origin"] == a.origin
+        record = await b.get("call-9")
+        passed &= record == {"status": "completed", "ended_at": "2026-01-01T10:02:00"}
+
+        # Heartbeats: both alive (past their first TTL), and b is gone once it stops
+        await asyncio.sleep(0.4)
+        passed &= await relay_a.worker_alive(b.origin) and await relay_b.worker_alive(a.origin)
+        await relay_b.stop()
+        passed &= not await relay_a.worker_alive(b.origin)
+        return passed
+    finally:
+        await relay_a.stop()
+        await relay_b.stop()
+        await a.close()
+        await b.close()
+
+
+def run_check(name, check):
+    passed = True
+    for backend, url in backend_urls():
+        passed &= report(f"{name} ({backend})", asyncio.run(check(url)))
+    return passed
+
+
+def test_records():
+    """Records written by one worker are read and merged by another, and expire"""
+    assert run_check("shared records", check_records)
+
+
+def test_locks():
+    """Locks exclude other holders, expire, and can't be released by a holder whose lock expired"""
+    assert run_check("locks", check_locks)
+
+
+def test_notifications():
+    """Messages reach the other workers, in order, but not the publisher"""
+    assert run_check("notifications", check_notifications)
+
+
+def test_lock_across_processes():
+    """Real processes incrementing one counter under the lock lose no updates"""
+    passed = True
+    context = multiprocessing.get_context("spawn")
+    for backend, url in backend_urls():
+        workers = [context.Process(target=increment_worker, args=(url,)) for _ in range(WORKERS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=120)
+
+        async def read():
+            store = open_live_state(url)
+            try:
+                return (await store.get("counter") or {}).get("value")
+            finally:
+                await store.close()
+        value = asyncio.run(read())
+        passed &= report(f"no lost updates ({backend})", value == WORKERS * INCREMENTS,
+                         f"{value} of {WORKERS * INCREMENTS} increments from {WORKERS} processes")
+    assert passed
+
+
+def test_event_relay():
+    """CallEventRelay replays call_events across workers and keeps heartbeats"""
+    assert run_check("event relay", check_relay)
+
+
+def test_open_live_state():
+    """LIVE_STATE_URL picks the store"""
+    path = os.path.join(tempfile.mkdtemp(), "live.db")
+    stores = [open_live_state(""), open_live_state(f"sqlite:///{path}"), open_live_state("redis://localhost:6379/2")]
+    passed = report("store per scheme", [type(store).__name__ for store in stores] ==
+                    ["MemoryLiveState", "SQLiteLiveState", "RedisLiveState"])
+    passed &= report("in-process store isn't shared", not stores[0].shared and stores[1].shared and stores[2].shared)
+    asyncio.run(stores[1].close())
+    try:
+        open_live_state("memcached://localhost")
+        passed &= report("unknown scheme rejected", False)
+    except ValueError:
+        passed &= report("unknown scheme rejected", True)
+    assert passed
+
+
+def test_incomplete_backend_rejected():
+    """A store missing part of the interface fails when constructed, not on first use"""
+    class RecordsOnly(LiveState):
+        get, get_many, update_many, delete = (MemoryLiveState.get, MemoryLiveState.get_many,
+                                              MemoryLiveState.update_many, MemoryLiveState.delete)
+
+    try:
+        RecordsOnly()
+        passed = report("incomplete backend rejected", False)
+    except TypeError as e:
+        passed = report("incomplete backend rejected", True, str(e))
+    assert passed
+
+
+if __name__ == "__main__":
+    run_tests("🔗 SHARED LIVE STATE - TEST SUITE",
+              (test_open_live_state, test_records, test_locks, test_notifications, test_lock_across_processes,
+               test_event_relay, test_incomplete_backend_rejected))
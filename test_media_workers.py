@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Tests for off-process media workers
+
+Fake session entry points stand in for bot.bot, so no speech services are
+needed: the API relays each call socket to a worker process, which runs the
+session and sends its call events back.
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import hashlib
+import tempfile
+
+import uvicorn
+from fastapi import FastAPI, WebSocket
+from loguru import logger
+from websockets.asyncio.client import connect
+
+from events import CallEventBus, call_events
+from media_workers import MediaWorkerPool
+from greeting_service import read_greeting_pcm
+from test_greeting_segments import make_wav
+from test_support import report, run_tests
+
+SESSIONS = 4
+CPU_SESSIONS = 3
+CPU_FRAMES = 10
+CPU_MS_PER_FRAME = 100
+
+# Greeting handed to each session (as a local path on the API side)
+GREETING_FILE = os.path.join(tempfile.mkdtemp(), "greeting.wav")
+with open(GREETING_FILE, "wb") as f:
+    f.write(make_wav(0.5))
+
+
+def burn_cpu(ms):
+    """Keep a core busy for about ms milliseconds (stands in for VAD/serialization work)"""
+    deadline = time.perf_counter() + ms / 1000
+    data = b"x" * 1024
+    while time.perf_counter() < deadline:
+        data = hashlib.sha256(data).digest() * 32
+
+
+async def echo_session(runner_args):
+    """
+    Session entry point: echo frames with the worker's pid and the greeting's size;
+    'hangup' publishes a final status and ends
+    """
+    websocket = runner_args.websocket
+    call_uuid = websocket.state.call_uuid
+    greeting = getattr(websocket.state, "greeting_audio", None)
+    greeting_bytes = len(read_greeting_pcm(greeting)[0]) if greeting else 0
+    while True:
+        frame = await websocket.receive_text()
+        if frame == "hangup":
+            call_events.publish(call_uuid, "completed_conversation", user_id=websocket.state.custom_data["user_id"])
+            return
+        await websocket.send_text(json.dumps({"echo": frame, "pid": os.getpid(), "greeting_bytes": greeting_bytes}))
+
+
+async def cpu_session(runner_args):
+    """Session entry point: CPU-bound work for every frame, like a pipeline under load"""
+    websocket = runner_args.websocket
+    for _ in range(CPU_FRAMES):
+        await websocket.receive_text()
+        burn_cpu(CPU_MS_PER_FRAME)
+        await websocket.send_text("done")
+
+
+class RunnerArgs:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.handle_sigint = False
+
+
+def free_ports(count):
+    """First port of `count` consecutive free ports"""
+    for base in range(20000 + os.getpid() % 20000, 65000, count):
+        try:
+            sockets = []
+            for port in range(base, base + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.bind(("127.0.0.1", port))
+            return base
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+
+
+async def serve_api(entry_point, workers, base_port=None, token=""):
+    """The API side: /ws/{call_uuid} hands the socket to the pool (or runs the session itself)"""
+    bus = CallEventBus()
+    pool = MediaWorkerPool(bus, count=workers, base_port=base_port or free_ports(max(workers, 1)),
+                           entry_point=f"test_media_workers:{entry_point.__name__}", token=token)
+    app = FastAPI()
+    seen_when_closed = {}
+
+    @app.websocket("/ws/{call_uuid}")
+    async def websocket_endpoint(websocket: WebSocket, call_uuid: str):
+        await websocket.accept()
+        websocket.state.call_uuid = call_uuid
+        websocket.state.custom_data = {"user_id": 1}
+        session = {"custom_data": websocket.state.custom_data, "greeting_audio": GREETING_FILE}
+        if not await pool.proxy(websocket, call_uuid, session):
+            await entry_point(RunnerArgs(websocket))
+        seen_when_closed[call_uuid] = [event["status"] for event in bus_events if event["call_uuid"] == call_uuid]
+
+    bus_events = []
+    bus.add_listener(bus_events.append)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    await pool.start()
+    deadline = time.monotonic() + 60
+    while workers and not all(worker.connected for worker in pool.workers) and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    async def stop():
+        await pool.stop()
+        server.should_exit = True
+        await serving
+
+    return f"ws://127.0.0.1:{port}", pool, seen_when_closed, stop
+
+
+async def check_handoff():
+    url, pool, seen_when_closed, stop = await serve_api(echo_session, workers=2, token="test-token")
+    try:
+        async def call(n):
+            async with connect(f"{url}/ws/call-{n}") as ws:
+                pids = set()
+                for i in range(3):
+                    await ws.send(f"frame-{i}")
+                    reply = json.loads(await ws.recv())
+                    pids.add(reply["pid"])
+                await ws.send("hangup")
+                await ws.wait_closed()
+                return pids, reply["greeting_bytes"]
+
+        results = await asyncio.gather(*(call(n) for n in range(SESSIONS)))
+        await asyncio.sleep(0.2)
+        worker_pids = {worker.process.pid for worker in pool.workers}
+        used = set().union(*(pids for pids, _ in results))
+        greeting_bytes = len(read_greeting_pcm(GREETING_FILE)[0])
+
+        passed = report("sessions run in worker processes", used <= worker_pids and os.getpid() not in used,
+                        f"{SESSIONS} calls on pids {sorted(used)}")
+        passed &= report("spread across workers", len(used) == len(worker_pids))
+        passed &= report("greeting audio sent with the session",
+                         all(received == greeting_bytes for _, received in results), f"{greeting_bytes} bytes")
+        passed &= report("final call events reach the API before the socket handler returns",
+                         all(seen_when_closed.get(f"call-{n}") == ["completed_conversation"] for n in range(SESSIONS)))
+        passed &= report("nothing fell back to the API process", pool.fallbacks == 0 and pool.proxied == SESSIONS)
+
+        codes = []
+        for path in ("/events", "/ws/intruder"):
+            async with connect(f"{pool.workers[0].url}{path}") as ws:
+                await ws.wait_closed()
+                codes.append(ws.close_code)
+        passed &= report("workers refuse clients without the token", codes == [1008, 1008], str(codes))
+        refused = MediaWorkerPool(CallEventBus(), count=1, host="0.0.0.0", token="")
+        try:
+            await refused.start()
+            passed &= report("no token, no workers beyond loopback", False)
+        except RuntimeError:
+            passed &= report("no token, no workers beyond loopback", True)
+        finally:
+            await refused.stop()
+        return passed
+    finally:
+        await stop()
+
+
+async def echo_call(url, call_uuid):
+    """One call through the API at url; returns the pid that ran it"""
+    async with connect(f"{url}/ws/{call_uuid}") as ws:
+        await ws.send("frame")
+        pid = json.loads(await ws.recv())["pid"]
+        await ws.send("hangup")
+        await ws.wait_closed()
+        return pid
+
+
+async def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    return condition()
+
+
+async def check_shared_workers():
+    """Two API processes on one host (uvicorn --workers 2) share its workers"""
+    base_port = free_ports(1)
+    first = await serve_api(echo_session, workers=1, base_port=base_port)
+    second = await serve_api(echo_session, workers=1, base_port=base_port)
+    apis = [first, second]
+    try:
+        pools = [pool for _, pool, _, _ in apis]
+        events = [[], []]
+        for pool, seen in zip(pools, events):
+            pool.bus.add_listener(lambda event, seen=seen: seen.append(event["status"]))
+        await wait_for(lambda: all(worker.connected for pool in pools for worker in pool.workers))
+
+        leaders = [pool.leader for pool in pools]
+        passed = report("one API process runs the workers", sorted(leaders) == [False, True], str(leaders))
+        follower = leaders.index(False)
+        pid = await echo_call(apis[follower][0], "shared-1")
+        await asyncio.sleep(0.2)
+        passed &= report("follower proxies to the leader's worker", pid == pools[1 - follower].workers[0].process.pid)
+        passed &= report("call events republished once, by the proxying process",
+                         events[follower] == ["completed_conversation"] and events[1 - follower] == [],
+                         f"{events}")
+
+        # The leader exits: the other process takes the lock and starts its own worker
+        await apis.pop(1 - follower)[3]()
+        pool = pools[follower]
+        took_over = await wait_for(lambda: pool.leader and pool.workers[0].connected and pool.workers[0].process is not None)
+        passed &= report("the other process takes over", took_over)
+        if took_over:
+            pid = await echo_call(apis[0][0], "shared-2")
+            passed &= report("calls run on its worker", pid == pool.workers[0].process.pid)
+        return passed
+    finally:
+        for api in apis:
+            await api[3]()
+
+
+async def loop_lag_during_calls(workers):
+    """Worst delay of a 10 ms ticker in the API process while CPU-bound calls run"""
+    url, pool, _, stop = await serve_api(cpu_session, workers=workers)
+    worst = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal worst
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - start - 0.01)
+
+    async def call(n):
+        async with connect(f"{url}/ws/cpu-{n}") as ws:
+            for _ in range(CPU_FRAMES):
+                await ws.send("frame")
+                await ws.recv()
+
+    try:
+        tick = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await asyncio.gather(*(call(n) for n in range(CPU_SESSIONS)))
+        elapsed = time.perf_counter() - start
+        running = False
+        await tick
+        return worst * 1000, elapsed
+    finally:
+        await stop()
+
+
+def test_sessions_handed_to_workers():
+    """Call sockets are relayed to worker processes, and their call events come back"""
+    assert asyncio.run(check_handoff())
+
+
+def test_workers_shared_by_api_processes():
+    """Workers are started once per host and each call's events are republished once"""
+    assert asyncio.run(check_shared_workers())
+
+
+def test_api_loop_stays_responsive():
+    """CPU-heavy calls no longer stall the API's event loop (webhooks, dashboards, other calls)"""
+    in_process, in_process_time = asyncio.run(loop_lag_during_calls(workers=0))
+    offloaded, offloaded_time = asyncio.run(loop_lag_during_calls(workers=2))
+    print(f"  {os.cpu_count()} cores; {CPU_SESSIONS} calls x {CPU_FRAMES} frames x {CPU_MS_PER_FRAME} ms CPU: "
+          f"{in_process_time:.2f} s in the API process, {offloaded_time:.2f} s in 2 workers")
+    assert report("API loop lag", offloaded < in_process / 2,
+                  f"worst {in_process:.0f} ms in-process -> {offloaded:.0f} ms with workers")
+
+
+if __name__ == "__main__":
+    logger.remove()
+    run_tests("🧵 MEDIA WORKERS - TEST SUITE",
+              (test_sessions_handed_to_workers, test_workers_shared_by_api_processes, test_api_loop_stays_responsive))
@@ -0,0 +1,22 @@
+"""Helpers shared by the test scripts, which run under pytest or directly with python"""
+
+
+def report(name, passed, detail=""):
+    """Print one check's outcome and return it, so checks can be and-ed together"""
+    status = "✅ PASS" if passed else "❌ FAIL"
+    print(f"{status} - {name}" + (f" ({detail})" if detail else ""))
+    return passed
+
+
+def run_tests(title, tests):
+    """Run test functions in order (the __main__ entry point of a test script) and print a summary"""
+    print(f"\n{title}\n")
+    results = []
+    for test in tests:
+        try:
+            test()
+            results.append(True)
+        except AssertionError:
+            results.append(False)
+    print("\n🎉 ALL TESTS PASSED!" if all(results) else "\n⚠️  SOME TESTS FAILED.")
+    return all(results)